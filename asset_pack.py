@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+UI・メニュー・方角・通知音声のパック（デコード済み PCM をまとめた1ファイル）
+
+起動時に WAV を1つずつ開いて解析する代わりに、ミキサーの形式へ展開済みの PCM と
+索引を1ファイルにまとめておき、mmap してスライスから Sound を作る。
+元の WAV が追加・更新・削除されたら（パス・サイズ・mtime で判定）自動で作り直す。
+
+ファイル形式:
+  MAGIC(8) + 索引の長さ(4, little endian) + 索引(JSON) + PCM（各エントリは ALIGN 境界から）
+"""
+
+import os
+import json
+import mmap
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+MAGIC = b'SNDPACK1'
+ALIGN = 16
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_PACK_PATH = os.path.join(PROJECT_DIR, 'cache', 'sound_pack.bin')
+
+# パックを作り直すときに WAV を並列にデコードするスレッド数
+DECODE_WORKERS = min(4, os.cpu_count() or 1)
+
+
+def _source_info(path):
+    st = os.stat(path)
+    return {'path': path, 'size': st.st_size, 'mtime': st.st_mtime}
+
+
+def _mixer_format():
+    return list(pygame.mixer.get_init())
+
+
+def _decode(path):
+    """WAV を Sound に読み込む。見つからない・読めなければ None"""
+    if not os.path.exists(path):
+        print(f"警告: ファイルが見つかりません: {path}")
+        return None
+    try:
+        return pygame.mixer.Sound(path)
+    except pygame.error as e:
+        print(f"警告: {path} の読み込み失敗: {e}")
+        return None
+
+
+def build_pack(sound_files, pack_path=DEFAULT_PACK_PATH, workers=DECODE_WORKERS):
+    """
+    sound_files（キー → WAV パス）を読み込んでパックを書き出し、読み込んだ Sound を返す。
+    デコードは workers 個のスレッドで並列に行う。見つからない・読めないファイルは警告して除外する。
+    """
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        decoded = list(pool.map(_decode, sound_files.values()))
+
+    sounds = {}
+    entries = {}
+    chunks = []
+    offset = 0
+    for (key, path), sound in zip(sound_files.items(), decoded):
+        if sound is None:
+            continue
+        raw = sound.get_raw()
+        padding = (-offset) % ALIGN
+        chunks.append(b'\0' * padding)
+        offset += padding
+        entries[key] = dict(_source_info(path), offset=offset, length=len(raw))
+        chunks.append(raw)
+        offset += len(raw)
+        sounds[key] = sound
+
+    index = json.dumps({'format': _mixer_format(), 'entries': entries}, ensure_ascii=False).encode('utf-8')
+    header = MAGIC + struct.pack('<I', len(index)) + index
+    # PCM の先頭も ALIGN 境界に揃える
+    header += b'\0' * ((-len(header)) % ALIGN)
+
+    os.makedirs(os.path.dirname(pack_path), exist_ok=True)
+    tmp_path = pack_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(header)
+        for chunk in chunks:
+            f.write(chunk)
+    os.replace(tmp_path, pack_path)
+    print(f"📦 音声パックを作成しました: {len(entries)}件 / {(len(header) + offset) / 1024 / 1024:.1f}MB")
+    return sounds
+
+
+def read_index(pack_path):
+    """パックの索引と PCM 開始位置を返す。読めなければ (None, 0)"""
+    try:
+        with open(pack_path, 'rb') as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                return None, 0
+            (length,) = struct.unpack('<I', f.read(4))
+            index = json.loads(f.read(length).decode('utf-8'))
+    except (OSError, ValueError, struct.error):
+        return None, 0
+    base = len(MAGIC) + 4 + length
+    return index, base + (-base) % ALIGN
+
+
+def is_stale(index, sound_files):
+    """パックが元の WAV やミキサーの形式と食い違っているか"""
+    if index is None or index.get('format') != _mixer_format():
+        return True
+    entries = index.get('entries', {})
+    for key, path in sound_files.items():
+        entry = entries.get(key)
+        exists = os.path.exists(path)
+        if entry is None:
+            # パック作成時になかったファイルが追加された
+            if exists:
+                return True
+            continue
+        if not exists or entry['path'] != path:
+            return True
+        st = os.stat(path)
+        if st.st_size != entry['size'] or st.st_mtime != entry['mtime']:
+            return True
+    return False
+
+
+def load_pack(sound_files, pack_path=DEFAULT_PACK_PATH):
+    """
+    パックから Sound を作って返す（キー → Sound）。
+    パックがない・古い場合は元の WAV から作り直す。
+    """
+    index, base = read_index(pack_path)
+    if is_stale(index, sound_files):
+        print("📦 音声パックを作り直します（元の音声が更新されました）" if index else "📦 音声パックがないため作成します")
+        return build_pack(sound_files, pack_path)
+
+    sounds = {}
+    with open(pack_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            view = memoryview(mm)
+            try:
+                for key, entry in index['entries'].items():
+                    if key not in sound_files:
+                        continue
+                    start = base + entry['offset']
+                    # WAV ヘッダーを解析せず、展開済み PCM のスライスから直接作る
+                    sounds[key] = pygame.mixer.Sound(buffer=view[start:start + entry['length']])
+            finally:
+                view.release()
+    for key, path in sound_files.items():
+        if key not in sounds:
+            print(f"警告: ファイルが見つかりません: {path}")
+    return sounds
@@ -0,0 +1,920 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音声再生まわりのベンチマークツール
+
+サウンドカードのない環境でも null 出力（audio_output.py）で実時間再生を再現して計測する。
+実機で計測する場合は --real（または --output pygame / alsa）を付ける。
+--speed で null / file 出力の時間を速められ、--output file で鳴った音を WAV に録音できる。
+
+使い方:
+  python3 audio_bench.py gap --count 20 --gap 0.2
+  python3 audio_bench.py ttfa --source mukashimukashi/sample.m4a
+  python3 audio_bench.py queue --steps 10
+  python3 audio_bench.py cache --dir audio/bird_names --passes 3
+  python3 audio_bench.py sequence --cue audio/saisei.wav --gap 0.15
+  python3 audio_bench.py stress --ops 5000 --threads 4
+  python3 audio_bench.py input --steps 20 --interval 0.3
+  python3 audio_bench.py startup --dir audio --drop-caches
+  python3 audio_bench.py longwav --minutes 10 --listen 3
+  python3 audio_bench.py direction --count 10
+  python3 audio_bench.py mixer --card 2 --steps 20
+  python3 audio_bench.py loop --idle 5 --events 50
+  python3 audio_bench.py knob --items 300 --target 150
+"""
+
+import os
+import sys
+import math
+import time
+import array
+import argparse
+import glob
+import wave
+import shutil
+import tempfile
+import subprocess
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(PROJECT_DIR)
+
+
+def section(title):
+    print(f"\n{'='*50}")
+    print(f"  {title}")
+    print(f"{'='*50}")
+
+
+def init_mixer(args):
+    """計測用に pygame.mixer を初期化（本番と同じフォーマット・同じ出力バックエンド）"""
+    import pygame
+    from audio_output import init_output
+    backend = 'pygame' if args.real else args.output
+    description = init_output(backend, os.getenv('SPEAKER_CARD', '0'), speed=args.speed, path=args.record)
+    pygame.mixer.set_num_channels(16)
+    print(f"🔊 出力: {description} / フォーマット: {pygame.mixer.get_init()}")
+    return pygame
+
+
+def make_tone(pygame, duration, freq=880.0, volume=0.3):
+    """計測用のサイン波 Sound を生成"""
+    rate, _, channels = pygame.mixer.get_init()
+    frames = int(rate * duration)
+    samples = array.array('h')
+    for i in range(frames):
+        v = int(32767 * volume * math.sin(2 * math.pi * freq * i / rate))
+        samples.extend([v] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+def percentile(values, p):
+    """p パーセンタイル（最近傍法）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = min(len(ordered) - 1, max(0, int(math.ceil(p / 100.0 * len(ordered))) - 1))
+    return ordered[k]
+
+
+def report_ms(label, values):
+    """秒単位の計測値をミリ秒で集計表示"""
+    if not values:
+        print(f"  {label}: 計測値なし")
+        return
+    ms = [v * 1000 for v in values]
+    print(f"  {label}: n={len(ms)} min={min(ms):.1f}ms p50={percentile(ms, 50):.1f}ms "
+          f"p95={percentile(ms, 95):.1f}ms max={max(ms):.1f}ms")
+
+
+# ========== 1. 再生間隔 ==========
+# 再生中のワーカースレッドの起床回数の上限（回/秒）。超えたらポーリングに戻っている
+MAX_PLAYBACK_WAKEUPS = 50
+
+
+def bench_gap(args):
+    """クリップ終了から次のクリップ開始までの間隔を計測"""
+    section("再生間隔（前のクリップ終了 → 次のクリップ開始）")
+    pygame = init_mixer(args)
+    from audio_manager import SequentialAudioManager
+
+    from event_loop import thread_wakeups
+
+    mgr = SequentialAudioManager(gap=args.gap)
+    tone = make_tone(pygame, args.clip)
+    print(f"  設定間隔: {args.gap * 1000:.0f}ms / クリップ長: {args.clip * 1000:.0f}ms / 回数: {args.count}")
+
+    worker = mgr.worker_thread.native_id
+    before, start = thread_wakeups(worker), time.monotonic()
+    for _ in range(args.count):
+        # 2つ続けて積み、2つ目の開始までの間隔を測る
+        mgr.play("sound", tone)
+        mgr.play("sound", tone)
+        mgr.join()
+    after, elapsed = thread_wakeups(worker), time.monotonic() - start
+
+    gaps = list(mgr.gap_history)
+    report_ms("実測間隔", gaps)
+    report_ms("設定からの超過", [g - args.gap for g in gaps])
+    if before is None or after is None:
+        print("  /proc がないため再生中の起床回数は計測できません")
+    else:
+        # 再生の終わりは終了予定時刻まで眠って待つので、クリップ1つにつき数回しか起きない
+        rate = (after - before) / elapsed
+        mark = "✅" if rate <= MAX_PLAYBACK_WAKEUPS else "❌"
+        print(f"  {mark} 再生中のワーカーの起床: {rate:.1f}回/秒（上限 {MAX_PLAYBACK_WAKEUPS}回/秒）")
+
+
+# ========== 2. 再生開始までの時間 ==========
+def measure_ffplay(source, real):
+    """ffplay が最初のステータス行（音声クロック開始）を出すまでの時間"""
+    env = os.environ.copy()
+    if real:
+        env['SDL_AUDIODRIVER'] = 'alsa'
+        env['AUDIODEV'] = 'plug:dmixed'
+    else:
+        env['SDL_AUDIODRIVER'] = 'dummy'
+    start = time.monotonic()
+    process = subprocess.Popen(
+        ['ffplay', '-nodisp', '-autoexit', '-stats', '-af', 'aformat=sample_fmts=s16:sample_rates=44100', source],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    elapsed = None
+    line = b''
+    try:
+        while True:
+            c = process.stderr.read(1)
+            if not c:
+                break
+            if c in (b'\r', b'\n'):
+                if b'M-A' in line or b'aq=' in line:
+                    elapsed = time.monotonic() - start
+                    break
+                line = b''
+            else:
+                line += c
+    finally:
+        process.terminate()
+        process.wait()
+    return elapsed
+
+
+def bench_ttfa(args):
+    """リクエストから最初の音が出るまでの時間を ffplay とストリーミングデコードで比較"""
+    section("再生開始までの時間（ffplay vs ストリーミングデコード）")
+    pygame = init_mixer(args)
+    from audio_decoder import DecoderStream, decoder_available, has_pyav
+
+    print(f"  ソース: {args.source} / 回数: {args.count}")
+
+    if shutil.which('ffplay'):
+        results = [measure_ffplay(args.source, args.real or args.output in ('pygame', 'alsa')) for _ in range(args.count)]
+        report_ms("ffplay", [r for r in results if r is not None])
+    else:
+        print("  ffplay: 見つからないためスキップ")
+
+    if decoder_available():
+        results = []
+        for _ in range(args.count):
+            channel = pygame.mixer.find_channel(True)
+            stream = DecoderStream(args.source, channel)
+            while not stream.first_audio.wait(0.01) and not stream.finished.is_set():
+                pass
+            if stream.first_audio_at is not None:
+                results.append(stream.first_audio_at - stream.started_at)
+            stream.stop()
+        report_ms(f"ストリーミング ({'PyAV' if has_pyav() else 'ffmpeg'})", results)
+    else:
+        print("  ストリーミング: PyAV / ffmpeg が見つからないためスキップ")
+
+
+# ========== 3. 優先クラス別の待ち時間 ==========
+def bench_queue(args):
+    """ノブを素早く回した直後に「決定」した場合の、クラス別の待ち時間を計測"""
+    section("優先クラス別の待ち時間（投入 → 再生開始）")
+    pygame = init_mixer(args)
+    from audio_manager import SequentialAudioManager
+
+    mgr = SequentialAudioManager(gap=args.gap)
+    prompt = make_tone(pygame, 0.6, freq=660.0)
+    cue = make_tone(pygame, 0.2, freq=990.0)
+    content = make_tone(pygame, 1.0, freq=440.0)
+    notice = make_tone(pygame, 0.3, freq=1200.0)
+
+    for _ in range(args.rounds):
+        for _ in range(args.steps):
+            mgr.play("sound", prompt, priority='nav')
+            time.sleep(args.interval)
+        mgr.play("sound", cue, priority='ui')
+        mgr.play("sound", content, priority='content')
+        time.sleep(0.3)
+        mgr.play("sound", notice, priority='notification')
+        mgr.join()
+
+    for name, stats in mgr.latency_report().items():
+        print(f"  {name:<13} n={stats['count']:<3} p50={stats['p50'] * 1000:.1f}ms "
+              f"p95={stats['p95'] * 1000:.1f}ms max={stats['max'] * 1000:.1f}ms")
+
+
+# ========== 4. 音声キャッシュ ==========
+def make_wav_files(pygame, directory, count, duration, rate=None):
+    """計測用の WAV ファイルを作成（rate 省略時は mixer と同じフォーマット）"""
+    mixer_rate, _, channels = pygame.mixer.get_init()
+    paths = []
+    for i in range(count):
+        path = os.path.join(directory, f"prompt_{i:03d}.wav")
+        if rate is None or rate == mixer_rate:
+            frames = make_tone(pygame, duration, freq=440.0 + i * 10).get_raw()
+        else:
+            # Polly 出力（16kHz）などミキサーと違うレートのファイル
+            samples = array.array('h')
+            for n in range(int(rate * duration)):
+                samples.extend([int(32767 * 0.3 * math.sin(2 * math.pi * (440.0 + i * 10) * n / rate))] * channels)
+            frames = samples.tobytes()
+        with wave.open(path, 'wb') as w:
+            w.setnchannels(channels)
+            w.setsampwidth(2)
+            w.setframerate(rate or mixer_rate)
+            w.writeframes(frames)
+        paths.append(path)
+    return paths
+
+
+def bench_cache(args):
+    """リストを往復したときの読み込み時間とキャッシュのヒット率を計測"""
+    section("デコード済み Sound キャッシュ")
+    pygame = init_mixer(args)
+    from sound_cache import SoundCache
+
+    tmpdir = None
+    if args.dir:
+        paths = sorted(glob.glob(os.path.join(args.dir, '*.wav')))
+    else:
+        tmpdir = tempfile.mkdtemp(prefix='audio_bench_')
+        paths = make_wav_files(pygame, tmpdir, 30, 1.0)
+    if not paths:
+        print("  ⚠️ WAVファイルがありません")
+        return
+
+    cache = SoundCache(int(args.budget_mb * 1024 * 1024))
+    print(f"  ファイル数: {len(paths)} / 予算: {args.budget_mb}MB / 往復: {args.passes}回")
+    for i in range(args.passes):
+        # 行き（昇順）と帰り（降順）を交互に
+        order = paths if i % 2 == 0 else list(reversed(paths))
+        loads = []
+        for path in order:
+            start = time.monotonic()
+            cache.get(path)
+            loads.append(time.monotonic() - start)
+        report_ms(f"{i + 1}周目の読み込み", loads)
+
+    stats = cache.stats()
+    print(f"  ヒット {stats['hits']} / ミス {stats['misses']} / 追い出し {stats['evictions']} "
+          f"/ 使用 {stats['used_bytes'] / 1024 / 1024:.1f}MB")
+    if tmpdir:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ========== 5. 案内音 → 本文の間隔 ==========
+def bench_sequence(args):
+    """「再生します」等の案内音が終わってから本文が始まるまでの実測間隔"""
+    section("案内音 → 本文の間隔（シーケンス再生）")
+    pygame = init_mixer(args)
+    from audio_manager import SequentialAudioManager
+
+    mgr = SequentialAudioManager()
+    cue = pygame.mixer.Sound(args.cue) if args.cue else make_tone(pygame, 1.2, freq=990.0)
+    content = make_tone(pygame, args.clip, freq=440.0)
+    finished = []
+    print(f"  案内音: {cue.get_length() * 1000:.0f}ms / 設定間隔: {args.gap * 1000:.0f}ms / 回数: {args.count}")
+
+    for _ in range(args.count):
+        mgr.play_sequence([("sound", cue, 'ui'), ("sound", content, 'content')],
+                          gap=args.gap, urgent=True, on_finish=lambda: finished.append(time.monotonic()))
+        mgr.join()
+
+    gaps = [gap for _, _, gap in mgr.sequence_gaps]
+    report_ms("実測間隔", gaps)
+    report_ms("設定からの超過", [g - args.gap for g in gaps])
+    print(f"  完了コールバック: {len(finished)}/{args.count}回")
+
+
+# ========== 6. 再生・停止の連打 ==========
+def bench_stress(args):
+    """再生・停止・キャンセルを複数スレッドから大量に交互に呼び、取り違えがないか確認"""
+    section("再生・停止の連打（トークン単位のキャンセル）")
+    pygame = init_mixer(args)
+    import random
+    import threading
+    from audio_manager import SequentialAudioManager, PRIORITY_CLASSES, QUEUE_GROUPS, DUCK_RELEASE, DUCK_THREAD_NAME
+
+    mgr = SequentialAudioManager(gap=0.0)
+    tone = make_tone(pygame, args.clip, freq=660.0)
+    # ダッキング（alert / notification）も含め、音量を下げて戻す処理とキャンセルを重ねる
+    classes = list(PRIORITY_CLASSES)
+    lock = threading.Lock()
+    finished = {}   # token -> 完了コールバックの回数
+    cancelled = set()  # 取り消しに成功したトークン
+    counts = {'play': 0, 'stop': 0, 'cancel': 0}
+
+    def on_finish(box):
+        with lock:
+            finished[box[0]] = finished.get(box[0], 0) + 1
+
+    def run(seed):
+        rnd = random.Random(seed)
+        mine = []
+        for _ in range(args.ops // args.threads):
+            r = rnd.random()
+            if r < 0.6:
+                box = [None]
+                with lock:
+                    # コールバックより先にトークンを記録できるようロック内で投入
+                    box[0] = mgr.play("sound", tone, priority=rnd.choice(classes),
+                                      urgent=rnd.random() < 0.1, on_finish=lambda b=box: on_finish(b))
+                    counts['play'] += 1
+                mine.append(box[0])
+            elif r < 0.8 and mine:
+                token = rnd.choice(mine)
+                with lock:
+                    if mgr.cancel(token=token):
+                        cancelled.add(token)
+                    counts['cancel'] += 1
+            else:
+                mgr.stop_immediately()
+                with lock:
+                    counts['stop'] += 1
+            time.sleep(rnd.random() * args.interval)
+
+    start = time.monotonic()
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    drained = mgr.join(timeout=10)
+    elapsed = time.monotonic() - start
+    print(f"  再生 {counts['play']} / 停止 {counts['stop']} / キャンセル {counts['cancel']}回 "
+          f"（{args.threads}スレッド, {elapsed:.1f}秒）")
+
+    # 連打後も、止めずに積んだアイテムは最後まで鳴って完了コールバックが呼ばれること
+    tail = []
+    last = threading.Event()
+    for i in range(3):
+        mgr.play("sound", tone, priority='content', on_finish=lambda i=i: (tail.append(i), i == 2 and last.set()))
+    last.wait(10)
+
+    # ダッキングを戻すスレッドがすべて終わり、下げた音量が戻っていること
+    for thread in [t for t in threading.enumerate() if t.name == DUCK_THREAD_NAME]:
+        thread.join(timeout=10)
+    time.sleep(DUCK_RELEASE + 0.1)  # 音量を戻すエンベロープとコールバックスレッドの処理待ち
+    restorers = sum(1 for t in threading.enumerate() if t.name == DUCK_THREAD_NAME)
+    lowered = [channel for name in QUEUE_GROUPS for channel in mgr.groups[name].channels
+               if abs(channel.get_volume() - 1.0) > 0.01]
+
+    duplicated = [t for t, n in finished.items() if n > 1]
+    after_cancel = [t for t in cancelled if t in finished]
+    print(f"  キューの排出: {'OK' if drained else 'タイムアウト'}")
+    print(f"  完了コールバック: {len(finished)}回 / 重複 {len(duplicated)}件 / 取り消し後の呼び出し {len(after_cancel)}件")
+    print(f"  連打後の通常再生: {len(tail)}/3件完了")
+    print(f"  ダッキング: 戻し待ち {mgr.ducking()}件 / 残ったスレッド {restorers}件 / "
+          f"音量が戻っていないチャンネル {len(lowered)}件")
+    ok = (drained and not duplicated and not after_cancel and tail == [0, 1, 2]
+          and not mgr.ducking() and not restorers and not lowered)
+    print(f"  判定: {'✅ 問題なし' if ok else '❌ 不整合あり'}")
+    return ok
+
+
+# ========== 7. キー入力 → 最初の音 ==========
+def bench_input(args):
+    """ノブ回転と決定を模した入力から最初の音が出るまでの時間（本体の /stats と同じ集計）"""
+    section("キー入力 → 最初の音")
+    pygame = init_mixer(args)
+    from audio_manager import SequentialAudioManager
+    from input_latency import InputStamp, format_report
+
+    mgr = SequentialAudioManager(gap=args.gap)
+    prompt = make_tone(pygame, 0.6, freq=660.0)
+    cue = make_tone(pygame, 0.2, freq=990.0)
+
+    for i in range(args.steps):
+        # 本体と同じく、入力ごとに印を付けてから再生を積む
+        mgr.mark_input(InputStamp(time.monotonic(), 'main_menu', 'KEY_VOLUMEUP'))
+        mgr.play("sound", prompt, priority='nav')
+        mgr.mark_input(None)
+        time.sleep(args.interval)
+    mgr.mark_input(InputStamp(time.monotonic(), 'main_menu', 'KEY_MUTE'))
+    mgr.play("sound", cue, priority='ui')
+    mgr.play("sound", prompt, priority='nav')
+    mgr.mark_input(None)
+    mgr.join()
+
+    print(format_report(mgr.input_latency.report()))
+
+
+# ========== 8. 起動時の音声ロード ==========
+def drop_page_cache():
+    """ページキャッシュを捨てる（root 権限が必要。できなければ False）"""
+    try:
+        os.sync()
+        with open('/proc/sys/vm/drop_caches', 'w') as f:
+            f.write('3\n')
+        return True
+    except OSError:
+        return False
+
+
+def bench_startup(args):
+    """WAV を1つずつ読む従来のロードと、音声パックの mmap ロードを比較"""
+    section("起動時の音声ロード（WAV 個別 vs 音声パック）")
+    pygame = init_mixer(args)
+    from asset_pack import load_pack, build_pack
+
+    tmpdir = tempfile.mkdtemp(prefix='audio_bench_')
+    if args.dir:
+        paths = sorted(glob.glob(os.path.join(args.dir, '**', '*.wav'), recursive=True))
+    else:
+        paths = make_wav_files(pygame, tmpdir, 26, 1.5, rate=args.rate)
+    if not paths:
+        print("  ⚠️ WAVファイルがありません")
+        return
+    sound_files = {f"sound_{i}": path for i, path in enumerate(paths)}
+    pack_path = os.path.join(tmpdir, 'sound_pack.bin')
+    build_pack(sound_files, pack_path)
+
+    cold = args.drop_caches and drop_page_cache()
+    print(f"  ファイル数: {len(paths)} / 回数: {args.count} / {'コールド（ページキャッシュ破棄）' if cold else 'ウォーム'}")
+    if args.drop_caches and not cold:
+        print("  ⚠️ ページキャッシュを破棄できません（root で実行してください）")
+
+    per_file, packed = [], []
+    for _ in range(args.count):
+        if cold:
+            drop_page_cache()
+        # 本体と同じく読み込んだ Sound を保持したまま計測する（すぐ捨てるとメモリの再利用で速く見える）
+        start = time.monotonic()
+        loaded = {key: pygame.mixer.Sound(path) for key, path in sound_files.items()}
+        per_file.append(time.monotonic() - start)
+        del loaded
+
+        if cold:
+            drop_page_cache()
+        start = time.monotonic()
+        loaded = load_pack(sound_files, pack_path)
+        packed.append(time.monotonic() - start)
+        del loaded
+
+    report_ms("WAV 個別", per_file)
+    report_ms("音声パック", packed)
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ========== 9. 長い WAV の再生 ==========
+def rss_bytes():
+    """現在の常駐メモリ（バイト）"""
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def make_long_wav(pygame, path, minutes):
+    """計測用の長い WAV（ミキサーと同じ形式）を作成"""
+    rate, _, channels = pygame.mixer.get_init()
+    block = make_tone(pygame, 1.0, freq=330.0).get_raw()
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for _ in range(int(minutes * 60)):
+            w.writeframes(block)
+
+
+def bench_longwav(args):
+    """長いメッセージ WAV を Sound に全部読み込む場合とチャンク単位のストリーミングを比較"""
+    section("長い WAV の再生（Sound 一括読み込み vs ストリーミング）")
+    pygame = init_mixer(args)
+    import threading
+    from audio_manager import SequentialAudioManager, STREAM_WAV_BYTES
+    from input_latency import InputStamp
+    from sound_cache import SoundCache
+
+    tmpdir = tempfile.mkdtemp(prefix='audio_bench_')
+    path = args.file
+    if not path:
+        path = os.path.join(tmpdir, 'long_message.wav')
+        make_long_wav(pygame, path, args.minutes)
+    size = os.path.getsize(path)
+    print(f"  ファイル: {size / 1024 / 1024:.1f}MB / 再生: {args.listen}秒 / 回数: {args.count}")
+
+    # ストリーミングを先に計測する（Sound で確保したメモリが後の計測に残らないように）
+    for label, threshold in (("ストリーミング", STREAM_WAV_BYTES), ("Sound 一括", 0)):
+        starts, peaks = [], []
+        for _ in range(args.count):
+            mgr = SequentialAudioManager(gap=0.0, sound_cache=SoundCache(), stream_wav_bytes=threshold)
+            base = rss_bytes()
+            peak = [base]
+            done = threading.Event()
+
+            def sample():
+                while not done.wait(0.02):
+                    peak[0] = max(peak[0], rss_bytes())
+
+            sampler = threading.Thread(target=sample, daemon=True)
+            sampler.start()
+            mgr.mark_input(InputStamp(time.monotonic(), 'playing_message'))
+            mgr.play("file", path)
+            mgr.mark_input(None)
+            time.sleep(args.listen)
+            mgr.stop_immediately()
+            mgr.join(timeout=5)
+            done.set()
+            sampler.join()
+            starts.append(mgr.input_latency.report()['all']['p50'])
+            peaks.append(peak[0] - base)
+            del mgr
+        report_ms(f"{label} 再生開始まで", starts)
+        print(f"  {label} メモリ増加: 最大 {max(peaks) / 1024 / 1024:.1f}MB")
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ========== 10. 方角通知 ==========
+def legacy_direction(pygame, groups, path, card):
+    """従来の方角通知（一時停止 → amixer → 0.2秒待ち → WAV 読み込み → 再生 → 終了待ち → amixer で戻す）
+
+    amixer がない環境ではプロセス起動の代わりに true を起動する。
+    戻り値は (要求 → 再生開始, 要求 → 処理終了) の秒数。
+    """
+    amixer = ['amixer', '-c', card, 'sset', 'PCM'] if shutil.which('amixer') else ['true']
+    start = time.monotonic()
+    paused = groups['ui'].pause() + groups['content'].pause()
+    subprocess.run(amixer + (['100%'] if amixer[0] == 'amixer' else []), capture_output=True, text=True)
+    time.sleep(0.2)
+    sound = pygame.mixer.Sound(path)
+    channel = groups['alert'].play(sound)
+    started = time.monotonic() - start
+    while channel.get_busy():
+        time.sleep(0.05)
+    for control in ('PCM', 'Master'):
+        subprocess.run(amixer[:4] + [control, '50%'] if amixer[0] == 'amixer' else amixer,
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    for c in paused:
+        c.unpause()
+    return started, time.monotonic() - start
+
+
+def bench_direction(args):
+    """再生中のコンテンツに方角通知を割り込ませたときの、要求から通知音までの時間"""
+    section("方角通知（amixer + 一時停止 vs ソフトウェアゲイン + ダッキング）")
+    pygame = init_mixer(args)
+    from audio_manager import SequentialAudioManager
+    from direction_alert import DirectionAlerts, DIRECTIONS
+    from input_latency import InputStamp
+
+    tmpdir = tempfile.mkdtemp(prefix='audio_bench_')
+    direction_dir = os.path.join(tmpdir, 'direction')
+    os.makedirs(direction_dir)
+    clip = make_wav_files(pygame, tmpdir, 1, args.clip)[0]
+    for direction in DIRECTIONS:
+        shutil.copy(clip, os.path.join(direction_dir, f'{direction}.wav'))
+    content = make_tone(pygame, 5.0, freq=220.0)
+    print(f"  回数: {args.count} / 通知の長さ: {args.clip * 1000:.0f}ms"
+          f"{'' if shutil.which('amixer') else '（amixer がないため従来方式は true の起動で代用）'}")
+
+    mgr = SequentialAudioManager(gap=0.0)
+    alerts = DirectionAlerts(mgr, tmpdir)
+    alerts.load()
+
+    legacy_start, legacy_total, new_call = [], [], []
+    path = alerts.path('north')
+    for _ in range(args.count):
+        mgr.play("sound", content)
+        time.sleep(0.3)
+        started, total = legacy_direction(pygame, mgr.groups, path, os.getenv('SPEAKER_CARD', '0'))
+        legacy_start.append(started)
+        legacy_total.append(total)
+
+        time.sleep(0.3)
+        start = time.monotonic()
+        mgr.mark_input(InputStamp(start, 'direction', 'north'))
+        alerts.play('north')
+        mgr.mark_input(None)
+        new_call.append(time.monotonic() - start)
+        time.sleep(args.clip + 0.3)
+        mgr.stop_immediately()
+        mgr.join(timeout=5)
+
+    report_ms("従来: 要求 → 通知音", legacy_start)
+    report_ms("従来: 要求 → 応答（処理時間）", legacy_total)
+    # 新方式の通知音までの時間は本体の /stats と同じ集計から
+    s = mgr.input_latency.report()['by_menu']['direction']
+    print(f"  新方式: 要求 → 通知音: n={s['count']} p50={s['p50'] * 1000:.1f}ms "
+          f"p95={s['p95'] * 1000:.1f}ms max={s['max'] * 1000:.1f}ms")
+    report_ms("新方式: 要求 → 応答（処理時間）", new_call)
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ========== 11. ハードウェア音量の変更 ==========
+def bench_mixer(args):
+    """音量ボタン長押しを模して、amixer を毎回起動する方式とミキサー制御の反映時間を比較"""
+    section("ハードウェア音量の変更（amixer 毎回起動 vs ミキサー制御）")
+    from mixer_control import MixerController, has_alsaaudio
+    if not shutil.which('amixer') and not has_alsaaudio():
+        print("  ⚠️ amixer / pyalsaaudio がないため計測できません")
+        return
+
+    levels = [50 + (i % 10) * 5 for i in range(args.steps)]
+    print(f"  カード: {args.card} / 変更: {args.steps}回 / 間隔: {args.interval * 1000:.0f}ms")
+
+    forked = []
+    if shutil.which('amixer'):
+        for level in levels:
+            start = time.monotonic()
+            subprocess.run(['amixer', '-c', args.card, 'sset', args.control, f'{level}%'],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            forked.append(time.monotonic() - start)
+            time.sleep(args.interval)
+        report_ms("amixer 毎回起動（呼び出し側の待ち）", forked)
+
+    mixer = MixerController(args.card)
+    calls = []
+    for level in levels:
+        start = time.monotonic()
+        mixer.set_volume(level)
+        calls.append(time.monotonic() - start)
+        time.sleep(args.interval)
+    mixer.wait(timeout=5)
+    report_ms("ミキサー制御（呼び出し側の待ち）", calls)
+    report_ms("ミキサー制御（要求 → 反映）", list(mixer.latency))
+    stats = mixer.stats()
+    print(f"  プロセス起動: 従来 {len(forked)}回 / ミキサー制御 {stats['forks']}回 "
+          f"/ 反映 {stats['changes']}回 / まとめた要求 {stats['coalesced']}回 / 読み戻し {stats['level']}%")
+    mixer.close()
+
+
+# ========== 12. 入力ループの起床回数 ==========
+def legacy_select_loop(fd, handle, stop):
+    """従来の入力ループ（0.1秒タイムアウトの select で起きてタイムアウト判定を行う）"""
+    import select
+    while not stop.is_set():
+        r, _, _ = select.select([fd], [], [], 0.1)
+        if r:
+            handle(os.read(fd, 64))
+
+
+def asyncio_reader_loop(fd, handle, stop):
+    """asyncio の入力ループ（evdev の async_read_loop と同じく fd をループに登録して待つ）"""
+    import asyncio
+    import threading
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        stopped = loop.create_future()
+        loop.add_reader(fd, lambda: handle(os.read(fd, 64)))
+        # stop がセットされたらループを抜ける（待つのは別のスレッド）
+        threading.Thread(target=lambda: (stop.wait(), loop.call_soon_threadsafe(stopped.set_result, True)),
+                         daemon=True).start()
+        await stopped
+        loop.remove_reader(fd)
+    asyncio.run(run())
+
+
+def bench_loop(args):
+    """入力ループのスレッドが何もしていない間に起きる回数と、入力 → ハンドラまでの時間を比較"""
+    section("入力ループ（select 0.1秒タイムアウト vs asyncio）")
+    import threading
+    from event_loop import thread_wakeups
+
+    print(f"  待機: {args.idle}秒 / 入力: {args.events}回（間隔 {args.interval * 1000:.0f}ms）")
+    for label, run in (("select 0.1秒タイムアウト", legacy_select_loop), ("asyncio", asyncio_reader_loop)):
+        r, w = os.pipe()
+        stop = threading.Event()
+        sent = []
+        dispatch = []
+        native = []
+
+        def handle(data):
+            dispatch.append(time.monotonic() - sent[len(dispatch)])
+
+        def target():
+            native.append(threading.get_native_id())
+            run(r, handle, stop)
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        time.sleep(0.2)
+
+        before = thread_wakeups(native[0])
+        time.sleep(args.idle)
+        after = thread_wakeups(native[0])
+        for _ in range(args.events):
+            sent.append(time.monotonic())
+            os.write(w, b'k')
+            time.sleep(args.interval)
+        stop.set()
+        thread.join(timeout=2)
+        os.close(r)
+        os.close(w)
+
+        if before is None or after is None:
+            print(f"  {label}: /proc がないため起床回数は計測できません")
+        else:
+            print(f"  {label}: 待機中の起床 {(after - before) / args.idle:.1f}回/秒")
+        report_ms(f"{label}（入力 → ハンドラ）", dispatch)
+
+
+# ========== 13. ノブの加速 ==========
+def knob_navigators(args):
+    from knob_navigation import KnobNavigator
+    # 従来: 加速なし（3クリックで1項目）、動くたびにすぐ読み上げ
+    return (("従来", KnobNavigator(threshold=args.threshold, max_gain=1.0, settle=0.0)),
+            ("加速・停止後に読み上げ", KnobNavigator(threshold=args.threshold, settle=args.settle)))
+
+
+def replay_knob(navigator, clicks, items, start, target=None):
+    """
+    クリック列 [(時刻, 方向)] を navigator に通す。
+    (最後の位置, 読み上げ回数, 最後に動いた時刻, 目的の項目の読み上げが始まる時刻) を返す。
+    settle が 0 なら動くたびに読み上げ、それ以外は次に動くまで settle 秒以上空いたときだけ読み上げる
+    """
+    from knob_navigation import advance
+    pos, announced, last_move, reached = start, 0, None, None
+    for at, direction in clicks:
+        steps = navigator.rotate(direction, at, items)
+        if not steps:
+            continue
+        if last_move is not None and navigator.settle > 0 and at - last_move >= navigator.settle:
+            announced += 1  # 前に止まった位置を読み上げた
+        pos = advance(pos, steps, items, wrap=not navigator.fast)
+        last_move = at
+        if navigator.settle == 0:
+            announced += 1
+        if pos == target:
+            if reached is None:
+                reached = at + navigator.settle
+        else:
+            reached = None
+    if last_move is not None and navigator.settle > 0:
+        announced += 1
+    navigator.reset()
+    return pos, announced, last_move, reached
+
+
+def simulate_reach(navigator, items, start, target, fast_rate, slow_rate, near, limit=5000):
+    """目的の項目まで、遠いうちは fast_rate、near 項目以内は slow_rate で回すユーザーのクリック列"""
+    from knob_navigation import advance
+    clicks, pos, t = [], start, 0.0
+    for _ in range(limit):
+        remaining = target - pos
+        if remaining == 0:
+            break
+        direction = 1 if remaining > 0 else -1
+        t += 1.0 / (fast_rate if abs(remaining) > near else slow_rate)
+        clicks.append((t, direction))
+        steps = navigator.rotate(direction, t, items)
+        if steps:
+            pos = advance(pos, steps, items, wrap=not navigator.fast)
+    navigator.reset()
+    return clicks
+
+
+# ノブが送るキー（KEY_VOLUMEUP / KEY_VOLUMEDOWN のコード）→ 回す向き
+KNOB_CODES = {115: 1, 114: -1}
+
+
+def load_knob_trace(path):
+    """入力の記録（keyboard_test_v2.py --record-input、input_trace.py）からノブのクリック列を読む"""
+    from input_trace import load_trace
+    _, events, _ = load_trace(path)
+    return [(float(event['t']), KNOB_CODES[event['code']]) for event in events
+            if event['code'] in KNOB_CODES and event['value'] == 1]
+
+
+def bench_knob(args):
+    """長い一覧で目的の項目に着くまでの時間と読み上げ回数を、従来の移動量と比較"""
+    section("ノブの加速（目的の項目までの時間）")
+    if args.trace:
+        target = args.targets[0] if args.targets else None
+        clicks = load_knob_trace(args.trace)
+        print(f"  記録: {args.trace}（{len(clicks)}クリック）/ 一覧: {args.items}件 / 開始: {args.start}")
+        for label, navigator in knob_navigators(args):
+            pos, announced, last_move, reached = replay_knob(navigator, clicks, args.items, args.start, target)
+            reach = f" / 目的 {target} に {reached:.2f}秒" if reached is not None else ""
+            print(f"  {label}: 最後の位置 {pos} / 読み上げ {announced}回{reach}")
+        return
+
+    print(f"  一覧: {args.items}件 / 開始: {args.start} / 回す速さ: {args.fast}クリック/秒"
+          f"（残り{args.near}項目からは {args.slow}クリック/秒）")
+    for target in args.targets or [10, 50, 150, args.items - 1]:
+        results = []
+        for label, navigator in knob_navigators(args):
+            clicks = simulate_reach(navigator, args.items, args.start, target, args.fast, args.slow, args.near)
+            pos, announced, _, reached = replay_knob(navigator, clicks, args.items, args.start, target)
+            results.append(f"{label} {reached or 0:.1f}秒・{len(clicks)}クリック・読み上げ{announced}回")
+        print(f"  → {target}: " + " / ".join(results))
+
+
+def main():
+    from audio_output import OUTPUT_BACKENDS, DEFAULT_RECORD_PATH
+
+    parser = argparse.ArgumentParser(description="音声再生ベンチマーク")
+    parser.add_argument('--real', action='store_true', help="実デバイスで計測する（--output pygame と同じ）")
+    parser.add_argument('--output', choices=OUTPUT_BACKENDS, default='null', help="音声出力バックエンド")
+    parser.add_argument('--speed', type=float, default=1.0, help="null / file 出力の時間の倍率")
+    parser.add_argument('--record', default=DEFAULT_RECORD_PATH, help="file 出力の保存先 WAV")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('gap', help="クリップ間の無音時間を計測")
+    p.add_argument('--count', type=int, default=20)
+    p.add_argument('--gap', type=float, default=0.2)
+    p.add_argument('--clip', type=float, default=0.15)
+    p.set_defaults(func=bench_gap)
+
+    p = sub.add_parser('ttfa', help="再生開始までの時間を ffplay と比較")
+    p.add_argument('--source', required=True, help="m4a / mp3 ファイルまたは URL")
+    p.add_argument('--count', type=int, default=5)
+    p.set_defaults(func=bench_ttfa)
+
+    p = sub.add_parser('queue', help="優先クラス別の待ち時間を計測")
+    p.add_argument('--steps', type=int, default=10, help="「決定」前のノブ回転ステップ数")
+    p.add_argument('--interval', type=float, default=0.05, help="回転ステップの間隔（秒）")
+    p.add_argument('--rounds', type=int, default=3)
+    p.add_argument('--gap', type=float, default=0.2)
+    p.set_defaults(func=bench_queue)
+
+    p = sub.add_parser('cache', help="Sound キャッシュのヒット率と読み込み時間を計測")
+    p.add_argument('--dir', help="WAVファイルのディレクトリ（省略時は計測用に生成）")
+    p.add_argument('--passes', type=int, default=3)
+    p.add_argument('--budget-mb', type=float, default=64)
+    p.set_defaults(func=bench_cache)
+
+    p = sub.add_parser('sequence', help="案内音から本文までの間隔を計測")
+    p.add_argument('--cue', help="案内音の WAV（省略時は計測用に生成）")
+    p.add_argument('--count', type=int, default=10)
+    p.add_argument('--gap', type=float, default=0.15)
+    p.add_argument('--clip', type=float, default=0.5, help="本文の長さ（秒）")
+    p.set_defaults(func=bench_sequence)
+
+    p = sub.add_parser('stress', help="再生・停止・キャンセルを連打して整合性を確認")
+    p.add_argument('--ops', type=int, default=4000, help="操作の総数")
+    p.add_argument('--threads', type=int, default=4)
+    p.add_argument('--interval', type=float, default=0.002, help="操作間の最大待ち時間（秒）")
+    p.add_argument('--clip', type=float, default=0.02, help="再生する音の長さ（秒）")
+    p.set_defaults(func=bench_stress)
+
+    p = sub.add_parser('input', help="キー入力から最初の音までの時間を計測")
+    p.add_argument('--steps', type=int, default=20, help="ノブ回転ステップ数")
+    p.add_argument('--interval', type=float, default=0.3, help="回転ステップの間隔（秒）")
+    p.add_argument('--gap', type=float, default=0.2)
+    p.set_defaults(func=bench_input)
+
+    p = sub.add_parser('startup', help="起動時の音声ロードを WAV 個別と音声パックで比較")
+    p.add_argument('--dir', help="WAVファイルのディレクトリ（省略時は計測用に26個生成）")
+    p.add_argument('--rate', type=int, default=16000, help="生成する WAV のサンプルレート（Polly 出力は 16000）")
+    p.add_argument('--count', type=int, default=5)
+    p.add_argument('--drop-caches', action='store_true', help="毎回ページキャッシュを捨ててコールドスタートを計測（root）")
+    p.set_defaults(func=bench_startup)
+
+    p = sub.add_parser('longwav', help="長い WAV の再生開始時間とメモリを Sound とストリーミングで比較")
+    p.add_argument('--file', help="WAVファイル（省略時は計測用に生成）")
+    p.add_argument('--minutes', type=float, default=10, help="生成する WAV の長さ（分）")
+    p.add_argument('--listen', type=float, default=3, help="再生して止めるまでの秒数")
+    p.add_argument('--count', type=int, default=3)
+    p.set_defaults(func=bench_longwav)
+
+    p = sub.add_parser('direction', help="方角通知の要求から通知音までの時間を従来方式と比較")
+    p.add_argument('--count', type=int, default=10)
+    p.add_argument('--clip', type=float, default=0.6, help="通知音声の長さ（秒）")
+    p.set_defaults(func=bench_direction)
+
+    p = sub.add_parser('mixer', help="ハードウェア音量の変更時間を amixer 毎回起動と比較")
+    p.add_argument('--card', default=os.getenv('SPEAKER_CARD', '0'))
+    p.add_argument('--control', default='PCM', help="amixer 毎回起動で使うコントロール名")
+    p.add_argument('--steps', type=int, default=20)
+    p.add_argument('--interval', type=float, default=0.0, help="変更の間隔（秒。0 で連打）")
+    p.set_defaults(func=bench_mixer)
+
+    p = sub.add_parser('loop', help="入力ループの待機中の起床回数と入力 → ハンドラの時間を select 方式と比較")
+    p.add_argument('--idle', type=float, default=5, help="待機中の起床回数を数える秒数")
+    p.add_argument('--events', type=int, default=50, help="入力の回数")
+    p.add_argument('--interval', type=float, default=0.05, help="入力の間隔（秒）")
+    p.set_defaults(func=bench_loop)
+
+    p = sub.add_parser('knob', help="ノブを回して目的の項目に着くまでの時間を従来の移動量と比較")
+    p.add_argument('--items', type=int, default=300, help="一覧の件数")
+    p.add_argument('--start', type=int, default=0)
+    p.add_argument('--target', type=int, nargs='+', dest='targets',
+                   help="目的の項目（省略時は 10 50 150 と最後の項目。--trace では最初の1つ）")
+    p.add_argument('--threshold', type=int, default=3, help="1項目に必要なクリック数")
+    p.add_argument('--fast', type=float, default=25.0, help="遠いうちに回す速さ（クリック/秒）")
+    p.add_argument('--slow', type=float, default=4.0, help="近づいてから回す速さ（クリック/秒）")
+    p.add_argument('--near', type=int, default=3, help="ゆっくり回し始める残りの項目数")
+    p.add_argument('--settle', type=float, default=0.3, help="止まってから読み上げるまでの秒数（NAV_SETTLE）")
+    p.add_argument('--trace', help="入力の記録（--record-input の JSON Lines）を再生して比較")
+    p.set_defaults(func=bench_knob)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+圧縮音声（m4a / mp3 / URL）と長い WAV のストリーミングデコードモジュール
+
+ffplay のように再生ごとに SDL/ALSA を初期化せず、デコードした PCM を
+初期化済みの pygame.mixer のチャンネルへチャンク単位で流し込む。
+
+デコーダーは PyAV（pip install av）があればプロセス内で、
+なければ ffmpeg をデコード専用（音声デバイスを開かない）で使用する。
+ミキサーと同じ形式の WAV はデコーダーを使わず、ファイルから PCM をそのまま読む。
+"""
+
+import time
+import wave
+import shutil
+import threading
+import subprocess
+
+import pygame
+
+# 最初のチャンクは短くして再生開始を早める（秒）
+FIRST_CHUNK_SEC = 0.25
+# 2つ目以降のチャンク長（秒）
+CHUNK_SEC = 1.0
+
+
+class FFmpegSource:
+    """ffmpeg をデコード専用で起動し、標準出力から PCM を読む"""
+    def __init__(self, src, rate, channels, start=0.0):
+        cmd = ['ffmpeg', '-nostdin', '-loglevel', 'error']
+        if start > 0:
+            cmd += ['-ss', f'{start:.3f}']
+        cmd += ['-i', src, '-vn', '-f', 's16le', '-acodec', 'pcm_s16le',
+                '-ar', str(rate), '-ac', str(channels), '-']
+        self.process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+
+    def read(self, nbytes):
+        return self.process.stdout.read(nbytes)
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.terminate()
+                self.process.wait(timeout=0.5)
+            except Exception:
+                pass
+
+    def interrupt(self):
+        """別スレッドから読み込み待ちを解除する"""
+        self.close()
+
+
+class PyAVSource:
+    """PyAV でプロセス内デコードし、ミキサーのフォーマットへリサンプルする"""
+    def __init__(self, src, rate, channels, start=0.0):
+        import av
+        self.container = av.open(src)
+        self.stream = self.container.streams.audio[0]
+        if start > 0:
+            self.container.seek(int(start / self.stream.time_base), stream=self.stream)
+        self.frame_bytes = 2 * channels
+        self.resampler = av.AudioResampler(format='s16', layout='stereo' if channels == 2 else 'mono', rate=rate)
+        self.frames = self.container.decode(self.stream)
+        self.buffer = bytearray()
+        self.flushed = False
+
+    def read(self, nbytes):
+        while len(self.buffer) < nbytes:
+            try:
+                frame = next(self.frames)
+            except StopIteration:
+                if self.flushed:
+                    break
+                # リサンプラーに残っている末尾のサンプルを取り出す
+                self.flushed = True
+                frame = None
+            for out in self.resampler.resample(frame):
+                self.buffer += bytes(out.planes[0])[:out.samples * self.frame_bytes]
+        data = bytes(self.buffer[:nbytes])
+        del self.buffer[:nbytes]
+        return data
+
+    def close(self):
+        try:
+            self.container.close()
+        except Exception:
+            pass
+
+    def interrupt(self):
+        # デコード中のコンテナを別スレッドから閉じると落ちるため、
+        # 閉じるのはデコードスレッド側に任せる
+        pass
+
+
+class WaveSource:
+    """ミキサーと同じ形式の WAV から PCM をそのまま読む（変換なし）"""
+    def __init__(self, src, rate, channels, start=0.0):
+        self.wav = wave.open(src, 'rb')
+        if start > 0:
+            self.wav.setpos(min(int(start * rate), self.wav.getnframes()))
+        self.frame_bytes = 2 * channels
+
+    def read(self, nbytes):
+        return self.wav.readframes(nbytes // self.frame_bytes)
+
+    def close(self):
+        try:
+            self.wav.close()
+        except Exception:
+            pass
+
+    def interrupt(self):
+        # 読み込みはすぐ終わるので、止めるのはデコードスレッド側に任せる
+        pass
+
+
+def is_mixer_wav(src, rate, channels):
+    """ミキサーと同じ形式（16bit、同じレート・チャンネル数）の WAV ファイルか"""
+    if not src.lower().endswith('.wav'):
+        return False
+    try:
+        with wave.open(src, 'rb') as w:
+            return (w.getframerate(), w.getnchannels(), w.getsampwidth()) == (rate, channels, 2)
+    except (wave.Error, EOFError, OSError):
+        return False
+
+
+def has_pyav():
+    try:
+        import av  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def decoder_available():
+    """ストリーミングデコードが使えるか（PyAV または ffmpeg）"""
+    return has_pyav() or shutil.which('ffmpeg') is not None
+
+
+def open_source(src, rate, channels, start=0.0):
+    """利用可能なデコーダーでソースを開く（ミキサー形式の WAV はそのまま読む）"""
+    if is_mixer_wav(src, rate, channels):
+        return WaveSource(src, rate, channels, start)
+    if has_pyav():
+        try:
+            return PyAVSource(src, rate, channels, start)
+        except Exception as e:
+            print(f"⚠️ PyAVで開けません。ffmpegで再試行: {e}")
+    return FFmpegSource(src, rate, channels, start)
+
+
+class DecoderStream:
+    """デコードした PCM を pygame チャンネルへ順次キューイングして再生する"""
+    def __init__(self, src, channel, start=0.0):
+        self.src = src
+        self.channel = channel
+        self.rate, _, self.channels = pygame.mixer.get_init()
+        self.frame_bytes = 2 * self.channels
+        self.started_at = time.monotonic()
+        self.first_audio_at = None
+        self.first_audio = threading.Event()  # 最初のチャンクを再生開始したら set
+        self.finished = threading.Event()     # 再生終了または停止で set
+        self._source = None
+        self._start = start
+        self._fed = start           # デコード済み（チャンネルへ渡した）秒数
+        self._scheduled_end = 0.0   # 渡した音声がすべて鳴り終わる予定時刻
+        self._last_chunk = 0.0      # 最後に渡したチャンクの長さ
+        self._paused_at = None
+        self._seek_to = None
+        self._stopped = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._feed, daemon=True)
+        self._thread.start()
+
+    # ----- 操作 -----
+    def pause(self):
+        if self._paused_at is None:
+            self.channel.pause()
+            self._paused_at = time.monotonic()
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._scheduled_end += time.monotonic() - self._paused_at
+            self._paused_at = None
+            self.channel.unpause()
+            self._wake.set()
+
+    def seek(self, seconds):
+        """再生位置を移動（出力チャンネルはそのまま、デコード位置だけ変える）"""
+        self._seek_to = max(0.0, seconds)
+        self._wake.set()
+
+    def stop(self):
+        self._stopped = True
+        self.channel.stop()
+        if self._source:
+            self._source.interrupt()
+        self._wake.set()
+        self.finished.set()
+
+    def wait(self):
+        self.finished.wait()
+
+    def position(self):
+        """現在の再生位置（秒）"""
+        now = self._paused_at or time.monotonic()
+        return max(0.0, self._fed - max(0.0, self._scheduled_end - now))
+
+    @property
+    def paused(self):
+        return self._paused_at is not None
+
+    # ----- デコードスレッド -----
+    def _feed(self):
+        try:
+            self._source = open_source(self.src, self.rate, self.channels, self._start)
+            chunk_sec = FIRST_CHUNK_SEC
+            eof = False
+            while not self._stopped:
+                if self._seek_to is not None:
+                    self._restart(self._seek_to)
+                    chunk_sec = FIRST_CHUNK_SEC
+                    eof = False
+                    continue
+
+                if self._paused_at is not None:
+                    self._sleep(None)
+                    continue
+
+                if eof:
+                    # 最後のチャンクが鳴り終わるまで待つ
+                    if not self.channel.get_busy():
+                        break
+                    self._sleep(self._scheduled_end - time.monotonic())
+                    continue
+
+                # チャンネルには「再生中」と「次」の2つまでしか積めない
+                if self.channel.get_busy() and self.channel.get_queue() is not None:
+                    # 再生中のチャンクが終わる予定時刻まで眠る
+                    self._sleep(self._scheduled_end - self._last_chunk - time.monotonic())
+                    continue
+
+                data = self._source.read(int(self.rate * chunk_sec) * self.frame_bytes)
+                data = data[:len(data) - len(data) % self.frame_bytes]
+                if not data:
+                    eof = True
+                    continue
+                if self._stopped or self._seek_to is not None:
+                    continue
+                self._enqueue(data)
+                chunk_sec = CHUNK_SEC
+        except Exception as e:
+            print(f"❌ デコードエラー: {e}")
+        finally:
+            if self._source:
+                self._source.close()
+            self.finished.set()
+
+    def _sleep(self, timeout):
+        """操作（停止・一時停止解除・シーク）か予定時刻まで眠る"""
+        self._wake.wait(None if timeout is None else max(timeout, 0.01))
+        self._wake.clear()
+
+    def _restart(self, seconds):
+        """デコーダーを指定位置から開き直す"""
+        self.channel.stop()
+        if self._source:
+            self._source.close()
+        self._seek_to = None
+        self._fed = seconds
+        self._scheduled_end = 0.0
+        self._source = open_source(self.src, self.rate, self.channels, seconds)
+
+    def _enqueue(self, data):
+        sound = pygame.mixer.Sound(buffer=data)
+        duration = len(data) / (self.rate * self.frame_bytes)
+        now = time.monotonic()
+        if self.channel.get_busy():
+            self.channel.queue(sound)
+            self._scheduled_end = max(self._scheduled_end, now) + duration
+        else:
+            self.channel.play(sound)
+            self._scheduled_end = now + duration
+        self._fed += duration
+        self._last_chunk = duration
+        if self.first_audio_at is None:
+            self.first_audio_at = now
+            self.first_audio.set()
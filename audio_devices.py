@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+オーディオデバイス（ALSA カード）の検出モジュール
+
+aplay -l / arecord -l を起動して出力（ロケールで「カード」/「card」が変わる）を解析する代わりに、
+/proc/asound/cards と /proc/asound/pcm を直接読む。
+解析結果は2つのファイルの内容のハッシュをキーに保持し、内容が変わらなければ読み直すだけで済ませる。
+
+CardWatcher はカードの抜き差しを監視し（カーネルの uevent を待ち受け、使えなければ一定間隔で読み直す）、
+SPEAKER_CARD / MIC_CARD を再起動せずに選び直せるようにする。
+
+  python3 audio_devices.py          # カード一覧と自動選択の結果を表示
+  python3 audio_devices.py --watch  # 抜き差しを監視して表示
+"""
+
+import os
+import time
+import socket
+import hashlib
+import argparse
+import threading
+from collections import namedtuple
+
+ASOUND_DIR = '/proc/asound'
+
+# 自動選択で除外する内蔵オーディオ（名前に含まれる文字列）
+INTERNAL_CARDS = ('bcm2835', 'vc4', 'hdmi')
+
+# 抜き差しの監視間隔（秒）。uevent を受け取れない環境では /proc/asound を読み直して比べる
+# （/proc は inotify で変更を検出できない）
+WATCH_INTERVAL = 1.0
+
+# カーネルの uevent を受け取る netlink（待ち受けている間はスレッドが起きない）
+NETLINK_KOBJECT_UEVENT = 15
+# sound の uevent から /proc/asound に反映されるまでの待ち（秒）
+UEVENT_SETTLE = 0.5
+
+# number はカード番号（文字列。hw:{number},0 の形で使う）、playback / capture は PCM デバイス数
+Card = namedtuple('Card', 'number id driver name playback capture')
+
+_cache = (None, [])  # (内容のハッシュ, カード一覧)
+_cache_lock = threading.Lock()
+
+
+def _read(path):
+    try:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            return f.read()
+    except OSError:
+        return ''
+
+
+def read_asound(asound_dir=ASOUND_DIR):
+    """/proc/asound/cards と pcm の内容を返す（なければ空文字列）"""
+    return _read(os.path.join(asound_dir, 'cards')), _read(os.path.join(asound_dir, 'pcm'))
+
+
+def content_hash(cards_text, pcm_text):
+    return hashlib.sha1((cards_text + '\0' + pcm_text).encode('utf-8')).hexdigest()
+
+
+def parse_cards(text):
+    """
+    /proc/asound/cards を解析して [(番号, ID, ドライバー, 名前)] を返す。
+    各カードは " 2 [Luna           ]: USB-Audio - eMeet Luna" の行と、続く詳細の行からなる。
+    """
+    cards = []
+    for line in text.splitlines():
+        head, sep, rest = line.partition(']:')
+        number, bracket, card_id = head.partition('[')
+        if not sep or not bracket or not number.strip().isdigit():
+            continue
+        driver, _, name = rest.partition(' - ')
+        cards.append((number.strip(), card_id.strip(), driver.strip(), name.strip()))
+    return cards
+
+
+def parse_pcm(text):
+    """
+    /proc/asound/pcm を解析してカード番号ごとの再生・録音デバイス数を返す。
+    各行は "02-00: USB Audio : USB Audio : playback 1 : capture 1" の形。
+    """
+    streams = {}
+    for line in text.splitlines():
+        card, sep, _ = line.partition('-')
+        if not sep or not card.isdigit():
+            continue
+        counts = streams.setdefault(str(int(card)), {'playback': 0, 'capture': 0})
+        for field in line.split(' : ')[1:]:
+            kind = field.split()[0] if field.split() else ''
+            if kind in counts:
+                counts[kind] += 1
+    return streams
+
+
+def list_cards(asound_dir=ASOUND_DIR):
+    """カード一覧（Card のリスト）。内容が前回と同じなら解析し直さない"""
+    global _cache
+    cards_text, pcm_text = read_asound(asound_dir)
+    key = content_hash(cards_text, pcm_text)
+    with _cache_lock:
+        if _cache[0] == key:
+            return _cache[1]
+    streams = parse_pcm(pcm_text)
+    cards = []
+    for number, card_id, driver, name in parse_cards(cards_text):
+        counts = streams.get(number, {})
+        cards.append(Card(number, card_id, driver, name, counts.get('playback', 0), counts.get('capture', 0)))
+    with _cache_lock:
+        _cache = (key, cards)
+    return cards
+
+
+def is_internal(card):
+    text = f"{card.id} {card.driver} {card.name}".lower()
+    return any(word in text for word in INTERNAL_CARDS)
+
+
+def pick_card(cards, stream='playback'):
+    """
+    USB 接続などの外付けデバイスを優先してカード番号を選ぶ（bcm2835 等の内蔵を除外）。
+    stream は 'playback'（スピーカー）か 'capture'（マイク）。外付けがなければ最初のカード。
+    """
+    usable = [card for card in cards if getattr(card, stream) > 0]
+    for card in usable:
+        if not is_internal(card):
+            return card.number
+    return usable[0].number if usable else None
+
+
+def resolve(setting, stream='playback', cards=None):
+    """
+    SPEAKER_CARD / MIC_CARD の設定値からカード番号を決める。
+    'auto' なら自動選択、カード ID（例: Luna）ならその番号、それ以外（番号）はそのまま返す。
+    見つからなければ None。
+    """
+    setting = str(setting).strip()
+    if setting.lower() != 'auto' and setting.lstrip('-').isdigit():
+        return setting
+    cards = list_cards() if cards is None else cards
+    if setting.lower() == 'auto':
+        return pick_card(cards, stream)
+    for card in cards:
+        if card.id.lower() == setting.lower():
+            return card.number
+    return None
+
+
+def open_uevent_socket():
+    """カーネルの uevent を受け取るソケット（使えなければ None）"""
+    try:
+        sock = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+        sock.bind((0, 1))
+        return sock
+    except (AttributeError, OSError):
+        return None
+
+
+class CardWatcher:
+    """カードの抜き差しを監視し、変わったら on_change(カード一覧) を呼ぶ"""
+    def __init__(self, on_change, interval=WATCH_INTERVAL, asound_dir=ASOUND_DIR):
+        self.on_change = on_change
+        self.interval = interval
+        self.asound_dir = asound_dir
+        self.changes = 0  # 検出した変化の回数
+        self.mode = None  # 'uevent'（待ち受け）/ 'poll'（一定間隔で読み直し）
+        self._last = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        self._last = content_hash(*read_asound(self.asound_dir))
+        sock = open_uevent_socket()
+        self.mode = 'uevent' if sock else 'poll'
+        if sock:
+            with sock:
+                while not self._stop.is_set():
+                    if b'SUBSYSTEM=sound' not in sock.recv(65536):
+                        continue
+                    # 1回の抜き差しで複数届くので、落ち着いてからまとめて確認
+                    self._stop.wait(UEVENT_SETTLE)
+                    sock.setblocking(False)
+                    try:
+                        while sock.recv(65536):
+                            pass
+                    except BlockingIOError:
+                        pass
+                    sock.setblocking(True)
+                    self._check()
+        else:
+            while not self._stop.wait(self.interval):
+                self._check()
+
+    def _check(self):
+        key = content_hash(*read_asound(self.asound_dir))
+        if key == self._last:
+            return
+        self._last = key
+        self.changes += 1
+        try:
+            self.on_change(list_cards(self.asound_dir))
+        except Exception as e:
+            print(f"⚠️ デバイス変更の処理に失敗しました: {e}")
+
+
+def describe(cards):
+    """カード一覧の表示用の行"""
+    lines = []
+    for card in cards:
+        streams = []
+        if card.playback:
+            streams.append(f"再生 {card.playback}")
+        if card.capture:
+            streams.append(f"録音 {card.capture}")
+        mark = " (内蔵)" if is_internal(card) else ""
+        lines.append(f"カード {card.number}: {card.id} - {card.name}{mark} [{' / '.join(streams) or 'PCM なし'}]")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description="/proc/asound からオーディオデバイスを表示")
+    parser.add_argument('--watch', action='store_true', help="抜き差しを監視して表示")
+    args = parser.parse_args()
+
+    def show(cards):
+        if not os.path.isdir(ASOUND_DIR):
+            print(f"❌ {ASOUND_DIR} がありません（ALSA のない環境）")
+        for line in describe(cards):
+            print(f"  {line}")
+        print(f"  → スピーカー: {pick_card(cards, 'playback')} / マイク: {pick_card(cards, 'capture')}")
+
+    start = time.perf_counter()
+    cards = list_cards()
+    elapsed = time.perf_counter() - start
+    show(cards)
+    print(f"  （読み込み {elapsed * 1000:.2f}ms）")
+
+    if args.watch:
+        print("抜き差しを監視しています（Ctrl+C で終了）...")
+        CardWatcher(lambda cards: (print("🔌 デバイスが変わりました"), show(cards))).start()
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,662 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音声再生キュー管理モジュール
+
+keyboard_test_v2.py から利用する SequentialAudioManager を提供する。
+pygame.mixer は呼び出し側で初期化済みであることを前提とする。
+"""
+
+import os
+import time
+import queue
+import heapq
+import itertools
+import threading
+import subprocess
+from collections import deque
+
+import pygame
+
+from audio_decoder import DecoderStream, decoder_available, is_mixer_wav
+from audio_output import time_scale
+from input_latency import LatencyHistogram
+from mixer_channels import init_channel_groups, VolumeRamp
+from sound_cache import SoundCache
+
+# 再生間隔のデフォルト（秒）
+DEFAULT_GAP = 0.2
+
+# 終了予定を過ぎてもチャンネルが鳴っている場合の確認間隔（秒。倍にしていき上限まで）
+END_CHECK_MIN = 0.02
+END_CHECK_MAX = 0.25
+# 一時停止中に再開を確認する間隔（秒）
+PAUSE_CHECK = 0.5
+
+# 優先クラス（priority が小さいほど優先）と割り込みルール、再生するチャンネルグループ
+#   preempt : 優先度の低い再生を止め、待ち中の低優先アイテムを捨てて先に鳴らす
+#   duck    : 優先度の低い再生の音量を下げて重ねて鳴らす（重ねられなければ待つ）
+#   replace : 待ち中の同じクラスのアイテムを最新のものに置き換える
+#   wait    : 優先順に並んで順番を待つ
+PRIORITY_CLASSES = {
+    'alert':        {'priority': 0, 'policy': 'duck',    'group': 'alert'},    # 方角通知
+    'ui':           {'priority': 1, 'policy': 'preempt', 'group': 'ui'},       # 決定・戻る・再生します等の操作音
+    'notification': {'priority': 2, 'policy': 'duck',    'group': 'alert'},    # 新着・リマインド通知
+    'nav':          {'priority': 3, 'policy': 'replace', 'group': 'ui'},       # メニュー名・タイトル等の読み上げ
+    'content':      {'priority': 4, 'policy': 'wait',    'group': 'content'},  # 物語・メッセージ・鳥の声
+}
+
+# キューが管理するグループ（pause / resume で止める対象）
+QUEUE_GROUPS = ('ui', 'content')
+DEFAULT_CLASS = 'content'
+
+# ダッキング時の背景音量
+DUCK_VOLUME = 0.3
+
+# ダッキングで背景音量を下げる・戻すのにかける時間（秒）
+DUCK_ATTACK = 0.05
+DUCK_RELEASE = 0.2
+
+# ダッキングを戻すスレッドの名前（audio_bench.py stress で残っていないか確認する）
+DUCK_THREAD_NAME = 'duck-restore'
+
+# 待ち行列の上限（超えたら優先度の低い古いものから捨てる）
+MAX_PENDING = 8
+
+# これより大きい WAV は Sound に全部読み込まず、チャンク単位でストリーミング再生（バイト）
+STREAM_WAV_BYTES = 2 * 1024 * 1024
+
+
+class PlaybackItem:
+    """キューに積む再生アイテム
+
+    token は投入順に増える再生トークンで、停止・キャンセルはトークン単位で行う。
+    cancelled はこのアイテム専用のため、停止指示が後から積んだアイテムに持ち越されない。
+    """
+    __slots__ = ('item_type', 'data', 'wait', 'loops', 'on_finish', 'on_cancel', 'item_class', 'priority', 'group',
+                 'token', 'queued_at', 'gaps', 'cancelled', 'channel', 'stream', 'process', 'input', 'start')
+
+    def __init__(self, item_type, data, wait, loops, on_finish, item_class, token):
+        self.item_type = item_type
+        self.data = data
+        self.wait = wait
+        self.loops = loops
+        self.on_finish = on_finish
+        self.on_cancel = None  # 取り消し・破棄されたときのコールバック（on_finish の代わりに呼ぶ）
+        self.item_class = item_class
+        self.priority = PRIORITY_CLASSES[item_class]['priority']
+        self.group = PRIORITY_CLASSES[item_class]['group']
+        self.token = token
+        self.queued_at = time.monotonic()
+        self.gaps = None  # シーケンスの場合、各ステップ間の間隔（秒）
+        self.cancelled = False
+        # 再生中のチャンネル / DecoderStream / ffplay プロセス（停止用）
+        self.channel = None
+        self.stream = None
+        self.process = None
+        self.input = None  # このアイテムを積んだ入力イベント（InputStamp）
+        self.start = 0.0   # 再生開始位置（秒。ストリーミング再生のみ）
+
+    def groups(self):
+        """このアイテムが使うチャンネルグループ（シーケンスは全ステップ分）"""
+        if self.item_type == "sequence":
+            return {step.group for step in self.data}
+        return {self.group}
+
+    def __lt__(self, other):
+        return (self.priority, self.token) < (other.priority, other.token)
+
+
+class SequentialAudioManager:
+    """音声を優先クラス順に再生するマネージャー"""
+    def __init__(self, gap=DEFAULT_GAP, decoder='stream', groups=None, sound_cache=None,
+                 stream_wav_bytes=STREAM_WAV_BYTES):
+        self.groups = groups or init_channel_groups()
+        self.sound_cache = sound_cache or SoundCache()  # WAV のデコード結果を使い回す
+        self.stream_wav_bytes = stream_wav_bytes  # これより大きい WAV はストリーミング（0 で無効）
+        self._pending = []  # PlaybackItem のヒープ（優先度, 投入順）
+        self._cond = threading.Condition()
+        self._tokens = itertools.count(1)  # 再生トークン（単調増加）
+        self.current_item = None
+        self.gap = gap  # 前の再生終了から次の再生開始までの間隔（秒）
+        self.last_end_time = 0.0
+        self.gap_history = deque(maxlen=200)  # 実測した再生間隔（秒）
+        self.sequence_gaps = deque(maxlen=200)  # シーケンス内の (前クラス, 次クラス, 実測間隔)
+        self.current_step = None  # 実際に鳴っているアイテム（シーケンスの場合はそのステップ）
+        self.queue_latency = {name: deque(maxlen=200) for name in PRIORITY_CLASSES}  # 投入→再生開始（秒）
+        self.input_latency = LatencyHistogram()  # キー入力→最初の音（秒）
+        self._input = threading.local()  # スレッドごとの処理中の入力イベント
+        self._preempted = False  # 割り込みで止めた直後か
+        self._ducked = []  # ダッキング中の [channel, 元の音量, 重ねている数, 下げる VolumeRamp]
+        self._release = None  # 音量を戻し中の (channel, 元の音量, VolumeRamp)
+        self._wake = threading.Event()  # 再生終了・シーケンス間隔の待ち中の停止通知
+        self._paused_at = None   # pause() した時刻
+        self._paused_total = 0.0  # これまでに一時停止していた秒数の合計（終了予定をずらす）
+        self._callbacks = queue.Queue()  # 完了時コールバック（ワーカー以外のスレッドで実行）
+        # m4a/mp3/URL はストリーミングデコード（使えなければ ffplay）
+        self.use_decoder = decoder == 'stream' and decoder_available()
+        print(f"🎞️ 圧縮音声の再生方式: {'ストリーミングデコード' if self.use_decoder else 'ffplay'}")
+        self.worker_thread = threading.Thread(target=self._worker, daemon=True)
+        self.worker_thread.start()
+        self.callback_thread = threading.Thread(target=self._dispatch_callbacks, daemon=True)
+        self.callback_thread.start()
+
+    @property
+    def current_stream(self):
+        """現在再生中の DecoderStream（m4a/mp3/URL・大きい WAV）"""
+        item = self.current_item
+        return item.stream if item is not None else None
+
+    def _wait_channel(self, channel, seconds, wake, cancelled, pausable=True):
+        """
+        チャンネルが鳴り終わるまで待つ。再生時間（seconds）とミキサーの時間の進み方から終了時刻を予定して
+        その時刻まで wake で眠り（停止で起こされる）、過ぎても鳴っていれば間隔を延ばしながら確認する。
+        pygame の終了イベントはダミーのビデオドライバーでは 1ms ごとのポーリングになるため使わない。
+        pausable なら pause() していた時間だけ終了予定を遅らせる
+        """
+        scale = time_scale()
+        started = time.monotonic()
+        length = seconds / scale if scale > 0 else 0.0
+        paused_before = self._paused_total
+        check = END_CHECK_MIN
+        while not cancelled():
+            now = time.monotonic()
+            if pausable and self._paused_at is not None:
+                if not channel.get_busy():
+                    return
+                timeout = PAUSE_CHECK
+            else:
+                shift = self._paused_total - paused_before if pausable else 0.0
+                remaining = started + length + shift - now
+                if remaining > 0:
+                    timeout = remaining
+                elif not channel.get_busy():
+                    return
+                else:
+                    timeout, check = check, min(check * 2, END_CHECK_MAX)
+            wake.wait(timeout)
+
+    def _wait_sound(self, sound, channel, loops, item):
+        """Sound の再生完了を待つ（終了予定時刻まで眠る。停止されたら起きる）"""
+        if channel is None:
+            return
+        self._wait_channel(channel, sound.get_length() * (loops + 1), self._wake, lambda: item.cancelled)
+
+        # 再生開始と同時に止められた場合に備えて確実に止める
+        if item.cancelled:
+            channel.stop()
+
+    def _play_stream(self, data, stderr, step, item):
+        """圧縮音声を再生（デコーダーで mixer へ流し込む。使えなければ ffplay）"""
+        if not self.use_decoder:
+            # ffplay は音が出た時刻がわからないので入力遅延は記録しない
+            self._play_process(data, stderr, item, step.start)
+            return
+        self._play_decoded(data, step, item)
+
+    def _play_decoded(self, data, step, item):
+        """DecoderStream でチャンクごとに再生し、終わるまで待つ"""
+        channel = self.groups[step.group].find()
+        channel.set_volume(1.0)
+        stream = item.stream = DecoderStream(data, channel, start=step.start)
+        if item.cancelled:
+            stream.stop()
+        stream.wait()
+        if stream.first_audio_at is not None:
+            self._first_sample(item, step, stream.first_audio_at)
+
+    def _streams_wav(self, path, loops):
+        """WAV を Sound に読み込まずストリーミング再生するか（大きいファイルのみ）"""
+        if loops or not self.stream_wav_bytes:
+            return False
+        try:
+            if os.path.getsize(path) < self.stream_wav_bytes:
+                return False
+        except OSError:
+            return False
+        # ミキサー形式ならそのまま読める。それ以外はデコーダーで変換しながら読む
+        rate, _, channels = pygame.mixer.get_init()
+        return is_mixer_wav(path, rate, channels) or self.use_decoder
+
+    def _play_process(self, data, stderr, item, start=0.0):
+        """ffplay で再生し、プロセス終了をブロッキング待ちする"""
+        env = os.environ.copy()
+        env['SDL_AUDIODRIVER'] = 'alsa'
+        env['AUDIODEV'] = 'plug:dmixed'
+        # ffplay
+        seek = ['-ss', f'{start:.3f}'] if start > 0 else []
+        item.process = subprocess.Popen(
+            ['ffplay', '-nodisp', '-autoexit'] + seek + ['-af', 'aformat=sample_fmts=s16:sample_rates=44100', data],
+            env=env, stdout=subprocess.DEVNULL, stderr=stderr
+        )
+        if item.cancelled:
+            item.process.terminate()
+        # 停止時は terminate() でプロセスが終わるので wait() から抜ける
+        item.process.wait()
+
+    def _next_item(self):
+        """次に再生するアイテムを取り出す（なければ待つ）"""
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+            item = heapq.heappop(self._pending)
+            self.current_item = item
+            self._wake.clear()
+            return item
+
+    def _play_one(self, step, item):
+        """1つのアイテム（シーケンスの場合はそのステップ）を再生して終わるまで待つ
+
+        再生ハンドルは停止できるよう、キュー上のアイテム item に記録する。
+        """
+        item_type, data, loops = step.item_type, step.data, step.loops
+        self.current_step = step
+        group = self.groups[step.group]
+        try:
+            if item_type == "sound":
+                item.channel = group.play(data, loops=loops)
+                self._first_sample(item, step, time.monotonic())
+                self._wait_sound(data, item.channel, loops, item)
+
+            elif item_type == "file":
+                # wavはpygame（大きいものはチャンク単位で読む）、他はストリーミングデコード
+                if data.endswith('.wav') and self._streams_wav(data, loops):
+                    self._play_decoded(data, step, item)
+                elif data.endswith('.wav'):
+                    sound = self.sound_cache.get(data)
+                    item.channel = group.play(sound, loops=loops)
+                    self._first_sample(item, step, time.monotonic())
+                    self._wait_sound(sound, item.channel, loops, item)
+                else:
+                    self._play_stream(data, subprocess.DEVNULL, step, item)
+
+            elif item_type == "url":
+                self._play_stream(data, None, step, item)
+        finally:
+            item.channel = None
+            item.stream = None
+            item.process = None
+
+    def _first_sample(self, item, step, at):
+        """入力イベントから最初の音が出るまでの時間を記録（入力1回につき最初の1回だけ）"""
+        stamp = item.input
+        if stamp is None:
+            return
+        item.input = None
+        self.input_latency.record(stamp.menu, step.item_type, at - stamp.at)
+
+    def mark_input(self, stamp):
+        """
+        このスレッドで次に積む再生アイテムに入力イベント（InputStamp）を紐付ける。
+        入力の処理が終わったら mark_input(None) で解除する。
+        """
+        self._input.stamp = stamp
+
+    def mark_played(self, item_type):
+        """
+        キューを通さずに直接鳴らした音（ノブのクリック音など）を、
+        このスレッドで紐付け待ちの入力イベントの最初の音として記録する
+        """
+        stamp = self._take_input()
+        if stamp is not None:
+            self.input_latency.record(stamp.menu, item_type, time.monotonic() - stamp.at)
+
+    def _take_input(self):
+        """紐付け待ちの入力イベントを取り出す（最初に積んだアイテムだけが受け取る）"""
+        stamp = getattr(self._input, 'stamp', None)
+        self._input.stamp = None
+        return stamp
+
+    def _play_sequence(self, item):
+        """シーケンスの各ステップを指定の間隔で続けて再生"""
+        prev, prev_end = None, None
+        for i, step in enumerate(item.data):
+            if item.cancelled:
+                return
+            if prev is not None:
+                # 前のステップの終了時刻から指定間隔後に次を開始
+                delay = prev_end + item.gaps[i - 1] - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+                if item.cancelled:
+                    return
+                gap = time.monotonic() - prev_end
+                self.sequence_gaps.append((prev.item_class, step.item_class, gap))
+                print(f"⛓️ シーケンス間隔: {prev.item_class} → {step.item_class} {gap * 1000:.0f}ms")
+            self._play_one(step, item)
+            prev, prev_end = step, time.monotonic()
+
+    def _worker(self):
+        while True:
+            # 前の再生終了から gap 秒後まで次の再生を始めない（割り込み直後は空けない）
+            delay = self.last_end_time + self.gap - time.monotonic()
+            if delay > 0 and not self._preempted:
+                time.sleep(delay)
+            self._preempted = False
+
+            item = self._next_item()
+            print(f"🎬 再生開始 (Queue): {item.item_type} [{item.item_class}] #{item.token}")
+
+            # 前の再生が終わる前から待っていた場合のみ、実際の間隔を記録
+            started_at = time.monotonic()
+            if self.last_end_time and item.queued_at <= self.last_end_time:
+                self.gap_history.append(started_at - self.last_end_time)
+            self.queue_latency[item.item_class].append(started_at - item.queued_at)
+
+            try:
+                if item.item_type == "sequence":
+                    self._play_sequence(item)
+                else:
+                    self._play_one(item, item)
+
+            except Exception as e:
+                print(f"❌ 再生エラー: {e}")
+            finally:
+                with self._cond:
+                    self.current_item = None
+                    self.current_step = None
+                    self.last_end_time = time.monotonic()
+                    # ここでロックを離すと以降のキャンセルはこのアイテムに届かない
+                    cancelled = item.cancelled
+                    self._cond.notify_all()
+
+            if cancelled:
+                print(f"🛑 再生中断 #{item.token}")
+                if item.on_cancel:
+                    self._callbacks.put(item.on_cancel)
+            elif item.on_finish:
+                # 完了時コールバックはワーカーを止めないよう別スレッドで実行
+                self._callbacks.put(item.on_finish)
+
+    def _dispatch_callbacks(self):
+        """完了時コールバックを順番に実行（コールバック内から stop_immediately 等を呼んでもよい）"""
+        while True:
+            callback = self._callbacks.get()
+            try:
+                callback()
+            except Exception as e:
+                print(f"❌ 完了コールバックエラー: {e}")
+
+    def play(self, item_type, data, wait=False, loops=0, urgent=False, on_finish=None, priority=DEFAULT_CLASS, start=0.0,
+             on_cancel=None):
+        """
+        音声をキューに追加。
+        priority は PRIORITY_CLASSES のクラス名で、クラスごとの割り込みルールに従う。
+        urgent=True の場合は現在の再生を止めて即座にキューに追加。
+        start は再生開始位置（秒）で、ストリーミング再生（m4a/mp3/URL・大きい WAV）で有効。
+        on_cancel は再生が取り消された・待ち行列から捨てられたときに on_finish の代わりに呼ぶ。
+        戻り値は再生トークン（cancel() で個別に取り消せる）。
+        """
+        if priority not in PRIORITY_CLASSES:
+            print(f"⚠️ 未知の優先クラス: {priority}（{DEFAULT_CLASS} として扱います）")
+            priority = DEFAULT_CLASS
+        if urgent:
+            self.stop_immediately()
+
+        item = PlaybackItem(item_type, data, wait, loops, on_finish, priority, next(self._tokens))
+        item.start = start
+        item.on_cancel = on_cancel
+        item.input = self._take_input()
+        if PRIORITY_CLASSES[priority]['policy'] == 'duck' and self._duck_play(item):
+            return item.token
+        self._enqueue(item)
+        return item.token
+
+    def _enqueue(self, item):
+        """クラスのルールに従って待ち行列に積む"""
+        policy = PRIORITY_CLASSES[item.item_class]['policy']
+        with self._cond:
+            if policy == 'preempt':
+                # 待ち中の低優先アイテム（古いナビ読み上げ等）を捨てる
+                self._drop_pending(lambda p: p.priority > item.priority)
+                current = self.current_step
+                if current is not None and current.priority > item.priority:
+                    print(f"⏭️ 割り込み: {current.item_class} → {item.item_class}")
+                    self._preempted = True
+                    self._cancel(self.current_item)
+            elif policy == 'replace':
+                self._drop_pending(lambda p: p.item_class == item.item_class)
+
+            heapq.heappush(self._pending, item)
+            # 上限を超えたら優先度の低い古いものから捨てる
+            while len(self._pending) > MAX_PENDING:
+                victim = max(self._pending, key=lambda p: (p.priority, -p.token))
+                self._drop_pending(lambda p: p is victim)
+            self._cond.notify_all()
+
+    def play_sequence(self, steps, gap=None, urgent=False, on_finish=None, priority=None, on_cancel=None):
+        """
+        複数の音声を1つのまとまりとして続けて再生し、最後に on_finish を1回だけ呼ぶ
+        （取り消された・待ち行列から捨てられた場合は代わりに on_cancel を呼ぶ）。
+        steps は (item_type, data, priority[, loops[, start]]) のリスト。
+        gap はステップ間の間隔（秒）で、数値または各間隔のリスト（省略時は通常の再生間隔）。
+        キュー上の優先クラスは priority（省略時は最初のステップのクラス）。
+        戻り値はシーケンス全体の再生トークン。
+        """
+        items = []
+        for step in steps:
+            item_type, data, step_class = step[:3]
+            loops = step[3] if len(step) > 3 else 0
+            if step_class not in PRIORITY_CLASSES:
+                step_class = DEFAULT_CLASS
+            items.append(PlaybackItem(item_type, data, False, loops, None, step_class, next(self._tokens)))
+            items[-1].start = step[4] if len(step) > 4 else 0.0
+        if not items:
+            return None
+
+        if gap is None:
+            gap = self.gap
+        gaps = list(gap) if isinstance(gap, (list, tuple)) else [gap] * (len(items) - 1)
+
+        priority = priority or items[0].item_class
+        if urgent:
+            self.stop_immediately()
+
+        sequence = PlaybackItem("sequence", items, False, 0, on_finish, priority, next(self._tokens))
+        sequence.gaps = gaps
+        sequence.on_cancel = on_cancel
+        sequence.input = self._take_input()
+        self._enqueue(sequence)
+        return sequence.token
+
+    def _drop_pending(self, predicate):
+        """条件に合う待ち中アイテムを取り除く（_cond を保持して呼ぶ）"""
+        kept = [p for p in self._pending if not predicate(p)]
+        if len(kept) != len(self._pending):
+            for p in self._pending:
+                if p.on_cancel and predicate(p):
+                    self._callbacks.put(p.on_cancel)
+            self._pending = kept
+            heapq.heapify(self._pending)
+
+    def _cancel(self, item):
+        """再生中のアイテムを止める（_cond を保持して呼ぶ。待ち行列はそのまま）"""
+        item.cancelled = True
+        self._wake.set()
+        if item.channel is not None:
+            item.channel.stop()
+        if item.stream is not None:
+            item.stream.stop()
+        if item.process is not None:
+            try:
+                item.process.terminate()
+            except Exception:
+                pass
+
+    def cancel(self, token=None, item_class=None):
+        """
+        トークンまたは優先クラスを指定して、待ち中・再生中のアイテムを取り消す。
+        取り消したアイテムの完了時コールバックは呼ばれない（on_cancel を呼ぶ）。取り消した数を返す。
+        """
+        def match(p):
+            return (token is not None and p.token == token) or (item_class is not None and p.item_class == item_class)
+
+        with self._cond:
+            count = len(self._pending)
+            self._drop_pending(match)
+            count -= len(self._pending)
+            current = self.current_item
+            if current is not None and not current.cancelled and match(current):
+                self._cancel(current)
+                count += 1
+            self._cond.notify_all()
+        return count
+
+    def _duck_play(self, item):
+        """再生中の低優先音量を下げて重ねて鳴らす。重ねられない場合は False"""
+        with self._cond:
+            current, playing = self.current_step, self.current_item
+            # ワーカーが再生の終わりに stream / channel を消すので、1回だけ読んで使う
+            stream = playing.stream if playing else None
+            channel = stream.channel if stream else (playing.channel if playing else None)
+        if current is None or current.priority <= item.priority:
+            return False
+        if channel is None:
+            # ffplay 再生中は音量を下げられないので順番を待つ
+            return False
+        try:
+            sound = item.data if item.item_type == "sound" else self.sound_cache.get(item.data)
+        except Exception:
+            return False
+        overlay = self.groups[item.group].find()
+        if overlay == channel:
+            return False
+
+        print(f"🔉 ダッキング再生: {item.item_class}（{current.item_class} の音量を下げる）")
+        self.queue_latency[item.item_class].append(time.monotonic() - item.queued_at)
+        with self._cond:
+            if not self._ducked:
+                volume = channel.get_volume()
+                if self._release:
+                    # 戻し途中なら止め、同じチャンネルなら戻し先の音量を引き継ぐ
+                    released, released_volume, ramp = self._release
+                    ramp.cancel()
+                    if released == channel:
+                        volume = released_volume
+                    self._release = None
+                self._ducked = [channel, volume, 0, VolumeRamp(channel, DUCK_VOLUME, DUCK_ATTACK)]
+            self._ducked[2] += 1
+        overlay.set_volume(1.0)
+        overlay.play(sound, loops=item.loops)
+        self._first_sample(item, item, time.monotonic())
+
+        def restore():
+            with self._cond:
+                self._ducked[2] -= 1
+                if self._ducked[2] == 0:
+                    ducked, volume, _, attack = self._ducked
+                    attack.cancel()
+                    self._release = (ducked, volume, VolumeRamp(ducked, volume, DUCK_RELEASE))
+                    self._ducked = []
+            if item.on_finish:
+                self._callbacks.put(item.on_finish)
+
+        def wait_and_restore():
+            # 通知のチャンネルが鳴り終わってから戻す（null / file 出力の speed にも合わせる）
+            self._wait_channel(overlay, sound.get_length() * (item.loops + 1), threading.Event(),
+                               lambda: False, pausable=False)
+            restore()
+
+        threading.Thread(target=wait_and_restore, name=DUCK_THREAD_NAME, daemon=True).start()
+        return True
+
+    def ducking(self):
+        """ダッキングで重ねて鳴らしている数（0 なら音量を下げていない）"""
+        with self._cond:
+            return self._ducked[2] if self._ducked else 0
+
+    def is_playing(self, group):
+        """グループが再生中、またはそのグループのアイテムが再生・待ち中か"""
+        with self._cond:
+            if self.current_item is not None and group in self.current_item.groups():
+                return True
+            if any(group in p.groups() for p in self._pending):
+                return True
+        return self.groups[group].get_busy()
+
+    def join(self, timeout=None):
+        """待ち行列が空になり、再生も終わるまで待つ（タイムアウトした場合は False）"""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._pending and self.current_item is None, timeout)
+
+    def latency_report(self):
+        """優先クラスごとの待ち時間（投入→再生開始）の集計"""
+        report = {}
+        for name, values in self.queue_latency.items():
+            if not values:
+                continue
+            ordered = sorted(values)
+            report[name] = {
+                'count': len(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+            }
+        return report
+
+    def sequence_gap_report(self):
+        """シーケンス内のクラス間ごとの実測間隔の集計"""
+        by_pair = {}
+        for prev_class, next_class, gap in list(self.sequence_gaps):
+            by_pair.setdefault(f"{prev_class}->{next_class}", []).append(gap)
+        report = {}
+        for name, values in by_pair.items():
+            ordered = sorted(values)
+            report[name] = {
+                'count': len(ordered),
+                'p50': ordered[len(ordered) // 2],
+                'p95': ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+                'max': ordered[-1],
+            }
+        return report
+
+    def stop_immediately(self):
+        """現在の再生を強制停止し、キューも空にする（ビープや方角通知は止めない）"""
+        with self._cond:
+            self._drop_pending(lambda p: True)
+            # 止めるのは今再生中のトークンだけ（この後に積まれたアイテムには影響しない）
+            if self.current_item is not None:
+                self._cancel(self.current_item)
+            self._cond.notify_all()
+
+    def pause(self):
+        """再生中の音声を一時停止（プロセスを止めずにチャンネルだけ止める）"""
+        stream = self.current_stream
+        if stream:
+            stream.pause()
+        elif pygame.mixer.get_init():
+            if self._paused_at is None:
+                self._paused_at = time.monotonic()
+            for name in QUEUE_GROUPS:
+                self.groups[name].pause()
+
+    def resume(self):
+        """一時停止した音声を再開"""
+        stream = self.current_stream
+        if stream:
+            stream.resume()
+        elif pygame.mixer.get_init():
+            if self._paused_at is not None:
+                self._paused_total += time.monotonic() - self._paused_at
+                self._paused_at = None
+            for name in QUEUE_GROUPS:
+                self.groups[name].unpause()
+
+    def seek(self, seconds):
+        """ストリーミング再生中の位置を移動（秒）"""
+        stream = self.current_stream
+        if stream:
+            stream.seek(seconds)
+            return True
+        return False
+
+    def position(self):
+        """ストリーミング再生中の再生位置（秒）。再生していなければ None"""
+        stream = self.current_stream
+        if stream:
+            return stream.position()
+        return None
+
+    def update_volume(self, volume):
+        """リアルタイム音量更新（割り込み方式では使用しませんが、互換性のため残す場合は何もしない）"""
+        pass
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音声出力先（バックエンド）の選択モジュール
+
+pygame.mixer をどの SDL オーディオドライバーで開くかを切り替える。
+再生処理（Sound / Channel / DecoderStream）はどのバックエンドでも同じものを使う。
+
+  pygame : PulseAudio 優先、開けなければ ALSA のデバイスを順に試す（本番の既定）
+  alsa   : PulseAudio を使わず ALSA のデバイスを直接開く
+  null   : 音を出さずに捨てる（サウンドカードのない環境でのテスト・ベンチマーク用）
+  file   : 出力を WAV ファイルに録音する
+
+null と file は SDL の disk ドライバーで実時間どおりにミキシングし、
+speed を指定するとその倍率で時間を進める（speed=10 なら 10秒のクリップが約1秒で終わる）。
+"""
+
+import os
+import wave
+import atexit
+import tempfile
+
+import pygame
+
+OUTPUT_BACKENDS = ('pygame', 'alsa', 'null', 'file')
+
+# ミキサーのフォーマット（全バックエンド共通）
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 1024
+
+# file バックエンドの既定の保存先
+DEFAULT_RECORD_PATH = 'audio_output.wav'
+
+# ミキサーの時間の進み方（実時間に対する倍率。null / file の speed。0 なら待たずに進む）
+_time_scale = 1.0
+
+
+def is_virtual(backend):
+    """実際のサウンドカードを使わないバックエンドか（amixer 等が使えない）"""
+    return backend in ('null', 'file')
+
+
+def _open_mixer():
+    pygame.mixer.init(frequency=MIXER_FREQUENCY, size=MIXER_SIZE, channels=MIXER_CHANNELS, buffer=MIXER_BUFFER)
+
+
+def _open_alsa(speaker_card):
+    """ALSA のデバイスを順に試して開く。開けたデバイス名を返す"""
+    os.environ['SDL_AUDIODRIVER'] = 'alsa'
+    devices = ['plug:dmixed', f'plughw:{speaker_card},0', f'hw:{speaker_card},0', 'default']
+    for device in devices:
+        try:
+            os.environ['AUDIODEV'] = device
+            _open_mixer()
+            return device
+        except pygame.error:
+            print(f"⚠️ {device} を開けません。次を試します...")
+    raise pygame.error("利用可能な ALSA デバイスがありません")
+
+
+def time_scale():
+    """ミキサーの時間の進み方（再生の終了予定を求めるのに使う）"""
+    return _time_scale
+
+
+def _open_disk(path, speed):
+    """SDL の disk ドライバーで開く（path に生の PCM を書き出す）"""
+    global _time_scale
+    _time_scale = speed
+    os.environ['SDL_AUDIODRIVER'] = 'disk'
+    os.environ['SDL_DISKAUDIOFILE'] = path
+    # バッファ1つ分の実時間（ミリ秒）を speed で割った間隔で次のバッファをミキシング
+    buffer_ms = MIXER_BUFFER * 1000.0 / MIXER_FREQUENCY
+    os.environ['SDL_DISKAUDIODELAY'] = str(int(buffer_ms / speed) if speed > 0 else 0)
+    _open_mixer()
+
+
+def _save_wav(raw_path, wav_path):
+    """disk ドライバーが書き出した生の PCM を WAV にする"""
+    try:
+        with open(raw_path, 'rb') as f:
+            frames = f.read()
+        with wave.open(wav_path, 'wb') as w:
+            w.setnchannels(MIXER_CHANNELS)
+            w.setsampwidth(abs(MIXER_SIZE) // 8)
+            w.setframerate(MIXER_FREQUENCY)
+            w.writeframes(frames)
+        print(f"💾 出力を保存しました: {wav_path}（{len(frames) / (MIXER_FREQUENCY * MIXER_CHANNELS * 2):.1f}秒）")
+    except Exception as e:
+        print(f"⚠️ 出力の保存に失敗しました: {e}")
+    finally:
+        try:
+            os.remove(raw_path)
+        except OSError:
+            pass
+
+
+def init_output(backend='pygame', speaker_card='0', speed=1.0, path=DEFAULT_RECORD_PATH):
+    """
+    選択したバックエンドで pygame.mixer を初期化し、出力先の説明を返す。
+    開けない場合は pygame.error を送出する。
+    """
+    if backend not in OUTPUT_BACKENDS:
+        raise ValueError(f"未知の出力バックエンド: {backend}（{', '.join(OUTPUT_BACKENDS)}）")
+
+    if backend == 'pygame':
+        os.environ['SDL_AUDIODRIVER'] = 'pulseaudio'
+        try:
+            _open_mixer()
+            return "PulseAudio"
+        except pygame.error:
+            print("⚠️ PulseAudioで開けません。ALSAで再試行...")
+            return f"ALSA {_open_alsa(speaker_card)}"
+
+    if backend == 'alsa':
+        return f"ALSA {_open_alsa(speaker_card)}"
+
+    if backend == 'null':
+        _open_disk(os.devnull, speed)
+        return f"null（×{speed}）"
+
+    # file: 終了時に生の PCM を WAV に変換して保存
+    fd, raw_path = tempfile.mkstemp(prefix='audio_output_', suffix='.raw')
+    os.close(fd)
+    _open_disk(raw_path, speed)
+
+    def finish():
+        if pygame.mixer.get_init():
+            pygame.mixer.quit()
+        _save_wav(raw_path, path)
+
+    atexit.register(finish)
+    return f"file {path}（×{speed}）"
@@ -6,6 +6,8 @@ import os
 import sys
 import time
 
+import audio_devices
+
 PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
 AUDIO_DIR = os.path.join(PROJECT_DIR, "audio")
 
@@ -26,11 +28,14 @@ def run(cmd, show_error=True):
 # ========== 1. デバイス確認 ==========
 section("1. オーディオデバイス確認")
 
-rc, out, err = run(['aplay', '-l'])
-if rc == 0:
-    print(out)
+# keyboard_test_v2.py と同じく /proc/asound から検出（audio_devices.py）
+cards = audio_devices.list_cards()
+if cards:
+    for line in audio_devices.describe(cards):
+        print(f"  {line}")
+    print(f"  → 自動選択: スピーカー {audio_devices.pick_card(cards, 'playback')} / マイク {audio_devices.pick_card(cards, 'capture')}")
 else:
-    print(f"  ❌ aplay -l 失敗: {err}")
+    print(f"  ❌ {audio_devices.ASOUND_DIR} にカードがありません")
 
 # ========== 2. PulseAudio 確認 ==========
 section("2. PulseAudio 確認")
@@ -58,21 +63,9 @@ if rc == 0:
 # ========== 3. ALSA音量確認 ==========
 section("3. ALSA音量確認")
 
-# カード番号を自動検出
-rc, out, _ = run(['aplay', '-l'])
-cards = []
-if rc == 0:
-    for line in out.split('\n'):
-        if line.startswith('card ') or line.startswith('カード'):
-            parts = line.split(':')
-            num = parts[0].split()[-1]
-            name = parts[1].strip() if len(parts) > 1 else ''
-            cards.append((num, name))
-            print(f"  カード {num}: {name}")
-
-for card_num, card_name in cards:
-    print(f"\n  --- カード {card_num} のミキサー ---")
-    rc, out, _ = run(['amixer', '-c', card_num, 'scontents'])
+for card in cards:
+    print(f"\n  --- カード {card.number} ({card.name}) のミキサー ---")
+    rc, out, _ = run(['amixer', '-c', card.number, 'scontents'])
     if rc == 0:
         print(f"  {out[:500]}")
 
@@ -95,10 +88,11 @@ else:
 section("5. ALSA直接テスト (speaker-test)")
 
 print("  2秒間テストトーンを鳴らします...")
-for card_num, card_name in cards:
-    if 'bcm2835' in card_name.lower() or 'vc4' in card_name.lower():
+for card in cards:
+    if audio_devices.is_internal(card) or not card.playback:
         continue
-    print(f"  → カード {card_num} ({card_name})")
+    card_num = card.number
+    print(f"  → カード {card_num} ({card.name})")
     rc, out, err = run(['speaker-test', '-c2', '-t', 'sine', '-l1',
                         '-D', f'plughw:{card_num},0', '-p', '2'])
     if rc == 0:
@@ -119,9 +113,10 @@ if os.path.isdir(AUDIO_DIR):
 
 if test_wav:
     print(f"  再生ファイル: {test_wav}")
-    for card_num, card_name in cards:
-        if 'bcm2835' in card_name.lower() or 'vc4' in card_name.lower():
+    for card in cards:
+        if audio_devices.is_internal(card) or not card.playback:
             continue
+        card_num = card.number
         print(f"  → aplay -D plughw:{card_num},0 {os.path.basename(test_wav)}")
         rc, out, err = run(['aplay', '-D', f'plughw:{card_num},0', test_wav])
         if rc == 0:
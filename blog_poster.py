@@ -17,35 +17,37 @@ Flask不要、requestsのみで動作
     )
 """
 
-import re
-import requests
 import os
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
-import asyncio
-import types
+import subprocess
 
-# Python 3.11+ で削除された asyncio.coroutine の互換性を確保
-# mega.py が依存する古い tenacity がこれを使用するため、インポート前にパッチを当てる
-if not hasattr(asyncio, 'coroutine'):
-    asyncio.coroutine = types.coroutine
-    # 一部のライブラリ向けに asyncio.tasks にも設定
-    try:
-        import asyncio.tasks
-        if not hasattr(asyncio.tasks, 'coroutine'):
-            asyncio.tasks.coroutine = types.coroutine
-    except ImportError:
-        pass
+# requests（post_blog）・MEGA まわりは import 時間がかかるため、使う関数の中で読み込む
+
+
+def patch_asyncio_coroutine():
+    """
+    Python 3.11+ で削除された asyncio.coroutine の互換性を確保
+    mega.py が依存する古い tenacity がこれを使用するため、MEGA まわりを使う前に呼ぶ
+    """
+    import asyncio
+    import types
+    if not hasattr(asyncio, 'coroutine'):
+        asyncio.coroutine = types.coroutine
+        # 一部のライブラリ向けに asyncio.tasks にも設定
+        try:
+            import asyncio.tasks
+            if not hasattr(asyncio.tasks, 'coroutine'):
+                asyncio.tasks.coroutine = types.coroutine
+        except ImportError:
+            pass
 
 
 def upload_to_mega(file_path, verbose=True):
     """
     megatools を使用してファイルをMEGAにアップロードし、共有リンクを取得する
     """
-    import os
-    import subprocess
     from dotenv import load_dotenv
     load_dotenv()
+    patch_asyncio_coroutine()
     
     email = os.getenv('MEGA_EMAIL')
     password = os.getenv('MEGA_PASSWORD')
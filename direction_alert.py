@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+方角通知の再生モジュール
+
+ハードウェア音量（amixer）を上げ下げする代わりに、読み込み済みの方角音声へ
+ソフトウェアでゲインをかけた Sound を用意しておき、alert クラス（duck）で再生する。
+再生中のコンテンツは audio_manager のダッキング（短いエンベロープで音量を下げて戻す）で
+背景に回すため、サブプロセスの起動やスリープはない。
+
+方角音声は生成時に DIRECTION_BOOST 倍と SSML の +10dB で既に大きいため、ゲインは既定で 1.0（何もしない）。
+指定した場合もクリップのピークが 16bit の範囲に収まる倍率までに抑える（音割れさせない）。
+ゲインの計算は numpy があればそれで行い、更新時刻ごとに1回だけ行う。
+
+ソフトウェアゲインだけでは音量つまみ（ハードウェア音量）より大きくできないため、mixer を渡すと
+通知の間だけハードウェア音量を volume（DIRECTION_VOLUME）まで上げ、鳴り終わったら（取り消された場合も）
+今の音量に戻す。反映は mixer_control の常駐セッションで行うのでプロセスは起動しない。
+通知が重なった場合は最後の1つが鳴り終わったときに戻す。
+
+実行中に方角音声が作り直された場合（更新時刻が変わった場合）は、次の通知で読み直す。
+"""
+
+import os
+import array
+import threading
+
+import pygame
+
+DIRECTIONS = ('north', 'east', 'south', 'west')
+
+# ソフトウェアゲインのデフォルト（倍率。クリップのピークで決まる上限を超えない）
+DEFAULT_GAIN = 1.0
+
+
+def headroom(samples):
+    """16bit のサンプル列で音割れせずにかけられる最大の倍率"""
+    if not samples:
+        return 1.0
+    peak = max(max(samples), -min(samples))
+    return 32767.0 / peak if peak else 1.0
+
+
+def apply_gain(sound, gain):
+    """Sound のサンプルに gain 倍（ピークが収まる倍率まで）をかけた新しい Sound を返す"""
+    if gain == 1.0:
+        return sound
+    raw = sound.get_raw()
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is not None:
+        samples = numpy.frombuffer(raw, dtype=numpy.int16)
+        peak = int(numpy.abs(samples.astype(numpy.int32)).max()) if samples.size else 0
+        gain = min(gain, 32767.0 / peak if peak else 1.0)
+        if gain <= 1.0:
+            return sound
+        scaled = (samples.astype(numpy.float32) * gain).astype(numpy.int16)
+        return pygame.mixer.Sound(buffer=scaled.tobytes())
+    samples = array.array('h')
+    samples.frombytes(raw)
+    gain = min(gain, headroom(samples))
+    if gain <= 1.0:
+        return sound
+    scaled = array.array('h', [int(v * gain) for v in samples])
+    return pygame.mixer.Sound(buffer=scaled.tobytes())
+
+
+class DirectionAlerts:
+    """方角ごとのゲイン適用済み Sound を保持して通知を再生する"""
+    def __init__(self, audio_mgr, audio_dir, gain=DEFAULT_GAIN, mixer=None, volume=None, base_volume=None):
+        self.audio_mgr = audio_mgr
+        self.audio_dir = audio_dir
+        self.gain = gain
+        self.mixer = mixer              # 通知中にハードウェア音量を上げる MixerController（None なら上げない）
+        self.volume = volume            # 通知中のハードウェア音量（%）
+        self.base_volume = base_volume  # 戻す先の音量（%）を返す関数
+        self.placeholder = None  # 方角音声の生成中に代わりに鳴らす Sound
+        self._sounds = {}  # direction -> (mtime, ゲイン適用済み Sound)
+        self._boosts = 0   # ハードウェア音量を上げている通知の数
+        self._lock = threading.Lock()
+
+    def path(self, direction):
+        return os.path.join(self.audio_dir, 'direction', f'{direction}.wav')
+
+    def load(self, sounds=None):
+        """
+        全方角の Sound を用意する（起動時に別スレッドで呼ぶ）。
+        sounds に読み込み済みの dir_* があればファイルを読み直さずに使う。
+        """
+        sounds = sounds or {}
+        for direction in DIRECTIONS:
+            try:
+                self._prepare(direction, sounds.get(f'dir_{direction}'))
+            except (OSError, pygame.error) as e:
+                print(f"⚠️ 方角音声を読み込めません: {direction}: {e}")
+        print(f"🧭 方角音声を準備しました: {len(self._sounds)}件（ゲイン {self.gain}倍）")
+
+    def _prepare(self, direction, loaded=None):
+        """ゲイン適用済みの Sound を返す（ファイルが更新されていれば作り直す）"""
+        path = self.path(direction)
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            entry = self._sounds.get(direction)
+            if entry and entry[0] == mtime:
+                return entry[1]
+        sound = apply_gain(loaded or pygame.mixer.Sound(path), self.gain)
+        with self._lock:
+            self._sounds[direction] = (mtime, sound)
+        return sound
+
+    def available(self, direction):
+        return direction in DIRECTIONS and (os.path.exists(self.path(direction)) or self.placeholder is not None)
+
+    def _boost(self):
+        """ハードウェア音量を通知用に上げ、戻す関数を返す（上げない場合は None）"""
+        if self.mixer is None or not self.volume:
+            return None
+        with self._lock:
+            self._boosts += 1
+            if self._boosts == 1:
+                self.mixer.set_volume(max(self.volume, self.base_volume()))
+        released = []
+
+        def release():
+            with self._lock:
+                if released:
+                    return
+                released.append(True)
+                self._boosts -= 1
+                if self._boosts == 0:
+                    self.mixer.set_volume(self.base_volume())
+        return release
+
+    def play(self, direction):
+        """方角を通知する（待たずに戻る）。再生トークンを返す"""
+        if not os.path.exists(self.path(direction)):
+            # まだ生成中
+            print(f"⚠️ 方角音声の生成中のため代わりの音を鳴らします: {direction}")
+            sound = self.placeholder
+        else:
+            sound = self._prepare(direction)
+        release = self._boost()
+        return self.audio_mgr.play("sound", sound, priority='alert', on_finish=release, on_cancel=release)
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+asyncio のイベントループまわりの共通処理
+
+keyboard_test_v2.py はキー入力（evdev の async_read_loop）・タイマー・再生完了を
+1つの asyncio ループで処理する。入力がなければループのスレッドは眠ったまま起きない。
+
+  - 再生完了コールバックなど、他のスレッドからの呼び出しは call() / callback() でループに渡す
+  - タイムアウトは名前付きタイマー（set_timer / cancel_timer）で予約する
+  - ネットワーク等の待ちは run_blocking() でスレッドプールに出し、ループを止めない
+  - 名前付きのタスク（spawn(coro, name)）は戻るボタン等で cancel_job(name) により取り消せる
+  - completion() は完了時コールバックで結果が入る Future（await で再生完了を待つ）
+
+起床回数はスレッドの自発的なコンテキストスイッチ数（/proc/self/task/*/status）から数える。
+"""
+
+import os
+import time
+import asyncio
+import threading
+from functools import partial
+from collections import deque
+
+from input_latency import summarize
+
+# 保持する直近のキー処理までの時間の数
+DISPATCH_WINDOW = 500
+
+
+def thread_wakeups(native_id):
+    """スレッドが眠って起きた回数（自発的なコンテキストスイッチ数）。/proc がなければ None"""
+    try:
+        with open(f'/proc/self/task/{native_id}/status') as f:
+            for line in f:
+                if line.startswith('voluntary_ctxt_switches:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def process_wakeups():
+    """プロセス内の全スレッドの起床回数の合計（/proc がなければ None）"""
+    try:
+        tasks = os.listdir('/proc/self/task')
+    except OSError:
+        return None
+    counts = [thread_wakeups(tid) for tid in tasks]
+    return sum(c for c in counts if c is not None)
+
+
+class LoopBridge:
+    """asyncio ループと他のスレッド・タイマーの橋渡し"""
+    def __init__(self):
+        self.loop = None
+        self.thread_id = None   # ループを動かしているスレッドの native id
+        self.dispatch = deque(maxlen=DISPATCH_WINDOW)  # キーイベント（カーネル時刻）→ ハンドラ呼び出し（秒）
+        self._timers = {}       # 名前 → TimerHandle
+        self._tasks = set()
+        self._jobs = {}         # 名前 → Task（取り消せるタスク）
+        self._attached_at = None
+        self._wakeups_at_attach = None
+
+    def attach(self, loop=None):
+        """今のスレッドで動いているループを使う（ループの中から呼ぶ）"""
+        self.loop = loop or asyncio.get_running_loop()
+        self.thread_id = threading.get_native_id()
+        self._attached_at = time.monotonic()
+        self._wakeups_at_attach = thread_wakeups(self.thread_id)
+
+    def in_loop(self):
+        return self.loop is not None and threading.get_native_id() == self.thread_id
+
+    def call(self, fn, *args):
+        """ループのスレッドで fn(*args) を呼ぶ（ループの中・ループ開始前ならその場で呼ぶ）"""
+        if self.loop is None or self.in_loop():
+            fn(*args)
+        else:
+            self.loop.call_soon_threadsafe(fn, *args)
+
+    def callback(self, fn):
+        """呼ばれたら fn をループのスレッドで実行する関数（再生の完了時コールバック用）"""
+        def run(*args):
+            self.call(fn, *args)
+        return run
+
+    def spawn(self, coro, name=None):
+        """
+        コルーチンをループのタスクとして動かす（他のスレッドからも可）。
+        name を付けると同じ名前で実行中のタスクは取り消して置き換え、cancel_job(name) で取り消せる。
+        """
+        def start():
+            if name is not None:
+                self.cancel_job(name)
+            task = self.loop.create_task(coro)
+            self._tasks.add(task)
+            task.add_done_callback(partial(self._task_done, name))
+            if name is not None:
+                self._jobs[name] = task
+        self.call(start)
+
+    def _task_done(self, name, task):
+        self._tasks.discard(task)
+        if name is not None and self._jobs.get(name) is task:
+            del self._jobs[name]
+        if not task.cancelled() and task.exception() is not None:
+            print(f"❌ タスクエラー: {task.exception()}")
+
+    def job_running(self, name):
+        return name in self._jobs
+
+    def cancel_job(self, name):
+        """名前付きのタスクを取り消す（ループのスレッドから呼ぶ）。実行中だったら True"""
+        task = self._jobs.pop(name, None)
+        if task is None or task.done():
+            return False
+        task.cancel()
+        return True
+
+    async def run_blocking(self, fn, *args):
+        """ブロックする処理をスレッドプールで実行して結果を待つ"""
+        return await self.loop.run_in_executor(None, fn, *args)
+
+    def completion(self):
+        """(Future, 完了時コールバック) を返す。コールバックが呼ばれると Future が完了する"""
+        future = self.loop.create_future()
+
+        def done(*_):
+            if not future.done():
+                future.set_result(True)
+        return future, self.callback(done)
+
+    # ----- 名前付きタイマー -----
+    def set_timer(self, name, delay, fn, *args):
+        """delay 秒後に fn(*args) をループで呼ぶ（同じ名前の予約は置き換える）"""
+        def arm():
+            self._cancel(name)
+            self._timers[name] = self.loop.call_later(delay, self._fire, name, fn, args)
+        self.call(arm)
+
+    def cancel_timer(self, name):
+        self.call(self._cancel, name)
+
+    def _cancel(self, name):
+        handle = self._timers.pop(name, None)
+        if handle is not None:
+            handle.cancel()
+
+    def _fire(self, name, fn, args):
+        self._timers.pop(name, None)
+        fn(*args)
+
+    def timers(self):
+        """予約中のタイマーと発火までの秒数"""
+        if self.loop is None:
+            return {}
+        now = self.loop.time()
+        return {name: round(handle.when() - now, 3) for name, handle in self._timers.items()}
+
+    # ----- 計測 -----
+    def record_dispatch(self, seconds):
+        self.dispatch.append(seconds)
+
+    def report(self):
+        wakeups = thread_wakeups(self.thread_id) if self.thread_id else None
+        elapsed = time.monotonic() - self._attached_at if self._attached_at else None
+        rate = None
+        if wakeups is not None and self._wakeups_at_attach is not None and elapsed:
+            rate = (wakeups - self._wakeups_at_attach) / elapsed
+        return {
+            'loop_wakeups_per_sec': rate,
+            'process_wakeups': process_wakeups(),
+            'timers': self.timers(),
+            'tasks': len(self._tasks),
+            'jobs': sorted(self._jobs),
+            'dispatch': summarize(self.dispatch) if self.dispatch else {},
+        }
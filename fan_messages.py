@@ -4,8 +4,6 @@
 ブログファンからのメッセージ取得・再生モジュール（キャッシュ版）
 """
 
-import requests
-import boto3
 import os
 import subprocess
 import struct
@@ -13,6 +11,8 @@ import json
 from pathlib import Path
 from dotenv import load_dotenv
 
+from normalize_audio import normalize_file
+
 # 環境変数を読み込み
 load_dotenv()
 SPEAKER_CARD = os.getenv('SPEAKER_CARD', '2')
@@ -56,6 +56,7 @@ def get_fan_messages(force_refresh=False):
     
     # APIから取得
     try:
+        import requests
         response = requests.get(MESSAGES_API_URL, timeout=10)
         response.raise_for_status()
         messages = response.json()
@@ -75,6 +76,7 @@ def get_fan_messages(force_refresh=False):
 
 def text_to_speech_polly(text, voice=DEFAULT_VOICE, engine=DEFAULT_ENGINE, sample_rate=SAMPLE_RATE, text_type="text"):
     """Amazon PollyでテキストをPCM音声に変換"""
+    import boto3  # 読み込みに時間がかかるので、使うときに import する
     polly = boto3.client("polly", region_name=DEFAULT_REGION)
     
     response = polly.synthesize_speech(
@@ -171,17 +173,18 @@ def make_wav_from_pcm(pcm_bytes: bytes, sample_rate: int = 16000, channels: int
     
     return header + pcm_bytes
 
-def generate_message_audio(msg):
-    """メッセージIDを指定して音声ファイルを生成（キャッシュディレクトリ保存）"""
+def message_file_stem(msg):
+    """音声ファイル名の元になる文字列（タイムスタンプ_名前）"""
+    ts = msg['timestamp'].replace(':', '').replace('-', '').replace('T', '').replace('Z', '').replace('.000', '').replace('/', '').replace(' ', '')
+    return f"{ts}_{msg['name']}"
+
+def generate_name_audio(msg):
+    """送信者名の音声ファイルだけを生成（一覧の先読み用。本文は再生するときに生成する）"""
     from datetime import datetime
-    
+
     name = msg['name']
     timestamp_str = msg['timestamp']
-    message_text = msg['message']
-    
-    # タイムスタンプからファイル名用の文字列生成
-    ts = timestamp_str.replace(':', '').replace('-', '').replace('T', '').replace('Z', '').replace('.000', '').replace('/', '').replace(' ', '')
-    
+
     # タイムスタンプから日付を取得
     if 'T' in timestamp_str or 'Z' in timestamp_str:
         dt = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00'))
@@ -189,8 +192,7 @@ def generate_message_audio(msg):
         dt = datetime.strptime(timestamp_str, '%Y/%m/%d %H:%M:%S')
     date_str = dt.strftime('%m月%d日')
 
-    # 名前音声
-    name_file = NAMES_DIR / f"{ts}_{name}.wav"
+    name_file = NAMES_DIR / f"{message_file_stem(msg)}.wav"
     if not name_file.exists():
         print(f"  生成中(名前): {name_file.name}")
         pcm_mono = text_to_speech_polly(f"{date_str}、{name}さん")
@@ -198,16 +200,24 @@ def generate_message_audio(msg):
         name_file.parent.mkdir(parents=True, exist_ok=True)
         with open(name_file, 'wb') as f:
             f.write(wav_data)
+        normalize_file(str(name_file))
+    return True
+
+def generate_message_audio(msg):
+    """メッセージIDを指定して音声ファイルを生成（キャッシュディレクトリ保存）"""
+    # 名前音声
+    generate_name_audio(msg)
 
     # メッセージ音声
-    message_file = MESSAGES_DIR / f"{ts}_{name}.wav"
+    message_file = MESSAGES_DIR / f"{message_file_stem(msg)}.wav"
     if not message_file.exists():
         print(f"  生成中(本文): {message_file.name}")
-        pcm_mono = text_to_speech_polly(message_text)
+        pcm_mono = text_to_speech_polly(msg['message'])
         wav_data = make_wav_from_pcm(mono_to_stereo_pcm(pcm_mono))
         message_file.parent.mkdir(parents=True, exist_ok=True)
         with open(message_file, 'wb') as f:
             f.write(wav_data)
+        normalize_file(str(message_file))
     
     return True
 
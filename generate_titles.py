@@ -47,10 +47,10 @@ for i, filename in enumerate(files):
         with open(pcm_file, 'wb') as f:
             f.write(pcm_data)
         
-        # ffmpegでWAVに変換
+        # ffmpegでWAVに変換（ミキサーと同じ 44100Hz ステレオ）
         subprocess.run([
             'ffmpeg', '-f', 's16le', '-ar', '16000', '-ac', '1',
-            '-i', pcm_file, '-ar', '48000', '-ac', '2', output_path, '-y'
+            '-i', pcm_file, '-ar', '44100', '-ac', '2', output_path, '-y'
         ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
         
         os.remove(pcm_file)
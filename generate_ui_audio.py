@@ -17,6 +17,8 @@ import boto3
 from pathlib import Path
 from dotenv import load_dotenv
 
+from normalize_audio import normalize_file
+
 load_dotenv()
 
 PROJECT_DIR = Path(os.path.dirname(os.path.abspath(__file__)))
@@ -84,7 +86,7 @@ def make_wav_from_pcm(pcm_bytes, sample_rate=16000, channels=2):
     return header + pcm_bytes
 
 
-def generate_beep(filepath, freq=880, duration=0.15, sample_rate=16000, volume=0.5):
+def generate_beep(filepath, freq=880, duration=0.15, sample_rate=44100, volume=0.5):
     """正弦波ビープ音を生成"""
     filepath = Path(filepath)
     filepath.parent.mkdir(parents=True, exist_ok=True)
@@ -130,6 +132,8 @@ def generate_wav(text, filepath, text_type="text", volume_scale=1.0):
     wav = make_wav_from_pcm(mono_to_stereo_pcm(pcm, volume_scale=volume_scale))
     with open(filepath, "wb") as f:
         f.write(wav)
+    # Polly の 16kHz をミキサーの形式に変換
+    normalize_file(str(filepath))
     print(f"  ✓ 完了: {filepath.name}")
 
 
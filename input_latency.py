@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キー入力から最初の音が出るまでの時間の計測モジュール
+
+evdev イベントのカーネル時刻（event.sec / event.usec）を入力ごとに記録し、
+その入力で最初に積まれた再生アイテムが Sound.play() / デコーダーの最初のチャンク投入に
+達した時刻との差を、メニュー別・アイテム種別ごとに直近の履歴として保持する。
+
+実行中の本体の統計を CLI で表示する場合:
+  python3 input_latency.py
+  python3 input_latency.py --url http://raspberrypi.local:5000/stats --watch 5
+"""
+
+import time
+import threading
+import argparse
+from collections import deque
+
+# 保持する直近のサンプル数（キーごと）
+WINDOW = 500
+
+# ヒストグラムの区切り（ミリ秒）
+BUCKETS_MS = (10, 20, 50, 100, 200, 500, 1000)
+
+
+def event_monotonic(sec, usec):
+    """evdev のカーネル時刻（CLOCK_REALTIME）を time.monotonic() の基準に換算"""
+    return time.monotonic() - (time.time() - (sec + usec / 1000000.0))
+
+
+class InputStamp:
+    """1回の入力イベント（押されたキー、その時点のメニュー、monotonic 時刻）"""
+    __slots__ = ('at', 'menu', 'key')
+
+    def __init__(self, at, menu, key=None):
+        self.at = at
+        self.menu = menu
+        self.key = key
+
+
+def summarize(values):
+    """秒単位のサンプルを p50/p95/p99 とヒストグラムに集計"""
+    ordered = sorted(values)
+    n = len(ordered)
+
+    def pick(p):
+        return ordered[min(n - 1, int(n * p))]
+
+    buckets = {}
+    for bound in BUCKETS_MS:
+        buckets[f"<={bound}ms"] = 0
+    buckets[f">{BUCKETS_MS[-1]}ms"] = 0
+    for v in ordered:
+        ms = v * 1000
+        label = next((f"<={b}ms" for b in BUCKETS_MS if ms <= b), f">{BUCKETS_MS[-1]}ms")
+        buckets[label] += 1
+
+    return {
+        'count': n,
+        'p50': pick(0.50),
+        'p95': pick(0.95),
+        'p99': pick(0.99),
+        'max': ordered[-1],
+        'buckets': buckets,
+    }
+
+
+class LatencyHistogram:
+    """メニュー別・アイテム種別ごとの直近の遅延（秒）"""
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._all = deque(maxlen=window)
+        self._by_menu = {}
+        self._by_item_type = {}
+        self._lock = threading.Lock()
+
+    def record(self, menu, item_type, seconds):
+        with self._lock:
+            self._all.append(seconds)
+            self._by_menu.setdefault(menu, deque(maxlen=self.window)).append(seconds)
+            self._by_item_type.setdefault(item_type, deque(maxlen=self.window)).append(seconds)
+
+    def report(self):
+        with self._lock:
+            if not self._all:
+                return {}
+            return {
+                'all': summarize(self._all),
+                'by_menu': {name: summarize(v) for name, v in self._by_menu.items()},
+                'by_item_type': {name: summarize(v) for name, v in self._by_item_type.items()},
+            }
+
+
+def format_report(report):
+    """report() の結果を表形式の文字列にする"""
+    if not report:
+        return "計測値なし（まだキー入力がありません）"
+
+    def row(label, s):
+        return (f"  {label:<22} n={s['count']:<4} p50={s['p50'] * 1000:6.1f}ms "
+                f"p95={s['p95'] * 1000:6.1f}ms p99={s['p99'] * 1000:6.1f}ms max={s['max'] * 1000:6.1f}ms")
+
+    lines = ["⌨️ キー入力 → 最初の音", row("全体", report['all'])]
+    lines.append("メニュー別:")
+    lines += [row(name, s) for name, s in sorted(report['by_menu'].items())]
+    lines.append("アイテム種別:")
+    lines += [row(name, s) for name, s in sorted(report['by_item_type'].items())]
+    lines.append("分布（全体）: " + " ".join(f"{k}:{v}" for k, v in report['all']['buckets'].items()))
+    return "\n".join(lines)
+
+
+def main():
+    import requests
+
+    parser = argparse.ArgumentParser(description="キー入力から最初の音までの時間を表示")
+    parser.add_argument('--url', default='http://localhost:5000/stats', help="本体の統計 API")
+    parser.add_argument('--watch', type=float, default=0, help="指定秒ごとに更新表示")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            stats = requests.get(args.url, timeout=5).json()
+            print(format_report(stats.get('input_latency', {})))
+        except Exception as e:
+            print(f"❌ 統計の取得に失敗しました: {e}")
+        if not args.watch:
+            break
+        time.sleep(args.watch)
+        print()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+キー入力の記録と再生（実機のノブを回さずに操作を再現する）
+
+keyboard_test_v2.py --record-input で、占有したキーボードのキーイベントを
+カーネル時刻付きで JSON Lines に記録する。1行目は記録開始時の操作状態（session_snapshot）を含むヘッダー、
+最後の行は記録を終えた時刻。
+
+  {"trace": 1, "device": "...", "started": 1760000000.0, "state": {...}}
+  {"t": 1.234567, "type": 1, "code": 115, "key": "KEY_VOLUMEUP", "value": 1}
+  {"t": 42.0, "end": true}
+
+keyboard_test_v2.py --replay-input で記録を入力ループに流す（キーボードは使わない）。
+ヘッダーの操作状態から始め、投稿・再起動は行わない。録音は arecord の代わりに SilentRecording が無音の WAV を書く。
+ヘッダーに取得済みの一覧があれば取得し直さず、物語は URL の代わりに無音の WAV（story_stand_in）を流すので、ネットワークなしで再現できる。--audio-output null と組み合わせると
+サウンドカードなしで操作全体を同じ条件で繰り返し計測できる。
+--replay-speed で待ち時間を縮める場合も、REALTIME_GAP 秒以下の間隔（ノブの回転・長押し）はそのまま再現する。
+
+  python3 input_trace.py show traces/browse_birds.jsonl              # 内容の要約
+  sudo python3 input_trace.py play traces/browse_birds.jsonl         # 仮想キーボード（uinput）から送る
+
+play は evdev を通した入力まで含めて再現する。本体は名前に Keyboard を含む最初のデバイスを使うので、
+実機のキーボードを外した状態で play を起動し、--wait 秒の間に本体を起動する。
+"""
+
+import os
+import sys
+import json
+import time
+import wave
+import asyncio
+import argparse
+import threading
+from collections import Counter
+
+TRACE_VERSION = 1
+
+# 高速再生でも縮めない間隔（秒）。ノブを回す速さ・長押しの長さが変わらないように
+REALTIME_GAP = 1.0
+
+# 再生中に物語の代わりに流す無音の長さ（秒）
+STORY_SECONDS = 120
+
+# uinput で作る仮想キーボードの名前（keyboard_test_v2.py は名前に Keyboard を含むデバイスを使う）
+UINPUT_NAME = 'Replay Keyboard'
+
+
+class TraceRecorder:
+    """キーイベントを記録開始からの時刻付きで書き出す（1行ずつ書くので途中で落ちても残る）"""
+    def __init__(self, path, device=None, state=None):
+        self.path = path
+        self.count = 0
+        self._started = time.time()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'w', encoding='utf-8', buffering=1)
+        self._write({'trace': TRACE_VERSION, 'device': device, 'started': self._started, 'state': state})
+
+    def _write(self, record):
+        self._file.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    def record(self, event, key=None):
+        """evdev のイベント（カーネル時刻）を記録。key はキー名（evdev.categorize の keycode）"""
+        at = event.sec + event.usec / 1000000.0 - self._started
+        self._write({'t': round(at, 6), 'type': event.type, 'code': event.code, 'key': key, 'value': event.value})
+        self.count += 1
+
+    def close(self):
+        if self._file.closed:
+            return
+        self._write({'t': round(time.time() - self._started, 6), 'end': True})
+        self._file.close()
+        print(f"💾 入力を記録しました: {self.path}（{self.count}件）")
+
+
+class SilentRecording:
+    """
+    再生中の録音の代わり（arecord の Popen と同じ wait / terminate を持つ）。
+    止めるか上限の秒数に達すると、その長さの無音の WAV（16kHz モノラル）を書いて終わる
+    """
+    def __init__(self, path, limit=60.0, rate=16000):
+        self.path = path
+        self.limit = limit
+        self.rate = rate
+        self.returncode = None
+        self._started = time.monotonic()
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+
+    def terminate(self):
+        self._stopped.set()
+
+    def wait(self):
+        """止められるか上限に達するまで待ち、WAV を書く"""
+        self._stopped.wait(max(0.0, self.limit - (time.monotonic() - self._started)))
+        self._finish()
+        return self.returncode
+
+    def _finish(self):
+        with self._lock:
+            if self.returncode is not None:
+                return
+            write_silence(self.path, min(self.limit, time.monotonic() - self._started), self.rate)
+            self.returncode = 0
+
+
+def write_silence(path, seconds, rate=16000):
+    """seconds 秒の無音の WAV（16bit モノラル）を書く"""
+    with wave.open(path, 'wb') as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(b'\0\0' * int(seconds * rate))
+
+
+def story_stand_in(directory, seconds=STORY_SECONDS):
+    """再生中に物語の代わりに流す無音の WAV のパス（なければ書く）。物語の URL に触れずに同じ操作を進める"""
+    path = os.path.join(directory, 'story.replay.wav')
+    if not os.path.exists(path):
+        write_silence(path, seconds)
+    return path
+
+
+def load_trace(path):
+    """記録を読む。(ヘッダー, イベントのリスト, 終了時刻) を返す（終了の行がなければ最後のイベントの時刻）"""
+    header, events, end = {}, [], None
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            if 'trace' in record:
+                if record['trace'] != TRACE_VERSION:
+                    raise ValueError(f"対応していない記録の版です: {record['trace']}")
+                header = record
+            elif record.get('end'):
+                end = record['t']
+            else:
+                events.append(record)
+    events.sort(key=lambda e: e['t'])
+    if end is None:
+        end = events[-1]['t'] if events else 0.0
+    return header, events, end
+
+
+def event_code(record):
+    """記録のキーコード（code がなければキー名から引く）"""
+    if record.get('code') is not None:
+        return record['code']
+    from evdev import ecodes
+    return ecodes.ecodes[record['key']]
+
+
+def replay_times(events, end, speed=1.0):
+    """
+    各イベントを送る時刻（再生開始からの秒）と終了時刻。
+    speed > 1 なら REALTIME_GAP を超える待ちだけを縮める
+    """
+    times, at, previous = [], 0.0, 0.0
+    for record in events + [{'t': end}]:
+        gap = max(0.0, record['t'] - previous)
+        if speed > 1.0 and gap > REALTIME_GAP:
+            gap = REALTIME_GAP + (gap - REALTIME_GAP) / speed
+        at += gap
+        previous = record['t']
+        times.append(at)
+    return times[:-1], times[-1]
+
+
+async def replay_events(path, speed=1.0):
+    """
+    記録を時刻どおりに evdev の InputEvent として返す非同期イテレータ（keyboard.async_read_loop() の代わり）。
+    イベントの時刻は送った時点のカーネル時刻（CLOCK_REALTIME）。記録の終了時刻まで待ってから終わる
+    """
+    from evdev import InputEvent
+    _, events, end = load_trace(path)
+    times, finish = replay_times(events, end, speed)
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for record, at in zip(events, times):
+        await asyncio.sleep(max(0.0, start + at - loop.time()))
+        now = time.time()
+        sec = int(now)
+        yield InputEvent(sec, int((now - sec) * 1000000), record['type'], event_code(record), record['value'])
+    await asyncio.sleep(max(0.0, start + finish - loop.time()))
+
+
+def describe(path):
+    """記録の要約（表示用の行）"""
+    header, events, end = load_trace(path)
+    presses = Counter(e.get('key') or e['code'] for e in events if e['value'] == 1)
+    state = header.get('state') or {}
+    lines = [f"記録: {path}",
+             f"  デバイス: {header.get('device') or '不明'} / 長さ: {end:.1f}秒 / イベント: {len(events)}件",
+             f"  開始時の状態: {state.get('mode', '不明')}（メニュー {state.get('current_menu', '-')}）"]
+    for key, count in presses.most_common():
+        lines.append(f"  {key}: {count}回")
+    return lines
+
+
+def play_uinput(path, speed=1.0, wait=0.0):
+    """仮想キーボード（uinput）を作り、wait 秒後から記録を送る（root 権限が必要）"""
+    from evdev import UInput, ecodes
+    _, events, end = load_trace(path)
+    keys = sorted({event_code(e) for e in events if e['type'] == ecodes.EV_KEY})
+    times, finish = replay_times(events, end, speed)
+    with UInput({ecodes.EV_KEY: keys}, name=UINPUT_NAME) as device:
+        print(f"⌨️ {UINPUT_NAME}（{device.device.path}）から {wait:.0f}秒後に {len(events)}件を送ります")
+        time.sleep(wait)
+        start = time.monotonic()
+        for record, at in zip(events, times):
+            time.sleep(max(0.0, start + at - time.monotonic()))
+            device.write(record['type'], event_code(record), record['value'])
+            device.syn()
+        time.sleep(max(0.0, start + finish - time.monotonic()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="キー入力の記録（keyboard_test_v2.py --record-input）を表示・再生")
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('show', help="記録の内容を要約して表示")
+    p.add_argument('trace')
+    p = sub.add_parser('play', help="仮想キーボード（uinput）から記録を送る")
+    p.add_argument('trace')
+    p.add_argument('--speed', type=float, default=1.0, help=f"{REALTIME_GAP}秒を超える待ちを縮める倍率")
+    p.add_argument('--wait', type=float, default=15.0, help="仮想キーボードを作ってから送り始めるまでの秒数（本体の起動を待つ）")
+    args = parser.parse_args()
+
+    if args.command == 'show':
+        for line in describe(args.trace):
+            print(line)
+    else:
+        try:
+            play_uinput(args.trace, args.speed, args.wait)
+        except (OSError, ImportError) as e:
+            print(f"❌ 仮想キーボードを作れません（evdev と /dev/uinput の書き込み権限が必要）: {e}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,4 +1,9 @@
 #!/usr/bin/env python3
+# 起動の各段階の時間を計測するため最初に読み込む（startup_profiler.py）
+from startup_profiler import StartupProfiler, DEFAULT_REPORT_PATH as STARTUP_PROFILE_PATH
+startup_profile = StartupProfiler()
+startup_profile.phase('imports')
+
 import evdev
 import pygame
 import os
@@ -6,74 +11,53 @@ import time
 import sys
 import subprocess
 import threading
-import requests
 import json
-import select
-import queue
+import asyncio
+import argparse
+from functools import partial
 from datetime import datetime
 
 
-
-
-# ★testtestファンメッセージモジュールをインポート
-from fan_messages import get_fan_messages, generate_message_audio, text_to_speech_polly, make_wav_from_pcm, mono_to_stereo_pcm
-
-# ブログ投稿モジュールをインポート
-from blog_poster import post_blog
-
-# Flaskモジュールをインポート
-from flask import Flask, request, jsonify
-app = Flask(__name__)
+# ファンメッセージ（boto3）・ブログ投稿（MEGA）・音声認識（openai）・Flask・requests は
+# 起動を速くするため、使う機能の中で import する（lazy_imports.py）
+
+# 音声キュー管理モジュールをインポート
+from audio_manager import SequentialAudioManager
+from audio_output import OUTPUT_BACKENDS, DEFAULT_RECORD_PATH, init_output, is_virtual
+from mixer_channels import init_channel_groups
+from sound_cache import SoundCache
+from prompt_prefetcher import PromptPrefetcher, neighbor_indices
+from input_latency import InputStamp, event_monotonic, format_report
+from normalize_audio import warn_off_format
+from startup_loader import StartupLoader
+from direction_alert import DirectionAlerts
+from mixer_control import MixerController
+from session_state import SessionState, STATE_PATH
+from event_loop import LoopBridge
+from knob_navigation import KnobNavigator, advance, make_tick
+import input_trace
+import audio_devices
+import lazy_imports
 
 # 環境変数を読み込み
+startup_profile.phase('dotenv')
 import os
 from dotenv import load_dotenv
 load_dotenv()
 
 # ========== オーディオデバイス自動検出 ==========
-def detect_audio_devices():
-    """aplay -l / arecord -l を解析してUSBオーディオデバイスを自動検出"""
-    def parse_card_numbers(cmd):
-        """コマンド出力からカード番号とデバイス名を取得"""
-        try:
-            result = subprocess.run(cmd, capture_output=True, text=True, timeout=5)
-            cards = []
-            for line in result.stdout.split('\n'):
-                if line.startswith('カード') or line.startswith('card '):
-                    # "カード 2: ..." or "card 2: ..."
-                    parts = line.split(':')
-                    num = parts[0].split()[-1]
-                    name = parts[1].strip() if len(parts) > 1 else ''
-                    cards.append((num, name))
-            return cards
-        except Exception as e:
-            print(f"⚠️ デバイス検出エラー ({cmd}): {e}")
-            return []
-
-    def pick_usb_card(cards):
-        """USB接続のデバイスを優先して選択（bcm2835等の内蔵を除外）"""
-        for num, name in cards:
-            # 内蔵オーディオを除外
-            if 'bcm2835' in name.lower() or 'vc4' in name.lower() or 'hdmi' in name.lower():
-                continue
-            return num
-        # USBデバイスが見つからなければ最初のカードを返す
-        return cards[0][0] if cards else None
-
-    speaker = pick_usb_card(parse_card_numbers(['aplay', '-l']))
-    mic = pick_usb_card(parse_card_numbers(['arecord', '-l']))
-    return speaker, mic
-
+startup_profile.phase('device_detection')
+# /proc/asound を直接読んで USB オーディオデバイスを選ぶ（audio_devices.py）。
+# 'auto' またはカード ID の設定は、カードの抜き差しに合わせて実行中に選び直す（on_audio_cards_changed）
 ENV = os.getenv('ENVIRONMENT', 'jikka')
 _speaker_env = os.getenv('SPEAKER_CARD', 'auto').strip().lower()
 _mic_env = os.getenv('MIC_CARD', 'auto').strip().lower()
 
 if _speaker_env == 'auto' or _mic_env == 'auto':
     print("🔍 オーディオデバイスを自動検出中...")
-    _det_speaker, _det_mic = detect_audio_devices()
 
-SPEAKER_CARD = _det_speaker if _speaker_env == 'auto' else _speaker_env
-MIC_CARD = _det_mic if _mic_env == 'auto' else _mic_env
+SPEAKER_CARD = audio_devices.resolve(_speaker_env, 'playback')
+MIC_CARD = audio_devices.resolve(_mic_env, 'capture')
 
 if SPEAKER_CARD is None:
     print("❌ スピーカーデバイスが見つかりません。SPEAKER_CARD を .env に手動設定してください。")
@@ -82,17 +66,56 @@ if MIC_CARD is None:
     print("⚠️ マイクデバイスが見つかりません。録音機能は無効です。")
     MIC_CARD = '-1'
 
+startup_profile.phase('config')
 MIN_VOLUME = int(os.getenv('MIN_VOLUME', '15'))
+DIRECTION_GAIN = float(os.getenv('DIRECTION_GAIN', '1.0'))
 DIRECTION_VOLUME = int(os.getenv('DIRECTION_VOLUME', '100'))
+WARM_IMPORTS = os.getenv('WARM_IMPORTS', 'true').strip().lower() in ('1', 'true', 'yes')
 DIRECTION_BOOST = float(os.getenv('DIRECTION_BOOST', '4.0'))
+AUDIO_GAP = float(os.getenv('AUDIO_GAP', '0.2'))
+CUE_GAP = float(os.getenv('CUE_GAP', '0.15'))
+AUDIO_DECODER = os.getenv('AUDIO_DECODER', 'stream').strip().lower()
+SOUND_CACHE_MB = int(os.getenv('SOUND_CACHE_MB', '64'))
+STREAM_WAV_MB = float(os.getenv('STREAM_WAV_MB', '2'))
+NAV_SETTLE = float(os.getenv('NAV_SETTLE', '0.3'))
+NAV_TICK = os.getenv('NAV_TICK', 'true').strip().lower() in ('1', 'true', 'yes')
+
+# コマンドライン引数（指定があれば環境変数より優先）
+DEFAULT_TRACE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'input_trace.jsonl')
+REPLAY_REPORT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'replay_report.json')
+_arg_parser = argparse.ArgumentParser(description="ミニキーボード音声メニュー")
+_arg_parser.add_argument('--audio-output', choices=OUTPUT_BACKENDS, help="音声出力先（pygame / alsa / null / file）")
+_arg_parser.add_argument('--audio-speed', type=float, help="null / file 出力の時間の倍率")
+_arg_parser.add_argument('--audio-record', help="file 出力の保存先 WAV")
+_arg_parser.add_argument('--profile-startup', nargs='?', const=STARTUP_PROFILE_PATH, metavar='JSON',
+                         help="起動完了までの段階ごとの時間を JSON に保存して終了する")
+_arg_parser.add_argument('--record-input', nargs='?', const=DEFAULT_TRACE_PATH, metavar='JSONL',
+                         help="キー入力を記録する（input_trace.py）")
+_arg_parser.add_argument('--replay-input', metavar='JSONL',
+                         help="キーボードの代わりに記録した入力を流し、終わったら計測結果を保存して終了する")
+_arg_parser.add_argument('--replay-speed', type=float, default=1.0,
+                         help="再生時に1秒を超える待ちを縮める倍率")
+cli_args, _ = _arg_parser.parse_known_args()
+
+# 記録した入力の再生中（投稿・再起動・通知チェックは行わず、操作状態は別のファイルに保存）
+REPLAYING = bool(cli_args.replay_input)
+
+AUDIO_OUTPUT = cli_args.audio_output or os.getenv('AUDIO_OUTPUT', 'pygame').strip().lower()
+AUDIO_SPEED = cli_args.audio_speed or float(os.getenv('AUDIO_SPEED', '1.0'))
+AUDIO_RECORD = cli_args.audio_record or os.getenv('AUDIO_RECORD', DEFAULT_RECORD_PATH)
 
 # 環境設定の確認
 print(f"🌍 環境: {ENV}")
 print(f"🔊 スピーカー: hw:{SPEAKER_CARD},0" + (" (自動検出)" if _speaker_env == 'auto' else ""))
 print(f"🎤 マイク: hw:{MIC_CARD},0" + (" (自動検出)" if _mic_env == 'auto' else ""))
+for _line in audio_devices.describe(audio_devices.list_cards()):
+    print(f"   {_line}")
 print(f"📉 背景音最小音量: {MIN_VOLUME}%")
-print(f"🧭 方向通知割り込み音量: {DIRECTION_VOLUME}%")
+print(f"🧭 方向通知ソフトウェアゲイン: {DIRECTION_GAIN}倍 / 通知中のハードウェア音量: {DIRECTION_VOLUME}%")
 print(f"🚀 方向通知ベースブースト: {DIRECTION_BOOST}倍")
+print(f"⏱️ 再生間隔: {AUDIO_GAP}秒 / 案内音→本文: {CUE_GAP}秒 / ノブ停止→読み上げ: {NAV_SETTLE}秒")
+print(f"🗃️ 音声キャッシュ: {SOUND_CACHE_MB}MB")
+print(f"📤 音声出力: {AUDIO_OUTPUT}")
 
 
 
@@ -111,8 +134,6 @@ if 'XDG_RUNTIME_DIR' not in os.environ:
     uid = os.getuid()
     os.environ['XDG_RUNTIME_DIR'] = f'/run/user/{uid}'
 
-# オーディオデバイス指定（PulseAudio優先、なければALSA）
-os.environ['SDL_AUDIODRIVER'] = 'pulseaudio'
 
 
 
@@ -144,12 +165,11 @@ mode = "main_menu"  # "main_menu", "fan_message_menu", "playing_message", "mukas
 # ブログ投稿用
 blog_audio_file = None
 blog_recording_process = None
-blog_confirm_start_time = 0
 
 
-# ノブ回転カウント
-knob_counter = 0
+# ノブ回転（knob_threshold クリックで1項目。速く回すとまとめて進む）
 knob_threshold = 3
+knob = KnobNavigator(threshold=knob_threshold, settle=NAV_SETTLE)
 
 # 重複防止用
 last_mute_time = 0
@@ -163,42 +183,47 @@ button3_press_time = 0  # ← 追加
 volume_adjusting = False
 current_volume = 70
 
-# ブログ準備モードタイムアウト用
-blog_ready_start_time = 0
+# ブログ投稿のタイムアウト（秒）。ループのタイマーで予約する
+BLOG_READY_TIMEOUT = 180    # 準備モード（3分）
+BLOG_CONFIRM_TIMEOUT = 20   # 録音上限後の確認
+
+# 一覧の読み込み・音声の生成を待つタスクの名前（戻るボタンで取り消す）
+LOADING_JOB = 'loading'
+# 「録音開始」の案内が鳴り終わるのを待って録音を始めるタスク
+BLOG_CUE_JOB = 'blog_cue'
+# 待ち時間の案内: この秒数で終わらなければ案内音声、その後はこの間隔でビープ音
+LOADING_CUE_DELAY = 0.5
+LOADING_TICK = 3.0
+
+# 通知・リマインドの確認間隔（秒）
+NOTIFY_CHECK_INTERVAL = 60
 
+# キー入力・タイマー・再生完了を1つの asyncio ループで処理する（event_loop.py）
+loop_bridge = LoopBridge()
 
-# pygame初期化（PulseAudio優先、ALSAフォールバック）
+
+# pygame初期化（出力先は AUDIO_OUTPUT / --audio-output で選択。既定は PulseAudio優先、ALSAフォールバック）
+startup_profile.phase('mixer_init')
 try:
-    pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=1024)
-    print(f"🔊 オーディオドライバー: {os.environ.get('SDL_AUDIODRIVER', 'auto')}")
-except pygame.error:
-    print("⚠️ PulseAudioで開けません。ALSAで再試行...")
-    os.environ['SDL_AUDIODRIVER'] = 'alsa'
-    _audio_devices = ['plug:dmixed', f'plughw:{SPEAKER_CARD},0', f'hw:{SPEAKER_CARD},0', 'default']
-    for _dev in _audio_devices:
-        try:
-            os.environ['AUDIODEV'] = _dev
-            pygame.mixer.init(frequency=44100, size=-16, channels=2, buffer=1024)
-            print(f"🔊 オーディオデバイス: {_dev}")
-            break
-        except pygame.error:
-            print(f"⚠️ {_dev} を開けません。次を試します...")
-            continue
-    else:
-        print("❌ 利用可能なオーディオデバイスが見つかりません")
-        sys.exit(1)
-pygame.mixer.set_num_channels(16) # チャンネル数を増やす
+    print(f"🔊 オーディオ出力: {init_output(AUDIO_OUTPUT, SPEAKER_CARD, speed=AUDIO_SPEED, path=AUDIO_RECORD)}")
+except (pygame.error, ValueError) as e:
+    print(f"❌ 利用可能なオーディオデバイスが見つかりません: {e}")
+    sys.exit(1)
+# 用途別にチャンネルを予約（UI / コンテンツ / 通知 / ビープ）
+channel_groups = init_channel_groups()
+# ノブで項目が動いたときのクリック音（合成するのでファイルは不要）
+nav_tick = make_tick(pygame) if NAV_TICK else None
 
 # 音声を事前ロード
 sounds = {}
 
-# ffplay再生プロセス管理
-ffplay_process = None
+# 音声の読み込みと、足りない音声（通知・方角）のバックグラウンド生成
+startup_loader = StartupLoader(sounds)
 
 
 # ========== 音声関連 ==========
 def load_sounds():
-    """起動時に全音声ファイルをロード"""
+    """起動時に全音声ファイルをロード（音声パックを mmap して展開済み PCM から作成）"""
     global sounds
 
     sound_files = {
@@ -230,15 +255,19 @@ def load_sounds():
         'dir_west': f'{AUDIO_DIR}/direction/west.wav',
     }
 
+    # 元の WAV が更新されていればパックは自動で作り直される（デコードは並列）
+    startup_loader.load(sound_files)
 
-    for key, filepath in sound_files.items():
-        if os.path.exists(filepath):
-            try:
-                sounds[key] = pygame.mixer.Sound(filepath)
-            except pygame.error as e:
-                print(f"警告: {filepath} の読み込み失敗: {e}")
-        else:
-            print(f"警告: ファイルが見つかりません: {filepath}")
+
+def polly_voice(text, text_type='text', volume_scale=1.0):
+    """Polly で text を読み上げた WAV を書き出す関数を返す（StartupLoader.generate 用）"""
+    def make(path):
+        from fan_messages import text_to_speech_polly, make_wav_from_pcm, mono_to_stereo_pcm
+        pcm = text_to_speech_polly(text, text_type=text_type)
+        wav = make_wav_from_pcm(mono_to_stereo_pcm(pcm, volume_scale=volume_scale))
+        with open(path, 'wb') as f:
+            f.write(wav)
+    return make
 
 def load_bird_songs():
     """鳥のさえずりデータをロード"""
@@ -257,25 +286,33 @@ def load_bird_songs():
         print(f"⚠️ {json_path} が見つかりません")
         return False
 
+def bird_name_path(index):
+    return f"{AUDIO_DIR}/bird_names/{bird_songs[index]['name']}.wav"
+
 def play_bird_name(index):
     """鳥の名前を再生"""
     if 0 <= index < len(bird_songs):
         bird = bird_songs[index]
         name = bird['name']
-        filepath = f"{AUDIO_DIR}/bird_names/{name}.wav"
+        filepath = bird_name_path(index)
         print(f"🐦 鳥の名前: {name}")
-        play_audio_file(filepath)
-
-def play_bird_song_content(index):
-    """鳥のさえずりを再生"""
+        play_audio_file(filepath, priority='nav')
+        # 前後の鳥の名前を先読み
+        prefetcher.request("bird_song_menu", [
+            (bird_name_path(i), None, None) for i in neighbor_indices(index, len(bird_songs))
+        ])
+
+def play_bird_song_content(index, lead_in=None):
+    """鳥のさえずりを再生（lead_in: 先に鳴らす案内音）"""
     global mode
     if 0 <= index < len(bird_songs):
         bird = bird_songs[index]
         filepath = f"{AUDIO_DIR}/bird_songs/{bird['filename']}"
         print(f"🎵 鳴き声再生 (2回連続): {bird['name']} ({bird['memo']})")
         mode = "playing_bird_song"
+        prefetcher.cancel()
         # 全ての鳥の鳴き声を一律 2回再生（loops=1）にする
-        play_audio_file(filepath, wait=False, loops=1, on_finish=stop_bird_song)
+        play_audio_file(filepath, wait=False, loops=1, on_finish=content_finished("playing_bird_song", "bird_song_menu"), lead_in=lead_in)
 
 def stop_bird_song():
     """鳥の声を停止"""
@@ -285,133 +322,142 @@ def stop_bird_song():
     mode = "bird_song_menu"
 
 
-class SequentialAudioManager:
-    """音声を順番に再生するマネージャー（最大待ち数2）"""
-    def __init__(self):
-        self.queue = queue.Queue(maxsize=10) # 内部的には余裕を持たせるが外部から制御
-        self.current_process = None
-        self.current_sound = None  # 現在再生中の Sound オブジェクト
-        self.current_item_type = None # 現在再生中のアイテムタイプ
-        self.stop_requested = False
-        self.worker_thread = threading.Thread(target=self._worker, daemon=True)
-        self.worker_thread.start()
-
-    def _worker(self):
-        while True:
-            item = self.queue.get()
-            if item is None: break
-            
-            # 再生開始
-            item_type, data, wait, loops, on_finish = item
-            print(f"🎬 再生開始 (Queue): {item_type}")
-            
-            try:
-                self.current_item_type = item_type
-                if item_type == "sound":
-                    self.current_sound = data
-                    self.current_sound.play(loops=loops)
-                    # 再生終了を待つ
-                    while pygame.mixer.get_busy() and not self.stop_requested:
-                        time.sleep(0.05)
-                
-                elif item_type == "file":
-                    # wavはpygame、他はffplay
-                    if data.endswith('.wav'):
-                        self.current_sound = pygame.mixer.Sound(data)
-                        self.current_sound.play(loops=loops)
-                        while pygame.mixer.get_busy() and not self.stop_requested:
-                            time.sleep(0.05)
-                    else:
-                        env = os.environ.copy()
-                        env['SDL_AUDIODRIVER'] = 'alsa'
-                        env['AUDIODEV'] = 'plug:dmixed'
-                        # ffplay
-                        self.current_process = subprocess.Popen(
-                            ['ffplay', '-nodisp', '-autoexit', '-af', 'aformat=sample_fmts=s16:sample_rates=48000', data],
-                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                        )
-                        while self.current_process.poll() is None and not self.stop_requested:
-                            time.sleep(0.1)
-                
-                elif item_type == "url":
-                    env = os.environ.copy()
-                    env['SDL_AUDIODRIVER'] = 'alsa'
-                    env['AUDIODEV'] = 'plug:dmixed'
-                    # ffplay
-                    self.current_process = subprocess.Popen(
-                        ['ffplay', '-nodisp', '-autoexit', '-af', 'aformat=sample_fmts=s16:sample_rates=48000', data],
-                        env=env, stdout=subprocess.DEVNULL, stderr=None
-                    )
-                    while self.current_process.poll() is None and not self.stop_requested:
-                        time.sleep(0.1)
+# WAV のデコード結果を LRU キャッシュ（鳥の名前・タイトル等を2回目以降はメモリから再生）
+startup_profile.phase('audio_setup')
+sound_cache = SoundCache(SOUND_CACHE_MB * 1024 * 1024)
+audio_mgr = SequentialAudioManager(gap=AUDIO_GAP, decoder=AUDIO_DECODER, groups=channel_groups, sound_cache=sound_cache,
+                                   stream_wav_bytes=int(STREAM_WAV_MB * 1024 * 1024))
+
+# メニューの前後の読み上げ音声を先読み
+prefetcher = PromptPrefetcher(sound_cache)
+
+# ハードウェア音量（amixer を毎回起動せず、ミキサーを開いたまま反映。null / file 出力では何もしない）
+hw_mixer = MixerController(SPEAKER_CARD, enabled=not is_virtual(AUDIO_OUTPUT))
+
+
+def on_audio_cards_changed(cards):
+    """カードが抜き差しされたら SPEAKER_CARD / MIC_CARD を選び直す（番号で指定したものはそのまま）"""
+    global SPEAKER_CARD, MIC_CARD
+    print("🔌 オーディオデバイスが変わりました")
+    for line in audio_devices.describe(cards):
+        print(f"   {line}")
+
+    speaker = audio_devices.resolve(_speaker_env, 'playback', cards)
+    if speaker is not None and speaker != SPEAKER_CARD:
+        print(f"🔊 スピーカー: hw:{SPEAKER_CARD},0 → hw:{speaker},0")
+        SPEAKER_CARD = speaker
+        # 音量は新しいカードにも反映する（PulseAudio 経由の出力は既定の出力先の切り替えに任せる）
+        hw_mixer.set_card(speaker)
+        hw_mixer.set_volume(current_volume)
+
+    mic = audio_devices.resolve(_mic_env, 'capture', cards)
+    if mic is None:
+        mic = '-1'
+    if mic != MIC_CARD:
+        print(f"🎤 マイク: hw:{MIC_CARD},0 → hw:{mic},0")
+        MIC_CARD = mic  # 次の録音から使う
+
+
+# カードの抜き差しの監視（main で開始）
+card_watcher = audio_devices.CardWatcher(on_audio_cards_changed)
+
+
+# ========== 操作状態の保存・復元 ==========
+# 再起動しても同じメニュー・同じ項目・物語の続きから使えるようにする（session_state.py）
+# 再生中は実機の保存内容を上書きしない
+session_state = SessionState(
+    os.path.join(os.path.dirname(STATE_PATH), 'session_state.replay.json') if REPLAYING else STATE_PATH)
+
+# 物語の再生位置はこの秒数単位で保存する（再生中の書き込みを抑える）
+STORY_POSITION_STEP = 10
+
+# 再起動前に再生していた物語 {'file', 'position'}。次にその物語を再生するときに続きから
+story_resume = None
+
+# 再生中のモード → 復元するメニュー（再起動後にいきなり再生は始めない）
+PLAYING_MENUS = {
+    "playing_message": "fan_message_menu",
+    "playing_story": "mukashimukashi_menu",
+    "playing_bird_song": "bird_song_menu",
+}
+
+
+def session_snapshot():
+    """保存する操作状態"""
+    story = story_resume
+    if mode == "playing_story" and 0 <= mukashimukashi_index < len(mukashimukashi_files):
+        position = audio_mgr.position()
+        if position is not None:
+            story = {'file': mukashimukashi_files[mukashimukashi_index],
+                     'position': int(position // STORY_POSITION_STEP * STORY_POSITION_STEP)}
+    return {
+        'mode': mode,
+        'current_menu': current_menu,
+        'mukashimukashi_index': mukashimukashi_index,
+        'fan_message_index': fan_message_index,
+        'bird_song_index': bird_song_index,
+        'mukashimukashi_files': mukashimukashi_files,
+        'fan_messages': fan_messages,
+        'story': story,
+    }
 
-            except Exception as e:
-                print(f"❌ 再生エラー: {e}")
-            finally:
-                self.current_sound = None
-                self.current_item_type = None
-            
-            # 停止フラグを戻す
-            if self.stop_requested:
-                print("🛑 再生中断")
-                self.stop_requested = False
-            
-            # 再生後の間隔
-            time.sleep(0.2)
-            
-            # 完了時コールバックの実行
-            if on_finish and not self.stop_requested:
-                try:
-                    on_finish()
-                except Exception as e:
-                    print(f"❌ 完了コールバックエラー: {e}")
-            
-            self.queue.task_done()
-
-    def play(self, item_type, data, wait=False, loops=0, urgent=False, on_finish=None):
-        """
-        音声をキューに追加。
-        urgent=True の場合は現在の再生を止めて即座にキューに追加。
-        """
-        if urgent:
-            self.stop_immediately()
-
-        # キューの制限（「次」と「その次」の最大2つにする）
-        while self.queue.qsize() >= 2:
-            try:
-                self.queue.get_nowait()
-                self.queue.task_done()
-            except queue.Empty:
-                break
-        
-        self.queue.put((item_type, data, wait, loops, on_finish))
 
-    def stop_immediately(self):
-        """現在の再生を強制停止し、キューも空にする"""
-        # キューを空にする
-        with self.queue.mutex:
-            self.queue.queue.clear()
-        
-        # 実行中の停止指示
-        self.stop_requested = True
-        if pygame.mixer.get_init():
-            pygame.mixer.stop()
-            
-        if self.current_process:
-            try:
-                self.current_process.terminate()
-                self.current_process.wait(timeout=0.5)
-            except: pass
-            self.current_process = None
-        
-        self.current_sound = None
-        self.current_item_type = None
+def save_session():
+    """操作状態の保存を要求（変わっていなければ何もしない。書き込みは別スレッド）"""
+    session_state.save(session_snapshot())
+
+
+def restore_session(state=None):
+    """
+    保存した操作状態を復元する（ネットワークに触る前に呼ぶ）。復元したら True。
+    state を渡すとファイルの代わりにそれを使う（記録した入力の再生はヘッダーの状態から始める）
+    """
+    global mode, current_menu, mukashimukashi_index, fan_message_index, bird_song_index
+    global mukashimukashi_files, fan_messages, story_resume
+    if state is None:
+        state = session_state.load()
+    if not state:
+        return False
 
-    def update_volume(self, volume):
-        """リアルタイム音量更新（割り込み方式では使用しませんが、互換性のため残す場合は何もしない）"""
-        pass
+    def index_in(key, items):
+        index = state.get(key, 0)
+        return index if isinstance(index, int) and 0 <= index < len(items) else 0
+
+    mukashimukashi_files = state.get('mukashimukashi_files') or []
+    fan_messages = state.get('fan_messages') or []
+    current_menu = index_in('current_menu', menu_items)
+    mukashimukashi_index = index_in('mukashimukashi_index', mukashimukashi_files)
+    fan_message_index = index_in('fan_message_index', fan_messages)
+    story_resume = state.get('story')
+
+    restored = PLAYING_MENUS.get(state.get('mode'), state.get('mode'))
+    if restored == "bird_song_menu" and not bird_songs:
+        load_bird_songs()  # ローカルの JSON
+    bird_song_index = index_in('bird_song_index', bird_songs)
+    lists = {"fan_message_menu": fan_messages, "mukashimukashi_menu": mukashimukashi_files, "bird_song_menu": bird_songs}
+    # 一覧のないメニューや録音・投稿中の状態はメインメニューに戻す
+    mode = restored if lists.get(restored) else "main_menu"
+
+    print(f"♻️ 操作状態を復元しました: {mode}（物語 {len(mukashimukashi_files)}件 / メッセージ {len(fan_messages)}件）")
+    if story_resume:
+        print(f"   続きから再生できる物語: {story_resume.get('file')}（{story_resume.get('position')}秒）")
+    return True
 
-audio_mgr = SequentialAudioManager()
+
+def announce_current():
+    """今いるメニューの項目を読み上げる（復元後の現在地の案内）"""
+    if mode == "fan_message_menu":
+        play_fan_message_name(fan_message_index)
+    elif mode == "mukashimukashi_menu":
+        play_title(mukashimukashi_index)
+    elif mode == "bird_song_menu":
+        play_bird_name(bird_song_index)
+    else:
+        speak(menu_items[current_menu], index=current_menu)
+
+# 方角通知（ゲイン適用済みの音声を起動時に用意し、通知の間はハードウェア音量を DIRECTION_VOLUME まで上げる）
+direction_alerts = DirectionAlerts(audio_mgr, AUDIO_DIR, gain=DIRECTION_GAIN, mixer=hw_mixer,
+                                   volume=DIRECTION_VOLUME, base_volume=lambda: current_volume)
 
 
 def speak(text, index=None):
@@ -429,22 +475,45 @@ def speak(text, index=None):
         return
 
     if sound_key in sounds:
-        audio_mgr.play("sound", sounds[sound_key])
+        # メニュー名はナビ読み上げ、決定・戻るは操作音として扱う
+        # 最初の読み上げが鳴り終わったら、遅延読み込みのモジュールを裏で読み込んでおく
+        warm = lazy_imports.warm_up if WARM_IMPORTS and not lazy_imports.warm_started() else None
+        audio_mgr.play("sound", sounds[sound_key], priority='nav' if index is not None else 'ui', on_finish=warm)
     else:
         print(f"⚠️ 音声未ロード: {sound_key}")
 
 
-def play_audio_file(filepath, wait=False, loops=0, on_finish=None):
-    """汎用音声ファイル再生 - キュー方式"""
+def finish_content(playing_mode, menu_mode):
+    """コンテンツの再生完了時にメニューへ戻る（ループのスレッドで呼ぶ。再生は止めない）"""
+    global mode
+    if mode == playing_mode:
+        print(f"✅ 再生完了: {menu_mode} に戻ります")
+        mode = menu_mode
+        save_session()
+
+def content_finished(playing_mode, menu_mode):
+    """再生の完了時コールバック（再生スレッドから呼ばれ、finish_content をループで実行する）"""
+    return loop_bridge.callback(partial(finish_content, playing_mode, menu_mode))
+
+def play_audio_file(filepath, wait=False, loops=0, on_finish=None, priority='content', lead_in=None):
+    """汎用音声ファイル再生 - キュー方式（lead_in を渡すとその Sound に続けて再生）"""
     if not os.path.exists(filepath):
         print(f"⚠️ ファイルが見つかりません: {filepath}")
         return False
-    audio_mgr.play("file", filepath, wait=wait, loops=loops, on_finish=on_finish)
+    if lead_in is not None:
+        audio_mgr.play_sequence([("sound", lead_in, 'ui'), ("file", filepath, priority, loops)],
+                                gap=CUE_GAP, urgent=True, on_finish=on_finish, priority=priority)
+        return True
+    audio_mgr.play("file", filepath, wait=wait, loops=loops, on_finish=on_finish, priority=priority)
     return True
 
-def play_audio_url(url, wait=False, on_finish=None):
-    """URLから直接音声をストリーミング再生 - キュー方式"""
-    audio_mgr.play("url", url, wait=wait, on_finish=on_finish)
+def play_audio_url(url, wait=False, on_finish=None, priority='content', lead_in=None, start=0.0):
+    """URLから直接音声をストリーミング再生 - キュー方式（lead_in を渡すとその Sound に続けて再生、start: 開始位置（秒））"""
+    if lead_in is not None:
+        audio_mgr.play_sequence([("sound", lead_in, 'ui'), ("url", url, priority, 0, start)],
+                                gap=CUE_GAP, urgent=True, on_finish=on_finish, priority=priority)
+        return True
+    audio_mgr.play("url", url, wait=wait, on_finish=on_finish, priority=priority, start=start)
     return True
 
 
@@ -463,24 +532,29 @@ def parse_message_timestamp(msg):
         print(f"⚠️ タイムスタンプ解析エラー: {ts} - {e}")
         return datetime.min
 
-def load_fan_messages():
-    """ファンメッセージを取得"""
-    global fan_messages
+def fetch_fan_messages():
+    """ファンメッセージを取得して新しい順の一覧を返す（取得できなければ None。スレッドプールで呼ぶ）"""
     print("ファンメッセージを取得中...")
     
     try:
+        from fan_messages import get_fan_messages
         fan_messages_raw = get_fan_messages()
         if fan_messages_raw:
             # 新しい順にソート (共通のパース関数を使用)
-            fan_messages = sorted(fan_messages_raw, key=parse_message_timestamp, reverse=True)
-            print(f"✓ {len(fan_messages)}件のメッセージを読み込みました\n")
-            return True
+            messages = sorted(fan_messages_raw, key=parse_message_timestamp, reverse=True)
+            print(f"✓ {len(messages)}件のメッセージを読み込みました\n")
+            return messages
         else:
             print("⚠️ メッセージがありません\n")
-            return False
+            return None
     except Exception as e:
         print(f"⚠️ メッセージ取得エラー: {e}\n")
-        return False
+        return None
+
+def fan_message_name_path(message):
+    """送信者名音声のキャッシュファイルパス"""
+    ts = message['timestamp'].replace(':', '').replace('-', '').replace('T', '').replace('Z', '').replace('.000', '').replace('/', '').replace(' ', '')
+    return f"{PROJECT_DIR}/cache/fan_messages/names/{ts}_{message['name']}.wav"
 
 def play_fan_message_name(index):
     """送信者名を音声再生（キャッシュから） - キュー方式"""
@@ -489,27 +563,34 @@ def play_fan_message_name(index):
     
     message = fan_messages[index]
     name = message['name']
-    timestamp = message['timestamp']
     print(f"💌 [{index + 1}/{len(fan_messages)}] {name}さん")
     
     # ファイルパスを生成してキューへ
-    ts = timestamp.replace(':', '').replace('-', '').replace('T', '').replace('Z', '').replace('.000', '').replace('/', '').replace(' ', '')
-    name_file = f"{PROJECT_DIR}/cache/fan_messages/names/{ts}_{name}.wav"
-    
-    # 【追加】ファイルがなければその場で生成（セルフヒーリング）
+    name_file = fan_message_name_path(message)
+    from fan_messages import generate_name_audio
+
+    # 前後のメッセージは、名前の音声がなければ先に生成してから先読み（本文は再生するときに生成）
+    jobs = [
+        (fan_message_name_path(fan_messages[i]), partial(generate_name_audio, fan_messages[i]), None)
+        for i in neighbor_indices(index, len(fan_messages))
+    ]
+
+    # 【追加】ファイルがなければ生成（セルフヒーリング）
+    # 入力スレッドを止めないよう先読みスレッドで生成し、まだこの項目にいれば再生する
     if not os.path.exists(name_file):
-        try:
-            print(f"✨ 案内音声をオンデマンド生成中: {name}")
-            from fan_messages import generate_message_audio
-            generate_message_audio(message)
-        except Exception as e:
-            print(f"⚠️ 案内音声の生成に失敗しました: {e}")
-    
-    play_audio_file(name_file)
+        print(f"✨ 案内音声をオンデマンド生成中: {name}")
+        def play_if_current():
+            if mode == "fan_message_menu" and fan_message_index == index:
+                play_audio_file(name_file, priority='nav')
+        jobs.insert(0, (name_file, partial(generate_name_audio, message), play_if_current))
+    else:
+        play_audio_file(name_file, priority='nav')
+
+    prefetcher.request("fan_message_menu", jobs)
 
 
-def play_fan_message_content(index):
-    """メッセージ本文を音声再生（キャッシュから） - キュー方式"""
+def play_fan_message_content(index, lead_in=None):
+    """メッセージ本文を音声再生（キャッシュから） - キュー方式（lead_in: 先に鳴らす案内音）"""
     global mode
     
     if index < 0 or index >= len(fan_messages):
@@ -524,6 +605,7 @@ def play_fan_message_content(index):
     print(f"    内容: {content[:50]}...")
     
     mode = "playing_message"
+    prefetcher.cancel()
     
     # キャッシュからファイルをキューへ
     from pathlib import Path
@@ -531,25 +613,36 @@ def play_fan_message_content(index):
     ts = timestamp.replace(':', '').replace('-', '').replace('T', '').replace('Z', '').replace('.000', '').replace('/', '').replace(' ', '')
     message_file = MESSAGES_DIR / f"{ts}_{name}.wav"
     
-    # 【追加】ファイルがなければその場で生成（セルフヒーリング）
-    if not message_file.exists():
-        try:
-            print(f"✨ メッセージ本文をオンデマンド生成中: {name}")
-            from fan_messages import generate_message_audio
-            generate_message_audio(message)
-        except Exception as e:
-            print(f"⚠️ メッセージ本文の生成に失敗しました: {e}")
-    
+    # 【追加】ファイルがなければ生成してから再生（セルフヒーリング。生成はスレッドプールで）
     if message_file.exists():
-        play_audio_file(str(message_file), on_finish=stop_fan_message)
+        play_message_file(message_file, lead_in)
     else:
-        print(f"⚠️ メッセージファイルが見つかりません: {message_file}")
-        mode = "fan_message_menu"
+        loop_bridge.spawn(generate_and_play_message(message, message_file, lead_in), name=LOADING_JOB)
     
     # 既読更新
     if notifier:
         notifier.mark_as_played(timestamp, name)
 
+def play_message_file(message_file, lead_in=None):
+    """メッセージ本文の音声ファイルを再生（なければメニューに戻る）"""
+    global mode
+    if message_file.exists():
+        play_audio_file(str(message_file), on_finish=content_finished("playing_message", "fan_message_menu"), lead_in=lead_in)
+    else:
+        print(f"⚠️ メッセージファイルが見つかりません: {message_file}")
+        mode = "fan_message_menu"
+
+async def generate_and_play_message(message, message_file, lead_in=None):
+    """メッセージ本文の音声を生成し、まだ再生待ちなら再生する（LOADING_JOB。戻るボタンで取り消し）"""
+    try:
+        print(f"✨ メッセージ本文をオンデマンド生成中: {message['name']}")
+        from fan_messages import generate_message_audio
+        await wait_with_cue(loop_bridge.run_blocking(generate_message_audio, message), 'preparing_audio')
+    except Exception as e:
+        print(f"⚠️ メッセージ本文の生成に失敗しました: {e}")
+    if mode == "playing_message":  # 生成中に戻るで止めていなければ
+        play_message_file(message_file, lead_in)
+
 def stop_fan_message():
     """メッセージ再生を停止"""
     global mode
@@ -596,24 +689,14 @@ class NotificationManager:
         return f"{msg['timestamp']}_{msg['name']}"
 
     def ensure_voices(self, paths):
-        """通知用音声がない場合に生成"""
-        # 1. 新着通知
-        arrival_file = paths['fan_message_arrival']
-        if not os.path.exists(arrival_file):
-            print("🔊 新着通知音を生成中...")
-            pcm = text_to_speech_polly("新しいブログファンメッセージがあります")
-            wav = make_wav_from_pcm(mono_to_stereo_pcm(pcm))
-            with open(arrival_file, 'wb') as f: f.write(wav)
-            sounds['fan_message_arrival'] = pygame.mixer.Sound(arrival_file)
-
-        # 2. リマインド通知
-        reminder_file = paths['fan_message_reminder']
-        if not os.path.exists(reminder_file):
-            print("🔊 リマインド音を生成中...")
-            pcm = text_to_speech_polly("まだ聞いていないメッセージがあります")
-            wav = make_wav_from_pcm(mono_to_stereo_pcm(pcm))
-            with open(reminder_file, 'wb') as f: f.write(wav)
-            sounds['fan_message_reminder'] = pygame.mixer.Sound(reminder_file)
+        """通知用音声がない場合にバックグラウンドで生成（できるまではビープ音で代用）"""
+        texts = {
+            'fan_message_arrival': "新しいブログファンメッセージがあります",  # 1. 新着通知
+            'fan_message_reminder': "まだ聞いていないメッセージがあります",   # 2. リマインド通知
+        }
+        for key, text in texts.items():
+            if startup_loader.generate(key, paths[key], polly_voice(text), placeholder=sounds.get('beep')):
+                print(f"🔊 通知音を生成中（バックグラウンド）: {key}")
 
     def is_within_time_window(self):
         now = datetime.now()
@@ -630,6 +713,7 @@ class NotificationManager:
         self.last_poll_time = now
 
         print("🔍 新着メッセージをチェック中...")
+        from fan_messages import get_fan_messages
         msgs = get_fan_messages(force_refresh=True)
         if not msgs:
             return
@@ -655,7 +739,7 @@ class NotificationManager:
             
             # 通知再生
             if 'fan_message_arrival' in sounds:
-                audio_mgr.play("sound", sounds['fan_message_arrival'])
+                audio_mgr.play("sound", sounds['fan_message_arrival'], priority='notification')
             
             self.last_notified_id = latest_id
             self.save_state()
@@ -673,7 +757,7 @@ class NotificationManager:
             if self.last_notified_id > self.last_played_id:
                 print(f"⏰ 定時リマインド ({now.hour}時)")
                 if 'fan_message_reminder' in sounds:
-                    audio_mgr.play("sound", sounds['fan_message_reminder'])
+                    audio_mgr.play("sound", sounds['fan_message_reminder'], priority='notification')
             
             self.last_reminder_hour = now.hour
 
@@ -691,7 +775,7 @@ notifier = None
 # ========== 方角読み上げ機能 (HTTP Server) ==========
 
 def ensure_direction_voices(force=False):
-    """方角読み上げ用の音声ファイルを生成"""
+    """方角読み上げ用の音声ファイルがなければバックグラウンドで生成（できるまではビープ音で代用）"""
     direction_dir = os.path.join(AUDIO_DIR, "direction")
     os.makedirs(direction_dir, exist_ok=True)
     
@@ -704,22 +788,14 @@ def ensure_direction_voices(force=False):
     
     for key, text in directions.items():
         filepath = os.path.join(direction_dir, f"{key}.wav")
-        if not os.path.exists(filepath) or force:
-            print(f"🔊 方角音声生成中 (SSML/Vol+10dB): {text}")
-            try:
-                # SSMLを使用して音量を上げる (+10dB)
-                ssml_text = f"<speak><prosody volume='+10dB'>{text}</prosody></speak>"
-                pcm = text_to_speech_polly(ssml_text, text_type='ssml')
-                # ソフトウェア・ブースト (DIRECTION_BOOST倍) を適用
-                wav = make_wav_from_pcm(mono_to_stereo_pcm(pcm, volume_scale=DIRECTION_BOOST))
-                with open(filepath, 'wb') as f:
-                    f.write(wav)
-                print(f"✓ 生成完了 (Vol 4.0x): {filepath}")
-            except Exception as e:
-                print(f"⚠️ 方角音声生成エラー ({key}): {e}")
+        # SSMLを使用して音量を上げる (+10dB)、さらにソフトウェア・ブースト (DIRECTION_BOOST倍) を適用
+        ssml_text = f"<speak><prosody volume='+10dB'>{text}</prosody></speak>"
+        make = polly_voice(ssml_text, text_type='ssml', volume_scale=DIRECTION_BOOST)
+        if startup_loader.generate(f'dir_{key}', filepath, make, placeholder=sounds.get('beep'), force=force):
+            print(f"🔊 方角音声生成中 (SSML/Vol+10dB・バックグラウンド): {text}")
 
-@app.route('/direction', methods=['POST'])
 def handle_direction():
+    from flask import request, jsonify
     try:
         data = request.json
         direction = data.get('dir')
@@ -727,110 +803,80 @@ def handle_direction():
         if not direction:
             return jsonify({"ok": False, "error": "No direction specified"}), 400
             
-        filepath = os.path.join(AUDIO_DIR, "direction", f"{direction}.wav")
-        
-        # 音声ファイルを再生
-        # 実行中に書き換えられた場合に備えて、キャッシュ(sounds)を使わず
-        # その都度ファイルを読み込んで再生する
-        if os.path.exists(filepath):
-            print(f"🧭 方向通知 (詳細デバッグ): {direction} -> {filepath}")
-            try:
-                # 1. 現在鳴っている全てのチャンネルを特定して一時停止
-                paused_channels = []
-                for i in range(pygame.mixer.get_num_channels()):
-                    c = pygame.mixer.Channel(i)
-                    if c.get_busy():
-                        print(f"DEBUG: Pausing active channel {i}")
-                        c.pause()
-                        paused_channels.append(c)
-                
-                # 2. ハードウェア音量を引き上げる (ブースト)
-                target_vol = DIRECTION_VOLUME
-                print(f"DEBUG: amixer setting [PCM] volume to {target_vol}% (from variable DIRECTION_VOLUME)")
-                res = subprocess.run(
-                    ['amixer', '-c', SPEAKER_CARD, 'sset', 'PCM', f'{target_vol}%'],
-                    capture_output=True, text=True
-                )
-                if res.returncode != 0:
-                    print(f"⚠️ amixer PCM error: {res.stderr.strip()}")
-                    # PCMがなければMasterを試す
-                    print(f"DEBUG: amixer trying [Master] volume to {target_vol}%")
-                    subprocess.run(['amixer', '-c', SPEAKER_CARD, 'sset', 'Master', f'{target_vol}%'], stdout=subprocess.DEVNULL)
-                
-                time.sleep(0.2) # 音量切り替えの安定待ち
-                
-                # 3. 再生
-                s = pygame.mixer.Sound(filepath)
-                s.set_volume(1.0)
-                channel = s.play()
-                
-                if channel:
-                    print(f"DEBUG: Sound started on channel {channel.get_name() if hasattr(channel, 'get_name') else 'unknown'}")
-                    channel.unpause() # 明示的にアンパーズ（念のため）
-                    
-                    # 4. 再生終了を待つ
-                    start_wait = time.time()
-                    while channel.get_busy():
-                        time.sleep(0.05)
-                    print(f"DEBUG: Play finished in {time.time() - start_wait:.2f}s")
-                else:
-                    print("⚠️ エラー: 再生チャンネルを確保できませんでした")
-                    time.sleep(1.5)
-                
-                # 5. 音量を元に戻す
-                subprocess.run(
-                    ['amixer', '-c', SPEAKER_CARD, 'sset', 'PCM', f'{current_volume}%'],
-                    stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
-                )
-                # Masterも一応戻す
-                subprocess.run(['amixer', '-c', SPEAKER_CARD, 'sset', 'Master', f'{current_volume}%'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                
-                # 6. 一時停止していたチャンネルを再開
-                print(f"DEBUG: Resuming {len(paused_channels)} channels")
-                for c in paused_channels:
-                    c.unpause()
-                
-                return jsonify({"ok": True, "direction": direction})
-            except Exception as e:
-                print(f"⚠️ 再生エラー: {e}")
-                # エラー時も復元を試みる
-                subprocess.run(['amixer', '-c', SPEAKER_CARD, 'sset', 'PCM', f'{current_volume}%'], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                pygame.mixer.unpause()
-                return jsonify({"ok": False, "error": str(e)}), 500
-            
-        return jsonify({"ok": False, "error": "Audio file not found"}), 404
+        if not direction_alerts.available(direction):
+            return jsonify({"ok": False, "error": "Audio file not found"}), 404
+
+        # ゲイン適用済みの音声を alert クラスで再生（コンテンツは音量を下げて重ねる）
+        # 要求を受けた時刻から最初の音までを /stats の input_latency（メニュー "direction"）に記録
+        print(f"🧭 方向通知: {direction}")
+        audio_mgr.mark_input(InputStamp(time.monotonic(), 'direction', direction))
+        try:
+            direction_alerts.play(direction)
+        finally:
+            audio_mgr.mark_input(None)
+        return jsonify({"ok": True, "direction": direction})
         
     except Exception as e:
         print(f"⚠️ 方向通知エラー: {e}")
         return jsonify({"ok": False, "error": str(e)}), 500
 
+def handle_stats():
+    """再生まわりの統計（キャッシュのヒット率、クラス別の待ち時間、キー入力→最初の音、音量の反映、遅延読み込み、起動時の音声準備、オーディオデバイス、操作状態の保存、入力ループ）"""
+    from flask import jsonify
+    return jsonify({
+        "sound_cache": sound_cache.stats(),
+        "queue_latency": audio_mgr.latency_report(),
+        "sequence_gaps": audio_mgr.sequence_gap_report(),
+        "input_latency": audio_mgr.input_latency.report(),
+        "mixer": hw_mixer.stats(),
+        "imports": lazy_imports.report(),
+        "startup": dict(startup_profile.report(), voices=startup_loader.report()),
+        "session": session_state.stats(),
+        "loop": loop_bridge.report(),
+        "devices": {
+            "speaker": SPEAKER_CARD,
+            "mic": MIC_CARD,
+            "cards": [card._asdict() for card in audio_devices.list_cards()],
+            "changes": card_watcher.changes,
+        },
+    })
+
 def run_flask_server():
-    """Flaskサーバーを起動"""
+    """Flaskサーバーを起動（flask の読み込みもこのスレッドで行う）"""
+    from flask import Flask
+    app = Flask(__name__)
+    app.add_url_rule('/direction', view_func=handle_direction, methods=['POST'])
+    app.add_url_rule('/stats', view_func=handle_stats, methods=['GET'])
     print("🚀 HTTPサーバー起動 (Port: 5000)")
-    # debug=False, use_reloader=False は必須（スレッド実行のため）
-    app.run(host='::', port=5000, debug=False, use_reloader=False)
+    # app.run と同じ werkzeug のサーバー（スレッド実行のためリローダーなし）。
+    # 停止しないので、停止要求を確認するための 0.5 秒ごとの起床はしない
+    from werkzeug.serving import make_server
+    make_server('::', 5000, app, threaded=True).serve_forever(poll_interval=None)
 
 
 
 # ========== むかしむかし機能 ==========
-def load_mukashimukashi_filelist():
-    """GitHubからファイルリストを取得"""
-    global mukashimukashi_files
+def fetch_mukashimukashi_filelist():
+    """GitHubからファイルリストを取得して返す（取得できなければ None。スレッドプールで呼ぶ）"""
     print("むかしむかしファイルリストを取得中...")
     try:
+        import requests
         response = requests.get(FILELIST_URL, timeout=10)
         response.raise_for_status()
-        mukashimukashi_files = [line.strip() for line in response.text.split('\n') if line.strip()]
-        print(f"✓ {len(mukashimukashi_files)}個の物語を読み込みました\n")
-        return True
+        files = [line.strip() for line in response.text.split('\n') if line.strip()]
+        print(f"✓ {len(files)}個の物語を読み込みました\n")
+        return files or None
     except Exception as e:
         print(f"⚠️ ファイルリスト取得エラー: {e}\n")
-        return False
+        return None
 
 def get_title_from_filename(filename):
     return os.path.splitext(filename)[0]
 
 
+def title_audio_path(index):
+    return os.path.join(TITLES_DIR, f"{get_title_from_filename(mukashimukashi_files[index])}.wav")
+
 def play_title(index):
     """タイトル音声を再生 - キュー方式"""
     if index < 0 or index >= len(mukashimukashi_files):
@@ -838,20 +884,41 @@ def play_title(index):
     filename = mukashimukashi_files[index]
     title = get_title_from_filename(filename)
     print(f"📖 [{index + 1}/{len(mukashimukashi_files)}] {title}")
-    title_audio_path = os.path.join(TITLES_DIR, f"{title}.wav")
-    if os.path.exists(title_audio_path):
-        play_audio_file(title_audio_path)
-
-def play_story(index):
-    """物語を再生（ストリーミング） - キュー方式"""
-    global mode
+    path = title_audio_path(index)
+    if os.path.exists(path):
+        play_audio_file(path, priority='nav')
+    # 前後のタイトルを先読み
+    prefetcher.request("mukashimukashi_menu", [
+        (title_audio_path(i), None, None) for i in neighbor_indices(index, len(mukashimukashi_files))
+    ])
+
+def play_story(index, lead_in=None):
+    """物語を再生（ストリーミング） - キュー方式（lead_in: 先に鳴らす案内音）"""
+    global mode, story_resume
     if index < 0 or index >= len(mukashimukashi_files):
         return
     filename = mukashimukashi_files[index]
     url = AUDIO_BASE_URL + filename
+    if REPLAYING:
+        # ネットワークに触れないよう、物語の代わりに無音を流す（続きからの位置はそのまま使う）
+        url = input_trace.story_stand_in(os.path.join(PROJECT_DIR, "cache"))
     print(f"▶️  物語を再生: {get_title_from_filename(filename)}")
+    # 再起動前に再生していた物語なら続きから
+    start = 0.0
+    if story_resume and story_resume.get('file') == filename:
+        start = float(story_resume.get('position') or 0)
+        print(f"⏩ 続きから再生: {start:.0f}秒")
+    story_resume = None
     mode = "playing_story"
-    play_audio_url(url, on_finish=stop_story)
+    prefetcher.cancel()
+    play_audio_url(url, on_finish=content_finished("playing_story", "mukashimukashi_menu"), lead_in=lead_in, start=start)
+    loop_bridge.set_timer('story_position', STORY_POSITION_STEP, save_story_position)
+
+def save_story_position():
+    """物語の再生中は STORY_POSITION_STEP 秒ごとに再生位置を保存（タイマーで呼ぶ）"""
+    if mode == "playing_story":
+        save_session()
+        loop_bridge.set_timer('story_position', STORY_POSITION_STEP, save_story_position)
 
 def stop_story():
     """物語の再生を停止"""
@@ -868,6 +935,9 @@ def start_blog_recording():
     global blog_recording_process, blog_audio_file, mode
 
     blog_audio_file = os.path.join(PROJECT_DIR, "blog_input.wav")
+    if REPLAYING:
+        # 実機の録音を上書きしない
+        blog_audio_file = os.path.join(PROJECT_DIR, "cache", "blog_input.replay.wav")
 
     # 既存ファイルを削除
     if os.path.exists(blog_audio_file):
@@ -875,18 +945,68 @@ def start_blog_recording():
 
     print("🎙️ 録音開始（最大60秒）")
 
-    # バックグラウンドで録音開始
-    blog_recording_process = subprocess.Popen([
-        'arecord',
-        '-D', f'plughw:{MIC_CARD},0',
-        '-d', '60',  # 最大60秒
-        '-f', 'S16_LE',
-        '-r', '16000',
-        '-c', '1',
-        blog_audio_file
-    ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    if REPLAYING:
+        # マイク・arecord のない環境でも同じように進むよう、止めるまで待って無音を書く
+        blog_recording_process = input_trace.SilentRecording(blog_audio_file, limit=60)
+    else:
+        # バックグラウンドで録音開始
+        blog_recording_process = subprocess.Popen([
+            'arecord',
+            '-D', f'plughw:{MIC_CARD},0',
+            '-d', '60',  # 最大60秒
+            '-f', 'S16_LE',
+            '-r', '16000',
+            '-c', '1',
+            blog_audio_file
+        ], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
 
     mode = "blog_recording"
+    loop_bridge.spawn(watch_recording(blog_recording_process))
+
+async def watch_recording(process):
+    """録音プロセスの終了を待ち、上限（60秒）で止まったら確認モードへ"""
+    global mode
+    await loop_bridge.run_blocking(process.wait)
+    if mode != "blog_recording" or blog_recording_process is not process:
+        return  # ボタンで止めた
+
+    print("\n⏱️ 録音時間上限（60秒）に達しました\n")
+    stop_blog_recording()
+
+    if 'blog_confirm' in sounds:
+        audio_mgr.play("sound", sounds['blog_confirm'], urgent=True, priority='ui')
+
+    mode = "blog_confirm"
+    loop_bridge.set_timer('blog_confirm', BLOG_CONFIRM_TIMEOUT, on_blog_confirm_timeout)
+
+def on_blog_confirm_timeout():
+    """確認モードのタイムアウト: 投稿せずにメインメニューへ"""
+    global mode, last_action_time
+    if mode != "blog_confirm":
+        return
+    print("\n⏱️ タイムアウト: キャンセルします\n")
+
+    mode = "main_menu"
+    save_session()
+
+    # タイムアウト後、ボタンを無視
+    last_action_time = time.time()
+
+    if 'blog_timeout' in sounds:
+        audio_mgr.play("sound", sounds['blog_timeout'], urgent=True, priority='ui')
+        # タイムアウト音声が鳴り終わるまでボタンを無視
+        last_action_time += sounds['blog_timeout'].get_length()
+
+async def start_blog_recording_after_cue():
+    """「録音開始」音声とビープ音が鳴り終わるのを待って録音を始める（待つ間に戻る・タイムアウトしたら始めない）"""
+    steps = [("sound", sounds[name], 'ui') for name in ('recording_start', 'beep') if name in sounds]
+    if steps:
+        done, finished = loop_bridge.completion()
+        # 取り消された場合も待ちを終える（録音を始めるかはモードで決める）
+        audio_mgr.play_sequence(steps, gap=CUE_GAP, urgent=True, on_finish=finished, on_cancel=finished)
+        await done
+    if mode == "blog_ready":
+        start_blog_recording()
 
 def stop_blog_recording():
     """録音停止"""
@@ -904,23 +1024,26 @@ def transcribe_and_post():
     """音声認識してブログ投稿"""
     global blog_audio_file
 
-    from voice_to_text import transcribe_audio
-    from datetime import datetime, timezone
-    import requests
     import threading
 
-    print("🗣️ 音声をテキストに変換中...")
-
-    try:
-        blog_content = transcribe_audio(blog_audio_file)
-        print(f"📝 認識されたテキスト:\n{blog_content}\n")
-    except Exception as e:
-        print(f"❌ 音声認識エラー: {e}")
+    if REPLAYING:
+        print("⏭️ 記録した入力の再生中のため、音声認識と投稿は行いません")
         return
 
-    # バックグラウンドで投稿
+    # 音声認識（openai の読み込みも）と投稿はバックグラウンドで（入力ループを止めない）
     def post_in_background():
+        from voice_to_text import transcribe_audio
+        print("🗣️ 音声をテキストに変換中...")
+
+        try:
+            blog_content = transcribe_audio(blog_audio_file)
+            print(f"📝 認識されたテキスト:\n{blog_content}\n")
+        except Exception as e:
+            print(f"❌ 音声認識エラー: {e}")
+            return
+
         try:
+            from blog_poster import post_blog
             # blog_poster.py の post_blog 関数を使用
             # これにより自動的にMEGAアップロードが行われる
             success = post_blog(
@@ -952,13 +1075,32 @@ def do_blog_post():
 
     # 音声案内（新モード入り口なので現在再生中を止める）
     if 'blog_ready' in sounds:
-        audio_mgr.play("sound", sounds['blog_ready'], urgent=True)
+        audio_mgr.play("sound", sounds['blog_ready'], urgent=True, priority='ui')
 
     mode = "blog_ready"
-    
-    # タイムアウト計測開始（3分）
-    global blog_ready_start_time
-    blog_ready_start_time = time.time()
+
+    # タイムアウトを予約（3分）
+    loop_bridge.set_timer('blog_ready', BLOG_READY_TIMEOUT, on_blog_ready_timeout)
+
+def on_blog_ready_timeout():
+    """準備モードのタイムアウト: メインメニューに戻る"""
+    global mode
+    if mode != "blog_ready":
+        return
+    print("\n⏱️ タイムアウト: メインメニューに戻ります\n")
+
+    # 「戻ります」または「戻る」音声
+    # （ui クラスなので後続のメニュー名より先に鳴る）
+    if 'modorimasu' in sounds:
+        audio_mgr.play("sound", sounds['modorimasu'], urgent=True, priority='ui')
+    elif 'modoru' in sounds:
+        audio_mgr.play("sound", sounds['modoru'], urgent=True, priority='ui')
+
+    mode = "main_menu"
+    save_session()
+
+    # メニュー名を読み上げ（復帰確認）
+    speak(menu_items[current_menu], index=current_menu)
 
 
 
@@ -973,81 +1115,94 @@ def adjust_volume_loop(direction):
         else:  # up
             current_volume = min(100, current_volume + 5)
 
-        # ALSAで音量設定を復元
-        subprocess.run(
-            ['amixer', '-c', SPEAKER_CARD, 'sset', 'PCM', f'{current_volume}%'],
-            stdout=subprocess.DEVNULL,
-            stderr=subprocess.DEVNULL
-        )
+        # ハードウェア音量へ反映（専用スレッドで反映し、ここでは待たない）
+        hw_mixer.set_volume(current_volume)
 
         print(f"🔊 音量: {current_volume}%")
 
-        # リアルタイム音量反映は amixer 経由になったため、audio_mgr への通知は不要
+        # リアルタイム音量反映はハードウェア音量で行うため、audio_mgr への通知は不要
 
         # pygameが初期化されている場合のみビープ音再生
         try:
             if pygame.mixer.get_init() and 'beep' in sounds:
                 s = sounds['beep']
                 s.set_volume(1.0) # システム音量で管理するため 1.0
-                s.play()
+                channel_groups['beep'].play(s)
         except Exception as e:
             print(f"⚠️ ビープ再生エラー: {e}")
 
         time.sleep(0.3)
 
 # ========== イベントハンドラ ==========
-def handle_rotate(direction):
-
-    """ノブ回転時の処理"""
-    global current_menu, mukashimukashi_index, fan_message_index, knob_counter, mode
-    
-
-
-    knob_counter += direction
-
-    # しきい値チェック
-    if abs(knob_counter) < knob_threshold:
+def handle_rotate(direction, at=None):
+    """
+    ノブ回転時の処理（at: イベント時刻）。回す速さに応じて進む項目数を変え（knob_navigation.py）、
+    動くたびにクリック音を鳴らし、回転が止まってから（NAV_SETTLE 秒後）今の項目だけを読み上げる
+    """
+    global current_menu, mukashimukashi_index, fan_message_index, bird_song_index
+
+    lists = {
+        "main_menu": menu_items,
+        "fan_message_menu": fan_messages,
+        "mukashimukashi_menu": mukashimukashi_files,
+        "bird_song_menu": bird_songs,
+    }
+    if mode not in lists:
+        # 再生中などは回転を無視
+        knob.reset()
         return
-
     if mode == "main_menu":
-        # メインメニューを循環
-        current_menu = (current_menu + (1 if knob_counter > 0 else -1)) % len(menu_items)
-        speak(menu_items[current_menu], index=current_menu)
-        knob_counter = 0
+        # 別の項目に移ったら読み込みの待ちは取り消す
+        loop_bridge.cancel_job(LOADING_JOB)
 
+    at = time.monotonic() if at is None else at
+    length = len(lists[mode])
+    steps = knob.rotate(direction, at, length)
+    if not steps:
+        return
 
+    # 1項目ずつなら端から反対側へ循環、まとめて進んだときは端で止める
+    wrap = not knob.fast
+    if mode == "main_menu":
+        current_menu = advance(current_menu, steps, length, wrap)
     elif mode == "fan_message_menu":
-        # ファンメッセージメニューを循環
-        fan_message_index = (fan_message_index + (1 if knob_counter > 0 else -1)) % len(fan_messages)
-        play_fan_message_name(fan_message_index)
-        knob_counter = 0
-
-
+        fan_message_index = advance(fan_message_index, steps, length, wrap)
     elif mode == "mukashimukashi_menu":
-        # むかしむかしメニューを循環
-        mukashimukashi_index = (mukashimukashi_index + (1 if knob_counter > 0 else -1)) % len(mukashimukashi_files)
-        play_title(mukashimukashi_index)
-        knob_counter = 0
-
+        mukashimukashi_index = advance(mukashimukashi_index, steps, length, wrap)
     elif mode == "bird_song_menu":
-        # 鳥のさえずりメニューを循環
-        global bird_song_index
-        bird_song_index = (bird_song_index + (1 if knob_counter > 0 else -1)) % len(bird_songs)
-        play_bird_name(bird_song_index)
-        knob_counter = 0
+        bird_song_index = advance(bird_song_index, steps, length, wrap)
 
-    elif mode == "playing_story":
-        # 再生中は回転を無視
-        knob_counter = 0
+    # 動いたことはクリック音ですぐに知らせる（ビープ用チャンネルで直接鳴らし、読み上げの順番を待たない）
+    if nav_tick is not None:
+        channel_groups['beep'].play(nav_tick)
+        audio_mgr.mark_played('tick')  # このキー入力の最初の音
 
-    elif mode == "playing_message":
-        # 再生中は回転を無視
-        knob_counter = 0
+    # 前の項目の読み上げ（再生中・待ち中）は取り消し、回転が止まってから今の項目だけを読み上げる
+    audio_mgr.cancel(item_class='nav')
+    if knob.settle > 0:
+        loop_bridge.set_timer('knob_settle', knob.settle, announce_settled, mode)
+    else:
+        announce_current()
+
+
+def announce_settled(menu):
+    """
+    回転が止まったら今の項目を読み上げる。
+    タイマーが発火してから読み上げの最初の音までを「メニュー/settle」として記録する
+    （NAV_SETTLE の待ちをキー入力→最初の音の計測に混ぜない）
+    """
+    if mode != menu:
+        return  # 止まるまでに別のメニューへ移った
+    audio_mgr.mark_input(InputStamp(time.monotonic(), f"{menu}/settle", 'settle'))
+    try:
+        announce_current()
+    finally:
+        audio_mgr.mark_input(None)
 
 
 def handle_button_press():
     """ノブ押下（決定）時の処理"""
-    global mode, current_menu, last_mute_time, mukashimukashi_index, fan_message_index, blog_confirm_start_time, bird_song_index
+    global mode, last_mute_time, bird_song_index
 
 
 
@@ -1057,6 +1212,9 @@ def handle_button_press():
         return
     last_mute_time = current_time
 
+    # 回転が止まった後の読み上げの予約は取り消す（決定した項目の案内が先）
+    loop_bridge.cancel_timer('knob_settle')
+
 
     # タイムアウト後2秒間は無視
     if current_time - last_action_time < 2.0:
@@ -1066,34 +1224,21 @@ def handle_button_press():
     if mode == "main_menu":
         selected = menu_items[current_menu]
         print(f"\n✅ 決定: {selected}\n")
+
+        # 前の項目の読み込みを待っていれば取り消す
+        loop_bridge.cancel_job(LOADING_JOB)
         
-        # 決定時は即座に「決定」と言いたい
+        # 決定時は即座に「決定」と言いたい（ui クラスなので後続の読み上げより先に鳴る）
         speak("決定")
 
-        # 「決定」音声が終わるまで待機
-        time.sleep(0.5)
-
 
         if selected == "ブログファンからメッセージ":
-            # 毎回ロードを実行する
-            if not load_fan_messages():
-                print("メッセージの取得に失敗しました")
-                return
-
-            mode = "fan_message_menu"
-            fan_message_index = 0
-            play_fan_message_name(fan_message_index)
+            # 毎回ロードを実行する（取得中も入力ループは止めない）
+            loop_bridge.spawn(open_fan_message_menu(), name=LOADING_JOB)
 
 
         elif selected == "むかしむかし":
-            if not mukashimukashi_files:
-                if not load_mukashimukashi_filelist():
-                    print("ファイルリストの取得に失敗しました")
-                    return
-
-            mode = "mukashimukashi_menu"
-            mukashimukashi_index = 0
-            play_title(mukashimukashi_index)
+            loop_bridge.spawn(open_mukashimukashi_menu(), name=LOADING_JOB)
 
         elif selected == "ブログ投稿":
             do_blog_post()
@@ -1109,29 +1254,18 @@ def handle_button_press():
     elif mode == "fan_message_menu":
         print(f"\n✅ メッセージを再生開始\n")
 
-        # 「再生します」音声
-        if 'saisei' in sounds:
-            audio_mgr.play("sound", sounds['saisei'], urgent=True)
-            time.sleep(1.4)
-
-        play_fan_message_content(fan_message_index)
+        # 「再生します」音声に続けて本文を再生
+        play_fan_message_content(fan_message_index, lead_in=sounds.get('saisei'))
 
     elif mode == "mukashimukashi_menu":
         print(f"\n✅ 物語を再生開始\n")
 
-        # 「再生します」音声
-        if 'saisei' in sounds:
-            audio_mgr.play("sound", sounds['saisei'], urgent=True)
-            time.sleep(1.4)  # 音声の長さ分待つ
-
-        play_story(mukashimukashi_index)
+        # 「再生します」音声に続けて物語を再生
+        play_story(mukashimukashi_index, lead_in=sounds.get('saisei'))
 
     elif mode == "bird_song_menu":
         print(f"\n✅ 鳥の声を再生開始\n")
-        if 'saisei' in sounds:
-            audio_mgr.play("sound", sounds['saisei'], urgent=True)
-            time.sleep(1.4)
-        play_bird_song_content(bird_song_index)
+        play_bird_song_content(bird_song_index, lead_in=sounds.get('saisei'))
 
     elif mode == "playing_story":
         stop_story()
@@ -1143,17 +1277,8 @@ def handle_button_press():
         stop_bird_song()
 
     elif mode == "blog_ready":
-        # 「録音開始」音声
-        if 'recording_start' in sounds:
-            audio_mgr.play("sound", sounds['recording_start'], urgent=True)
-            time.sleep(1.0) 
-        
-        # ビープ音
-        if 'beep' in sounds:
-            audio_mgr.play("sound", sounds['beep'])
-            time.sleep(0.3)
-
-        start_blog_recording()
+        # 「録音開始」音声 → ビープ音 → 鳴り終わったら録音開始
+        loop_bridge.spawn(start_blog_recording_after_cue(), name=BLOG_CUE_JOB)
 
     elif mode == "blog_recording":
         # 録音停止 → 即座に投稿
@@ -1161,14 +1286,15 @@ def handle_button_press():
 
         # 「投稿を依頼しました」を再生
         if 'blog_posted' in sounds:
-            audio_mgr.play("sound", sounds['blog_posted'], urgent=True)
+            audio_mgr.play("sound", sounds['blog_posted'], urgent=True, priority='ui')
 
         mode = "main_menu"
         transcribe_and_post()
 
     elif mode == "blog_confirm":
+        loop_bridge.cancel_timer('blog_confirm')
         if 'blog_posted' in sounds:
-            audio_mgr.play("sound", sounds['blog_posted'], urgent=True)
+            audio_mgr.play("sound", sounds['blog_posted'], urgent=True, priority='ui')
 
         mode = "main_menu"
         transcribe_and_post()
@@ -1178,11 +1304,118 @@ def handle_button_press():
 
 
 
+async def wait_with_cue(awaitable, cue):
+    """
+    awaitable の完了を待って結果を返す。LOADING_CUE_DELAY 秒で終わらなければ案内音声（cue）を鳴らし、
+    その後は LOADING_TICK 秒ごとにビープ音で待っていることを知らせる
+    """
+    future = asyncio.ensure_future(awaitable)
+    try:
+        delay, sound = LOADING_CUE_DELAY, sounds.get(cue)
+        while not (await asyncio.wait({future}, timeout=delay))[0]:
+            if sound is not None:
+                audio_mgr.play("sound", sound, priority='nav')
+            delay, sound = LOADING_TICK, sounds.get('beep')
+        return future.result()
+    finally:
+        # 取り消されたときは結果を待たない（スレッドプールの処理は最後まで走り、結果は捨てる）
+        future.cancel()
+
+
+async def open_fan_message_menu():
+    """
+    ファンメッセージのメニューに入る。取得済みの一覧があればすぐに入り、裏で取得し直す。
+    なければ取得を待つ（LOADING_JOB。待っている間は案内音声、戻るボタンで取り消し）
+    """
+    global fan_messages
+    if fan_messages:
+        enter_fan_message_menu()
+        loop_bridge.spawn(refresh_fan_messages(), name='fan_messages_refresh')
+        return
+
+    messages = await wait_with_cue(loop_bridge.run_blocking(fetch_fan_messages), 'message_loading')
+    if not messages:
+        print("メッセージの取得に失敗しました")
+        return
+    fan_messages = messages
+    if mode == "main_menu" and menu_items[current_menu] == "ブログファンからメッセージ":
+        enter_fan_message_menu()
+
+
+def enter_fan_message_menu():
+    """ファンメッセージのメニューに入り、最新のメッセージの送信者名を読み上げる"""
+    global mode, fan_message_index
+    mode = "fan_message_menu"
+    fan_message_index = 0
+    play_fan_message_name(fan_message_index)
+    save_session()
+
+
+async def refresh_fan_messages():
+    """ファンメッセージを取得し直して一覧を置き換える（選んでいるメッセージは変えない）"""
+    global fan_messages, fan_message_index
+    messages = await loop_bridge.run_blocking(fetch_fan_messages)
+    if not messages or messages == fan_messages:
+        return
+    selected = fan_messages[fan_message_index] if 0 <= fan_message_index < len(fan_messages) else None
+    fan_messages = messages
+    fan_message_index = messages.index(selected) if selected in messages else 0
+    print(f"🔄 メッセージ一覧を更新しました（{len(messages)}件）")
+    save_session()
+
+
+async def refresh_mukashimukashi_filelist():
+    """物語のファイルリストを取得し直して置き換える（選んでいる物語はファイル名で保つ）"""
+    global mukashimukashi_files, mukashimukashi_index
+    files = await loop_bridge.run_blocking(fetch_mukashimukashi_filelist)
+    if not files or files == mukashimukashi_files:
+        return
+    selected = mukashimukashi_files[mukashimukashi_index] if 0 <= mukashimukashi_index < len(mukashimukashi_files) else None
+    mukashimukashi_files = files
+    mukashimukashi_index = files.index(selected) if selected in files else 0
+    print(f"🔄 物語の一覧を更新しました（{len(files)}件）")
+    save_session()
+
+
+async def open_mukashimukashi_menu():
+    """
+    むかしむかしのメニューに入る。ファイルリストがあればすぐに入り、裏で取得し直す。
+    なければ取得を待つ（LOADING_JOB）
+    """
+    global mode, mukashimukashi_index, mukashimukashi_files
+    if mukashimukashi_files:
+        if not REPLAYING:
+            # 記録した入力の再生中はヘッダーの一覧のまま（ネットワークに触れない）
+            loop_bridge.spawn(refresh_mukashimukashi_filelist(), name='story_list_refresh')
+    else:
+        files = await wait_with_cue(loop_bridge.run_blocking(fetch_mukashimukashi_filelist), 'preparing_audio')
+        if not files:
+            print("ファイルリストの取得に失敗しました")
+            return
+        mukashimukashi_files = files
+    if mode != "main_menu" or menu_items[current_menu] != "むかしむかし":
+        return  # 取得中に別の操作をした
+
+    mode = "mukashimukashi_menu"
+    mukashimukashi_index = 0
+    play_title(mukashimukashi_index)
+    save_session()
+
+
 def handle_back_button():
     """戻るボタンの処理"""
     global mode
 
     print("\n⬅️ 戻る\n")
+    loop_bridge.cancel_timer('knob_settle')
+
+    # 一覧の読み込み・音声の生成を待っていれば、それを取り消す
+    if loop_bridge.cancel_job(LOADING_JOB):
+        print("⏹️ 読み込みを取り消しました")
+        if mode == "main_menu":
+            audio_mgr.stop_immediately()
+            speak("戻る")
+            return
 
     if mode == "playing_message":
         stop_fan_message()
@@ -1198,11 +1431,12 @@ def handle_back_button():
 
     elif mode == "blog_ready":
         # ブログ投稿をキャンセル（即座に止める）
+        loop_bridge.cancel_job(BLOG_CUE_JOB)
         audio_mgr.stop_immediately()
         if 'blog_cancel' in sounds:
-            audio_mgr.play("sound", sounds['blog_cancel'])
+            audio_mgr.play("sound", sounds['blog_cancel'], priority='ui')
         mode = "main_menu"
-        blog_ready_start_time = 0 # タイマーリセット
+        loop_bridge.cancel_timer('blog_ready')
         speak(menu_items[current_menu], index=current_menu)
 
     #elif mode == "blog_recording":
@@ -1215,7 +1449,7 @@ def handle_back_button():
 
         # 音声を再生（即座に）
         if 'blog_posted' in sounds:
-            audio_mgr.play("sound", sounds['blog_posted'], urgent=True)
+            audio_mgr.play("sound", sounds['blog_posted'], urgent=True, priority='ui')
 
         mode = "main_menu"
         transcribe_and_post()
@@ -1225,10 +1459,9 @@ def handle_back_button():
 
     elif mode == "blog_confirm":
         # 投稿をキャンセル
+        loop_bridge.cancel_timer('blog_confirm')
         if 'blog_cancel' in sounds:
-            audio_mgr.play("sound", sounds['blog_cancel'], urgent=True)
-            # キャンセル音声の再生完了を待つ (manager経由なので大体の待ち)
-            time.sleep(2.0)
+            audio_mgr.play("sound", sounds['blog_cancel'], urgent=True, priority='ui')
 
         mode = "main_menu"
 
@@ -1236,6 +1469,8 @@ def handle_back_button():
     else:
         speak("戻る")
 
+        # メニューを離れるので先読みを中止
+        prefetcher.cancel()
 
         if mode == "mukashimukashi_menu":
             mode = "main_menu"
@@ -1249,9 +1484,168 @@ def handle_back_button():
             mode = "main_menu"
             speak(menu_items[current_menu], index=current_menu)
 
+# ========== 入力ループ ==========
+def handle_key_event(event):
+    """キーイベント1つの処理（ループのスレッドで呼ぶ）"""
+    global volume_adjusting, button3_press_time
+
+    key = evdev.categorize(event)
+
+    # キー押下時（value == 1）
+    if event.value == 1:
+        # この入力で最初に鳴る音までの時間を計測（カーネルのイベント時刻から）
+        audio_mgr.mark_input(InputStamp(event_monotonic(event.sec, event.usec), mode, key.keycode))
+
+        # ノブ右回転
+        if key.keycode == 'KEY_VOLUMEUP':
+            handle_rotate(1, event_monotonic(event.sec, event.usec))
+
+        # ノブ左回転
+        elif key.keycode == 'KEY_VOLUMEDOWN':
+            handle_rotate(-1, event_monotonic(event.sec, event.usec))
+
+        # ノブ押下（決定）
+        elif 'KEY_MUTE' in str(key.keycode):
+            handle_button_press()
+
+        # ボタン1（戻る）
+        elif key.keycode == 'KEY_UP':
+            handle_back_button()
+
+        # ボタン2（音量DOWN）
+        elif key.keycode == 'KEY_LEFT':
+            print("\n🔉 音量DOWN開始\n")
+            volume_adjusting = True
+            threading.Thread(
+                target=adjust_volume_loop,
+                args=("down",),
+                daemon=True
+            ).start()
+
+        # ボタン3（音量UP & 再起動）
+        elif key.keycode == 'KEY_DOWN':
+            button3_press_time = time.time()
+            print("\n🔊 音量UP開始 (兼 ボタン3)\n")
+            volume_adjusting = True
+            threading.Thread(
+                target=adjust_volume_loop,
+                args=("up",),
+                daemon=True
+            ).start()
+
+        # ボタン4（音量UP - 故障中につき無効化検討）
+        elif key.keycode == 'KEY_RIGHT':
+            print("\n⚠️ ボタン4は故障中です\n")
+            # volume_adjusting = True
+            # threading.Thread(
+            #     target=adjust_volume_loop,
+            #     args=("up",),
+            #     daemon=True
+            # ).start()
+
+        audio_mgr.mark_input(None)
+        save_session()
+
+    # キーを離した時（value == 0）
+    elif event.value == 0:
+        # ボタン3または4を離した = 音量調整停止
+        if key.keycode in ['KEY_LEFT', 'KEY_RIGHT', 'KEY_DOWN']:
+            volume_adjusting = False
+            print(f"\n音量調整完了: {current_volume}%（ハードウェア: {hw_mixer.level}%）\n")
+
+
+        # ボタン3を離した = 長押しチェック
+        if key.keycode == 'KEY_DOWN':
+            if button3_press_time > 0:
+                press_duration = time.time() - button3_press_time
+                if press_duration >= 5.0:
+                    print("\n🔄 5秒長押し検出！再起動します...\n")
+                    loop_bridge.spawn(reboot())
+                else:
+                    print(f"\n⚙️ ボタン3 ({press_duration:.1f}秒)\n")
+                button3_press_time = 0
+
+
+async def reboot():
+    """操作状態を書き込み、案内音を鳴らしてから再起動（待つ間もループは止めない）"""
+    # 再起動後に同じ状態から使えるよう書き込みを済ませる
+    save_session()
+    await loop_bridge.run_blocking(session_state.flush, 2.0)
+
+    # 「再起動します」音声
+    if 'reboot' in sounds:
+        s = sounds['reboot']
+        s.set_volume(1.0)
+        channel_groups['beep'].play(s)
+        await asyncio.sleep(2.0)
+
+    if 'beep' in sounds:
+        s = sounds['beep']
+        s.set_volume(1.0)
+        channel_groups['beep'].play(s)
+        await asyncio.sleep(0.3)
+    if REPLAYING:
+        print("⏭️ 記録した入力の再生中のため、再起動は行いません")
+        return
+    await loop_bridge.run_blocking(subprocess.run, ['sudo', 'reboot'])
+
+
+async def check_notifications_loop():
+    """通知・リマインドを NOTIFY_CHECK_INTERVAL 秒ごとに確認（取得はスレッドプールで）"""
+    while True:
+        try:
+            await loop_bridge.run_blocking(notifier.check_notifications)
+            notifier.check_reminders()
+        except Exception as e:
+            print(f"⚠️ 通知チェックエラー: {e}")
+        await asyncio.sleep(NOTIFY_CHECK_INTERVAL)
+
+
+async def run_input_loop(events, recorder=None):
+    """
+    キー入力を待ち受けて処理する（タイマー・再生完了・通知チェックも同じループで動く）。
+    events はキーボードの async_read_loop() か、記録の再生（input_trace.replay_events）
+    """
+    loop_bridge.attach()
+    if notifier and not REPLAYING:
+        loop_bridge.spawn(check_notifications_loop())
+    # 復元した物語の一覧はファイルからなので、新しい物語が出ていないか裏で取得し直す
+    if mukashimukashi_files and not REPLAYING:
+        loop_bridge.spawn(refresh_mukashimukashi_filelist(), name='story_list_refresh')
+
+    async for event in events:
+        if event.type != evdev.ecodes.EV_KEY:
+            continue
+        # キーイベントのカーネル時刻 → ハンドラ呼び出しまでを /stats の loop.dispatch に記録
+        loop_bridge.record_dispatch(time.monotonic() - event_monotonic(event.sec, event.usec))
+        if recorder:
+            recorder.record(event, evdev.categorize(event).keycode)
+        handle_key_event(event)
+
+
+def save_replay_report(path):
+    """記録した入力の再生が終わったときの計測結果を表示して JSON に保存する"""
+    input_report = audio_mgr.input_latency.report()
+    print("\n⏱️ 記録した入力の再生結果:")
+    print(format_report(input_report))
+    report = {
+        "trace": cli_args.replay_input,
+        "speed": cli_args.replay_speed,
+        "audio_output": AUDIO_OUTPUT,
+        "input_latency": input_report,
+        "queue_latency": audio_mgr.latency_report(),
+        "sequence_gaps": audio_mgr.sequence_gap_report(),
+        "loop": loop_bridge.report(),
+    }
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"💾 計測結果を保存しました: {path}")
+
+
 # ========== メイン処理 ==========
 def main():
-    global current_menu, knob_counter, volume_adjusting, mode, blog_confirm_start_time, blog_recording_process, last_action_time, button3_press_time, fan_message_index, blog_ready_start_time, notifier, sounds_paths
+    global notifier, sounds_paths
     
     # パス保持（NotificationManager用）
     sounds_paths = {
@@ -1259,46 +1653,68 @@ def main():
         'fan_message_reminder': f'{AUDIO_DIR}/fan_message_reminder.wav'
     }
 
-    # 音声事前ロード
+    # 音声事前ロード（各ファイル1回だけ。パックの作り直しが必要ならデコードは並列）
+    startup_profile.phase('load_sounds')
     print("音声ファイルをロード中...")
     load_sounds()
     
+    print(f"{len(sounds)}個の音声ファイルをロードしました\n")
+
+    # 再起動前の操作状態を復元（一覧はファイルから。ネットワークには触らない）。
+    # 記録した入力の再生は記録開始時の状態から始める
+    startup_profile.phase('restore_session')
+    replay_state = None
+    if REPLAYING:
+        header, _, _ = input_trace.load_trace(cli_args.replay_input)
+        replay_state = header.get('state') or {}
+    if restore_session(replay_state):
+        announce_current()
+
     # 通知マネージャー初期化
+    startup_profile.phase('ensure_voices')
     notifier = NotificationManager()
-    notifier.ensure_voices(sounds_paths) # 音声がなければ作成
+    notifier.ensure_voices(sounds_paths) # 音声がなければバックグラウンドで作成
 
-    # 方角音声を確保
+    # 方角音声を確保（なければバックグラウンドで作成し、できるまではビープ音）
+    startup_profile.phase('direction_voices')
     ensure_direction_voices()
-    # 再ロードして方角音声を取り込む
-    load_sounds()
-    
-    print(f"{len(sounds)}個の音声ファイルをロードしました\n")
+    direction_alerts.placeholder = sounds.get('beep')
+    # ゲインの計算は起動を待たせない（準備前の通知はその場で計算する）
+    threading.Thread(target=direction_alerts.load, args=(sounds,), daemon=True).start()
 
-    # Flaskサーバーを別スレッドで起動
+    # ミキサーと形式の違う音声（再生のたびにリサンプルされる）がないか確認（起動を待たせない）
+    threading.Thread(target=warn_off_format, daemon=True).start()
+
+    # Flaskサーバーを別スレッドで起動（flask の読み込みもそのスレッドで行う）
+    startup_profile.phase('flask_start')
     server_thread = threading.Thread(target=run_flask_server, daemon=True)
     server_thread.start()
 
-    # 初期音量設定
-    subprocess.run(
-        ['amixer', '-c', SPEAKER_CARD, 'sset', 'PCM', f'{current_volume}%'],
-        stdout=subprocess.DEVNULL,
-        stderr=subprocess.DEVNULL
-    )
+    # 初期音量設定（null / file 出力ではサウンドカードがないので省略）
+    startup_profile.phase('volume_init')
+    hw_mixer.set_volume(current_volume)
     print(f"初期音量: {current_volume}%\n")
 
-    # デバイス検出
-    print("利用可能なデバイス:")
-    devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
-    for i, device in enumerate(devices):
-        print(f"{i}: {device.path} - {device.name}")
+    # オーディオデバイスの抜き差しを監視（再起動せずにカードを選び直す）
+    card_watcher.start()
 
+    # デバイス検出（見つかるまで10秒ごとに再検出。待ち時間もこの段階に含む）
+    startup_profile.phase('keyboard_scan')
     keyboard = None
-    for device in devices:
-        if 'Keyboard' in device.name and 'Mouse' not in device.name:
-            keyboard = device
-            break
+    if REPLAYING:
+        print(f"▶️ キーボードの代わりに記録した入力を流します: {cli_args.replay_input}（{cli_args.replay_speed}倍）")
+    else:
+        print("利用可能なデバイス:")
+        devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
+        for i, device in enumerate(devices):
+            print(f"{i}: {device.path} - {device.name}")
+
+        for device in devices:
+            if 'Keyboard' in device.name and 'Mouse' not in device.name:
+                keyboard = device
+                break
 
-    while not keyboard:
+    while not keyboard and not REPLAYING:
         print("\nキーボードが見つかりません。10秒後に再検出します...")
         time.sleep(10)
         devices = [evdev.InputDevice(path) for path in evdev.list_devices()]
@@ -1307,189 +1723,49 @@ def main():
                 keyboard = device
                 break
 
-    print(f"\n使用デバイス: {keyboard.name}")
-    print(f"パス: {keyboard.path}")
-    print("\n起動完了。操作してください。")
-    print("ボタン1: 戻る")
-    print("ボタン2: 音量DOWN（押しっぱなし）")
-    print("ボタン4: 音量UP（押しっぱなし）\n")
-
-
+    # 起動完了までの段階ごとの時間をジャーナル（標準出力）と JSON に残す
+    startup_profile.ready()
+    startup_profile.print_report()
+    startup_profile.save(cli_args.profile_startup or STARTUP_PROFILE_PATH)
+    if cli_args.profile_startup:
+        print("⏱️ --profile-startup のため終了します")
+        sys.exit(0)
+
+    if keyboard:
+        print(f"\n使用デバイス: {keyboard.name}")
+        print(f"パス: {keyboard.path}")
+        print("\n起動完了。操作してください。")
+        print("ボタン1: 戻る")
+        print("ボタン2: 音量DOWN（押しっぱなし）")
+        print("ボタン4: 音量UP（押しっぱなし）\n")
+
+    recorder = None
     try:
-        # デバイス占有
-        keyboard.grab()
-
-        # 前回のチェック時刻
-        last_timeout_check = time.time()
-
-        while True:
-            # 0.1秒タイムアウトで入力を待つ
-            # タイムアウト時も空リストが返るので、処理は継続してタイムアウト判定を行う
-            r, w, x = select.select([keyboard.fd], [], [], 0.1)
-
-            # タイムアウトチェック（ループ毎に実行）
-            current_time = time.time()
-            if current_time - last_timeout_check > 0.1:
-                last_timeout_check = current_time
-
-                # blog_confirm モードのタイムアウト（5秒）
-                if mode == "blog_confirm" and blog_confirm_start_time > 0:
-                    if current_time - blog_confirm_start_time > 20:
-                        print("\n⏱️ タイムアウト: キャンセルします\n")
-
-                        if 'blog_timeout' in sounds:
-                            audio_mgr.play("sound", sounds['blog_timeout'], urgent=True)
-                            # タイムアウト音声の再生完了を待つ
-                            time.sleep(3.5)
-
-                        mode = "main_menu"
-                        blog_confirm_start_time = 0
-
-                        # タイムアウト後、2秒間ボタンを無視
-                        last_action_time = time.time()
-
-                # blog_ready モードのタイムアウト（3分 = 180秒）
-                if mode == "blog_ready" and blog_ready_start_time > 0:
-                    if current_time - blog_ready_start_time > 180:
-                        print("\n⏱️ タイムアウト: メインメニューに戻ります\n")
-                        
-                        # 「戻ります」または「戻る」音声
-                        if 'modorimasu' in sounds:
-                            audio_mgr.play("sound", sounds['modorimasu'], urgent=True)
-                            time.sleep(1.5) # 音声の長さ分待つ（概算）
-                        elif 'modoru' in sounds:
-                            audio_mgr.play("sound", sounds['modoru'], urgent=True)
-                            time.sleep(0.5)
-
-                        mode = "main_menu"
-                        blog_ready_start_time = 0
-                        
-                        # メニュー名を読み上げ（復帰確認）
-                        speak(menu_items[current_menu], index=current_menu)
-
-                # blog_recording モードの自動停止（60秒）
-                if mode == "blog_recording" and blog_recording_process:
-                    if blog_recording_process.poll() is not None:
-                        # プロセスが終了した（60秒経過）
-                        print("\n⏱️ 録音時間上限（60秒）に達しました\n")
-                        stop_blog_recording()
-
-                        if 'blog_confirm' in sounds:
-                            audio_mgr.play("sound", sounds['blog_confirm'], urgent=True)
-
-                        mode = "blog_confirm"
-                        blog_confirm_start_time = time.time()
-
-                # 再生完了チェック（非ブロッキング再生の事後処理）
-                if mode == "playing_bird_song" or mode == "playing_message":
-                    if not pygame.mixer.get_busy():
-                        print(f"\n✅ 再生完了: メニューに戻ります (mode: {mode})\n")
-                        if mode == "playing_bird_song":
-                            mode = "bird_song_menu"
-                        else:
-                            mode = "fan_message_menu"
-
-                # 通知・リマインドチェック
-                if notifier:
-                    notifier.check_notifications()
-                    notifier.check_reminders()
-
-            # イベント処理
-            if r:
-                for event in keyboard.read():
-                    if event.type == evdev.ecodes.EV_KEY:
-
-                        key = evdev.categorize(event)
-
-                        # キー押下時（value == 1）
-                        if event.value == 1:
-                            # ノブ右回転
-                            if key.keycode == 'KEY_VOLUMEUP':
-                                handle_rotate(1)
-
-                            # ノブ左回転
-                            elif key.keycode == 'KEY_VOLUMEDOWN':
-                                handle_rotate(-1)
-
-                            # ノブ押下（決定）
-                            elif 'KEY_MUTE' in str(key.keycode):
-                                handle_button_press()
-
-                            # ボタン1（戻る）
-                            elif key.keycode == 'KEY_UP':
-                                handle_back_button()
-
-                            # ボタン2（音量DOWN）
-                            elif key.keycode == 'KEY_LEFT':
-                                print("\n🔉 音量DOWN開始\n")
-                                volume_adjusting = True
-                                threading.Thread(
-                                    target=adjust_volume_loop,
-                                    args=("down",),
-                                    daemon=True
-                                ).start()
-
-                            # ボタン3（音量UP & 再起動）
-                            elif key.keycode == 'KEY_DOWN':
-                                button3_press_time = time.time()
-                                print("\n🔊 音量UP開始 (兼 ボタン3)\n")
-                                volume_adjusting = True
-                                threading.Thread(
-                                    target=adjust_volume_loop,
-                                    args=("up",),
-                                    daemon=True
-                                ).start()
-
-                            # ボタン4（音量UP - 故障中につき無効化検討）
-                            elif key.keycode == 'KEY_RIGHT':
-                                print("\n⚠️ ボタン4は故障中です\n")
-                                # volume_adjusting = True
-                                # threading.Thread(
-                                #     target=adjust_volume_loop,
-                                #     args=("up",),
-                                #     daemon=True
-                                # ).start()
-
-                        # キーを離した時（value == 0）
-                        elif event.value == 0:
-                            # ボタン3または4を離した = 音量調整停止
-                            if key.keycode in ['KEY_LEFT', 'KEY_RIGHT', 'KEY_DOWN']:
-                                volume_adjusting = False
-                                print(f"\n音量調整完了: {current_volume}%\n")
-
-
-                            # ボタン3を離した = 長押しチェック
-                            if key.keycode == 'KEY_DOWN':
-                                if button3_press_time > 0:
-                                    press_duration = time.time() - button3_press_time
-                                    if press_duration >= 5.0:
-                                        print("\n🔄 5秒長押し検出！再起動します...\n")
-
-                                        # 「再起動します」音声
-                                        if 'reboot' in sounds:
-                                            s = sounds['reboot']
-                                            s.set_volume(1.0)
-                                            s.play()
-                                            time.sleep(2.0)
-
-                                        if 'beep' in sounds:
-                                            s = sounds['beep']
-                                            s.set_volume(1.0)
-                                            s.play()
-                                            time.sleep(0.3)
-                                        subprocess.run(['sudo', 'reboot'])
-                                    else:
-                                        print(f"\n⚙️ ボタン3 ({press_duration:.1f}秒)\n")
-                                    button3_press_time = 0
+        if REPLAYING:
+            events = input_trace.replay_events(cli_args.replay_input, cli_args.replay_speed)
+        else:
+            # デバイス占有
+            keyboard.grab()
+            events = keyboard.async_read_loop()
+            if cli_args.record_input:
+                recorder = input_trace.TraceRecorder(cli_args.record_input, keyboard.name, session_snapshot())
+                print(f"⏺️ キー入力を記録します: {cli_args.record_input}")
+
+        # キー入力・タイマー・通知チェックを asyncio ループで処理（入力がなければ眠ったまま）
+        asyncio.run(run_input_loop(events, recorder))
+        if REPLAYING:
+            save_replay_report(REPLAY_REPORT_PATH)
 
     except KeyboardInterrupt:
         print("\n終了")
     finally:
-        # ffplayプロセスを確実に終了
-        global ffplay_process
-        if ffplay_process:
-            ffplay_process.terminate()
-            ffplay_process.wait()
+        if recorder:
+            recorder.close()
+        # 操作状態の書き込みを済ませる
+        save_session()
+        session_state.flush(1.0)
+        # 再生中の音声を止める（ffplay で再生していればそのプロセスも audio_manager が終了させる）
+        audio_mgr.stop_immediately()
 
         if keyboard:
             try:
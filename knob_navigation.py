@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ノブを回す速さに応じた移動量（長い一覧は速く回すとまとめて進む）
+
+ノブは1クリック（デテント）ごとに KEY_VOLUMEUP / KEY_VOLUMEDOWN を送る。
+以前はどのメニューも3クリックで1項目ずつ進んだため、数百件ある物語の一覧の端まで行くには
+数百回タイトルの読み上げを聞くことになった。
+
+KnobNavigator は evdev のイベント時刻からクリックの速さ（クリック/秒）を求め、
+ゆっくり回すと従来どおり threshold クリックで1項目、速く回すと1クリックで数項目進む。
+加速の上限は一覧の長さで決まり（LONG_LIST 件以下のメニューは加速しない）、
+加速した移動は一覧の端で止まる（1項目ずつの移動は従来どおり端から反対側へ回る）。
+
+読み上げは回転が止まってから（settle 秒後）今の項目だけを行い、
+動くたびには make_tick() の短いクリック音で移動したことをすぐに知らせる。
+
+  python3 audio_bench.py knob --items 300 --target 150   # 目的の項目までの時間を従来方式と比較
+"""
+
+import math
+import array
+
+# この速さ（クリック/秒）までは加速しない
+SLOW_RATE = 8.0
+# この速さで最大の加速になる
+FAST_RATE = 30.0
+# この件数ごとに最大の加速を1倍増やす（短いメニューは加速しない）
+LONG_LIST = 20
+# 1クリックで進む量の上限（threshold 単位。12 なら1クリックで4項目）
+MAX_GAIN = 12.0
+# これより間が空いたら回し始めとみなす（速さを測り直す）
+IDLE_GAP = 0.35
+# 回転が止まってから読み上げるまでの秒数（keyboard_test_v2.py では NAV_SETTLE）
+SETTLE = 0.3
+# クリック音（秒・Hz・音量）
+TICK_LENGTH = 0.012
+TICK_FREQ = 2000.0
+TICK_VOLUME = 0.25
+# 速さの指数移動平均の係数（クリックごとのばらつきをならす）
+SMOOTHING = 0.5
+
+
+def advance(index, steps, length, wrap=True):
+    """index から steps 進めた位置（wrap=False なら端で止まる）"""
+    if length <= 0:
+        return 0
+    if wrap:
+        return (index + steps) % length
+    return min(max(index + steps, 0), length - 1)
+
+
+def make_tick(pygame, length=TICK_LENGTH, freq=TICK_FREQ, volume=TICK_VOLUME):
+    """項目が動いたことを知らせる短いクリック音（減衰するサイン波）の Sound をミキサーの形式で作る"""
+    rate, _, channels = pygame.mixer.get_init()
+    frames = max(1, int(rate * length))
+    samples = array.array('h')
+    for i in range(frames):
+        envelope = math.exp(-5.0 * i / frames)
+        v = int(32767 * volume * envelope * math.sin(2 * math.pi * freq * i / rate))
+        samples.extend([v] * channels)
+    return pygame.mixer.Sound(buffer=samples.tobytes())
+
+
+class KnobNavigator:
+    """クリックの時刻から速さを求め、進む項目数を返す"""
+    def __init__(self, threshold=3, slow_rate=SLOW_RATE, fast_rate=FAST_RATE, long_list=LONG_LIST,
+                 max_gain=MAX_GAIN, idle_gap=IDLE_GAP, settle=SETTLE):
+        self.threshold = threshold
+        self.slow_rate = slow_rate
+        self.fast_rate = fast_rate
+        self.long_list = long_list
+        self.max_gain = max_gain
+        self.idle_gap = idle_gap
+        self.settle = settle
+        self.rate = 0.0      # 今の速さ（クリック/秒）
+        self.fast = False    # 直前のクリックが加速していたか（読み上げを止まるまで待つ）
+        self._units = 0.0    # 溜まった回転量（threshold で1項目）
+        self._direction = 0
+        self._last_at = None
+
+    def reset(self):
+        """溜まった回転量と速さを捨てる（再生中など回転を無視するとき）"""
+        self.rate = 0.0
+        self.fast = False
+        self._units = 0.0
+        self._direction = 0
+        self._last_at = None
+
+    def gain(self, rate, length):
+        """速さ rate のときの1クリックの回転量（threshold 単位。1 で従来どおり）"""
+        top = min(self.max_gain, length / self.long_list)
+        if top <= 1.0 or rate <= self.slow_rate:
+            return 1.0
+        x = min(1.0, (rate - self.slow_rate) / (self.fast_rate - self.slow_rate))
+        return 1.0 + (top - 1.0) * x
+
+    def rotate(self, direction, at, length):
+        """
+        1クリックの回転（direction: +1 / -1、at: イベント時刻（秒）、length: 一覧の件数）。
+        進む項目数（符号付き。0 なら移動なし）を返す
+        """
+        if direction != self._direction:
+            # 逆に回し始めたら溜まった分は捨てる
+            self._units = 0.0
+            self.rate = 0.0
+        elif self._last_at is not None and at - self._last_at <= self.idle_gap:
+            rate = 1.0 / max(at - self._last_at, 1e-3)
+            self.rate = rate if self.rate == 0.0 else self.rate + SMOOTHING * (rate - self.rate)
+        else:
+            self.rate = 0.0
+        self._direction = direction
+        self._last_at = at
+
+        gain = self.gain(self.rate, length)
+        self.fast = gain > 1.0
+        self._units += gain
+        steps = int(self._units // self.threshold)
+        self._units -= steps * self.threshold
+        return steps * direction
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+重い依存モジュールの遅延読み込みと、起動時の import 時間の計測
+
+keyboard_test_v2.py は flask / requests / boto3 / openai / ブログ投稿まわりを
+起動時に読み込まず、使う機能の中で import する。
+最初のメニュー読み上げが終わった後に warm_up() でバックグラウンドに読み込んでおくと、
+初めてその機能を使うときの待ちもなくなる。
+
+起動時に読み込むモジュールごとの import 時間を表示する場合:
+  python3 lazy_imports.py               # 現在の keyboard_test_v2.py
+  python3 lazy_imports.py --rev HEAD~1  # 指定したリビジョンと比較
+"""
+
+import os
+import re
+import ast
+import sys
+import time
+import argparse
+import importlib
+import importlib.util
+import threading
+import subprocess
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 起動後に使う機能の中で読み込むモジュール（warm_up の対象）
+DEFERRED_MODULES = ('requests', 'flask', 'boto3', 'fan_messages', 'openai', 'voice_to_text', 'blog_poster')
+
+_import_times = {}  # モジュール名 → warm_up で読み込んだ秒数（読み込めなければ None）
+_warm_started = threading.Event()
+
+
+def warm_up(names=DEFERRED_MODULES):
+    """遅延読み込みのモジュールをバックグラウンドで読み込む（2回目以降は何もしない）"""
+    if _warm_started.is_set():
+        return
+    _warm_started.set()
+
+    def run():
+        start = time.monotonic()
+        for name in names:
+            if name in sys.modules:
+                continue
+            t = time.monotonic()
+            try:
+                importlib.import_module(name)
+                _import_times[name] = time.monotonic() - t
+            except Exception as e:
+                _import_times[name] = None
+                print(f"⚠️ 先読み import に失敗しました: {name}: {e}")
+        loaded = [n for n, v in _import_times.items() if v is not None]
+        print(f"📚 モジュールを先読みしました: {len(loaded)}件（{time.monotonic() - start:.2f}秒）")
+
+    threading.Thread(target=run, daemon=True).start()
+
+
+def warm_started():
+    return _warm_started.is_set()
+
+
+def report():
+    """warm_up で読み込んだモジュールと読み込み時間（秒）"""
+    return {
+        'warm_started': _warm_started.is_set(),
+        'import_seconds': dict(_import_times),
+        'loaded': [name for name in DEFERRED_MODULES if name in sys.modules],
+    }
+
+
+# ========== 起動時の import 時間の計測 ==========
+def startup_imports(source):
+    """スクリプトのトップレベルで import しているモジュール名（先頭の要素）"""
+    names = []
+    for node in ast.parse(source).body:
+        if isinstance(node, ast.Import):
+            modules = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            modules = [node.module]
+        else:
+            continue
+        for module in modules:
+            top = module.split('.')[0]
+            if top not in names:
+                names.append(top)
+    return names
+
+
+def measure_imports(names):
+    """
+    新しいプロセスで names を順に import し、(モジュールごとの時間, 全体の時間) を秒で返す。
+    モジュールごとの時間は依存も含むが、先に読み込んだモジュールと共有する依存は含まない
+    （起動時と同じ順で読み込むため）。読み込めなかったモジュールは None。
+    """
+    code = "\n".join(f"try:\n    import {name}\nexcept Exception:\n    pass" for name in names)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', code],
+                            cwd=PROJECT_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    times = dict.fromkeys(names, 0.0)  # 記録がなければ起動時点で読み込み済み（標準ライブラリ等）
+    total = 0
+    for line in result.stderr.splitlines():
+        match = re.match(r'import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)\s*$', line)
+        if not match:
+            continue
+        total += int(match.group(1))
+        if not match.group(3) and match.group(4) in times:
+            times[match.group(4)] = int(match.group(2)) / 1000000.0
+    for name in names:
+        if importlib.util.find_spec(name) is None:
+            times[name] = None
+    return times, total / 1000000.0
+
+
+def git_source(rev, path='keyboard_test_v2.py'):
+    return subprocess.run(['git', 'show', f'{rev}:{path}'], cwd=PROJECT_DIR,
+                          capture_output=True, text=True, check=True).stdout
+
+
+def format_seconds(value):
+    return "未インストール" if value is None else f"{value * 1000:.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="keyboard_test_v2.py の起動時 import 時間を表示")
+    parser.add_argument('--rev', help="比較する git リビジョン（変更前）")
+    args = parser.parse_args()
+
+    with open(os.path.join(PROJECT_DIR, 'keyboard_test_v2.py'), encoding='utf-8') as f:
+        after = startup_imports(f.read())
+    after_times, after_total = measure_imports(after)
+    if args.rev:
+        before = startup_imports(git_source(args.rev))
+        before_times, before_total = measure_imports(before)
+    else:
+        before, before_times, before_total = [], {}, None
+
+    def column(name, group, times):
+        if name not in group:
+            return f"{'遅延' if name in DEFERRED_MODULES else '-':>12}"
+        return f"{format_seconds(times[name]):>12}"
+
+    names = before + [n for n in after if n not in before]
+    print(f"{'モジュール':<24}{'変更前' if args.rev else '':>12}{'変更後':>12}")
+    for name in names:
+        print(f"  {name:<22}{column(name, before, before_times) if args.rev else '':>12}{column(name, after, after_times)}")
+    if args.rev:
+        print(f"起動時の import 合計: 変更前 {before_total * 1000:.0f}ms → 変更後 {after_total * 1000:.0f}ms")
+    else:
+        print(f"起動時の import 合計: {after_total * 1000:.0f}ms")
+    missing = sorted({n for n, v in list(after_times.items()) + list(before_times.items()) if v is None})
+    if missing:
+        print(f"⚠️ 未インストールのため計測できないモジュール: {', '.join(missing)}")
+
+
+if __name__ == '__main__':
+    main()
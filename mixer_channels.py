@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+pygame.mixer のチャンネルグループ管理モジュール
+
+用途ごとにチャンネルを予約（pygame.mixer.set_reserved）し、
+グループ単位で再生・停止・再生中判定を行う。
+これにより音量ビープや方角通知がキューの再生を止めたり引き延ばしたりしない。
+"""
+
+import threading
+
+import pygame
+
+# グループ名とチャンネル数（この順にチャンネル番号 0 から割り当てて予約する）
+CHANNEL_GROUPS = [
+    ('ui', 2),       # 操作音・ナビ読み上げ
+    ('content', 2),  # 物語・メッセージ・鳥の声
+    ('alert', 2),    # 方角通知・新着通知
+    ('beep', 1),     # 音量調整ビープ・再起動音
+]
+
+# 全チャンネル数（予約外は Sound.play() の自動割り当て用）
+NUM_CHANNELS = 16
+
+# 音量エンベロープの更新間隔（秒）
+RAMP_STEP = 0.01
+
+
+class ChannelGroup:
+    """予約済みチャンネルのまとまり"""
+    def __init__(self, name, channels):
+        self.name = name
+        self.channels = channels
+        self._next = 0
+
+    def find(self):
+        """空いているチャンネルを返す。すべて使用中なら順番に古いものを奪う"""
+        for channel in self.channels:
+            if not channel.get_busy():
+                return channel
+        channel = self.channels[self._next % len(self.channels)]
+        self._next += 1
+        channel.stop()
+        return channel
+
+    def play(self, sound, loops=0):
+        channel = self.find()
+        channel.set_volume(1.0)
+        channel.play(sound, loops=loops)
+        return channel
+
+    def get_busy(self):
+        return any(channel.get_busy() for channel in self.channels)
+
+    def stop(self):
+        for channel in self.channels:
+            channel.stop()
+
+    def pause(self):
+        """再生中のチャンネルを一時停止し、止めたチャンネルを返す"""
+        paused = [channel for channel in self.channels if channel.get_busy()]
+        for channel in paused:
+            channel.pause()
+        return paused
+
+    def unpause(self):
+        for channel in self.channels:
+            channel.unpause()
+
+    def owns(self, channel):
+        return any(channel == c for c in self.channels)
+
+
+class VolumeRamp:
+    """チャンネルの音量を duration 秒かけて target へ段階的に変える（呼び出し側は待たない）"""
+    def __init__(self, channel, target, duration):
+        self.channel = channel
+        self.target = target
+        self.duration = duration
+        self._cancelled = threading.Event()
+        if duration <= 0:
+            channel.set_volume(target)
+            return
+        thread = threading.Thread(target=self._run, daemon=True)
+        thread.start()
+
+    def _run(self):
+        start = self.channel.get_volume()
+        steps = max(1, int(self.duration / RAMP_STEP))
+        for i in range(1, steps + 1):
+            if self._cancelled.wait(RAMP_STEP):
+                return
+            self.channel.set_volume(start + (self.target - start) * i / steps)
+
+    def cancel(self):
+        """途中で止める（音量はその時点の値のまま）"""
+        self._cancelled.set()
+
+
+def init_channel_groups(num_channels=NUM_CHANNELS):
+    """チャンネルを予約してグループを作成（pygame.mixer 初期化後に呼ぶ）"""
+    reserved = sum(count for _, count in CHANNEL_GROUPS)
+    pygame.mixer.set_num_channels(max(num_channels, reserved + 1))
+    pygame.mixer.set_reserved(reserved)
+
+    groups = {}
+    index = 0
+    for name, count in CHANNEL_GROUPS:
+        groups[name] = ChannelGroup(name, [pygame.mixer.Channel(index + i) for i in range(count)])
+        index += count
+    return groups
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ALSA ミキサー（ハードウェア音量）の制御モジュール
+
+音量を変えるたびに amixer を起動する代わりに、カードのミキサーを開いたままにして設定する。
+pyalsaaudio（pip install pyalsaaudio）があればプロセス内で、
+なければ `amixer -s`（標準入力からコマンドを読むモード）を1つだけ起動して使い続ける。
+
+変更要求は専用スレッドで反映し、反映前に届いた要求はまとめて最後の値だけを設定する
+（ボタン長押し中の連続変更で待ちが積み上がらないように）。
+反映後は実際のハードウェアの音量を読み戻して level に保持する。
+"""
+
+import re
+import time
+import shutil
+import threading
+import subprocess
+from collections import deque
+
+from input_latency import summarize
+
+# 試すコントロール名（PCM がないカードは Master）
+CONTROLS = ('PCM', 'Master')
+
+# 保持する直近の反映時間の数
+LATENCY_WINDOW = 200
+
+_LEVEL = re.compile(r'\[(\d+)%\]')
+
+
+def has_alsaaudio():
+    try:
+        import alsaaudio  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+class AlsaAudioMixer:
+    """pyalsaaudio でミキサーを開いたまま操作する"""
+    forks = 0
+
+    def __init__(self, card, controls=CONTROLS):
+        import alsaaudio
+        for control in controls:
+            try:
+                self.mixer = alsaaudio.Mixer(control, cardindex=int(card))
+                self.control = control
+                return
+            except alsaaudio.ALSAAudioError:
+                continue
+        raise RuntimeError(f"カード {card} に音量コントロールがありません（{', '.join(controls)}）")
+
+    def set(self, percent):
+        """音量を設定し、読み戻した音量（%）を返す"""
+        self.mixer.setvolume(int(percent))
+        return self.get()
+
+    def get(self):
+        self.mixer.handleevents()
+        levels = self.mixer.getvolume()
+        return round(sum(levels) / len(levels)) if levels else None
+
+    def close(self):
+        try:
+            self.mixer.close()
+        except Exception:
+            pass
+
+
+class AmixerSession:
+    """`amixer -s` を起動したままにし、標準入力へ sset コマンドを送る
+
+    -s モードは sset / cset だけを受け付け、sset のたびにコントロールの状態を出力する。
+    その出力の "Playback channels" に並ぶチャンネルの行がすべて揃ったら1回分の応答とする。
+    """
+    def __init__(self, card, controls=CONTROLS):
+        # 使えるコントロールを確認（起動時に1回だけ）
+        self.forks = 1
+        out = subprocess.run(['amixer', '-c', str(card), 'scontrols'],
+                             capture_output=True, text=True).stdout
+        self.control = next((c for c in controls if f"'{c}'" in out), None)
+        if self.control is None:
+            raise RuntimeError(f"カード {card} に音量コントロールがありません（{', '.join(controls)}）")
+
+        # パイプ越しでも1行ずつ出力されるように行バッファにする
+        cmd = ['amixer', '-c', str(card), '-s']
+        if shutil.which('stdbuf'):
+            cmd = ['stdbuf', '-oL'] + cmd
+        self.process = subprocess.Popen(cmd, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.DEVNULL, text=True, bufsize=1)
+        self.forks += 1
+        self._level = None
+
+    def set(self, percent):
+        """音量を設定し、読み戻した音量（%）を返す"""
+        self.process.stdin.write(f"sset {self.control} {int(percent)}%\n")
+        self.process.stdin.flush()
+        self._level = self._read_state()
+        return self._level
+
+    def get(self):
+        # -s モードでは sget を使えないので、最後に設定したときの読み戻し値
+        return self._level
+
+    def _read_state(self):
+        """sset の出力（コントロールの状態）を1回分読み、各チャンネルの音量の平均を返す"""
+        channels = None
+        levels = {}
+        while channels is None or len(levels) < len(channels):
+            line = self.process.stdout.readline()
+            if not line:
+                raise RuntimeError("amixer が終了しました")
+            line = line.strip()
+            if line.startswith('Playback channels:'):
+                channels = [name.strip() for name in line.split(':', 1)[1].split(' - ')]
+                continue
+            name, _, rest = line.partition(':')
+            match = _LEVEL.search(rest)
+            if channels and name in channels and match:
+                levels[name] = int(match.group(1))
+        return round(sum(levels.values()) / len(levels))
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.close()
+                self.process.wait(timeout=0.5)
+            except Exception:
+                self.process.kill()
+
+
+class MixerController:
+    """ハードウェア音量を専用スレッドで反映する（呼び出し側は待たない）"""
+    def __init__(self, card, controls=CONTROLS, enabled=True):
+        self.card = card
+        self.controls = controls
+        self.enabled = enabled  # null / file 出力ではサウンドカードがないので反映しない
+        self.level = None        # 読み戻したハードウェアの音量（%）
+        self.forks = 0           # 起動した amixer プロセスの数
+        self.changes = 0         # 反映した回数
+        self.coalesced = 0       # 反映前に新しい値で置き換えた要求の数
+        self.errors = 0
+        self.latency = deque(maxlen=LATENCY_WINDOW)  # 要求 → ハードウェアへの反映（秒）
+        self._mixer = None
+        self._mixer_card = None
+        self._target = None
+        self._requested_at = None
+        self._applying = False
+        self._cond = threading.Condition()
+        if enabled:
+            self._thread = threading.Thread(target=self._worker, daemon=True)
+            self._thread.start()
+
+    def set_volume(self, percent):
+        """音量の変更を要求する（反映は専用スレッドで行う）"""
+        if not self.enabled:
+            return
+        with self._cond:
+            if self._target is None:
+                self._requested_at = time.monotonic()
+            else:
+                self.coalesced += 1
+            self._target = percent
+            self._cond.notify()
+
+    def set_card(self, card):
+        """使うカードを変える（次の反映時に新しいカードのミキサーを開き直す）"""
+        with self._cond:
+            self.card = card
+
+    def wait(self, timeout=None):
+        """要求した音量がすべて反映されるまで待つ。反映済みなら True"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._target is None and not self._applying, timeout)
+
+    def _open(self):
+        if self._mixer is not None and self._mixer_card != self.card:
+            # カードが抜き差しされて変わった
+            self._mixer.close()
+            self._mixer = None
+        if self._mixer is None:
+            self._mixer_card = self.card
+            self._mixer = AlsaAudioMixer(self.card, self.controls) if has_alsaaudio() else AmixerSession(self.card, self.controls)
+            self.forks += self._mixer.forks
+            print(f"🎚️ ミキサー: カード {self.card} {self._mixer.control}（{type(self._mixer).__name__}）")
+        return self._mixer
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._target is None:
+                    self._cond.wait()
+                target, requested_at = self._target, self._requested_at
+                self._target = None
+                self._applying = True
+
+            try:
+                level = self._open().set(target)
+                self.level = level
+                self.changes += 1
+                self.latency.append(time.monotonic() - requested_at)
+            except Exception as e:
+                self.errors += 1
+                print(f"⚠️ 音量の設定に失敗しました: {e}")
+                if self._mixer:
+                    self._mixer.close()
+                    self._mixer = None
+
+            with self._cond:
+                self._applying = False
+                self._cond.notify_all()
+
+    def stats(self):
+        return {
+            'enabled': self.enabled,
+            'card': self.card,
+            'backend': type(self._mixer).__name__ if self._mixer else None,
+            'control': self._mixer.control if self._mixer else None,
+            'level': self.level,
+            'forks': self.forks,
+            'changes': self.changes,
+            'coalesced': self.coalesced,
+            'errors': self.errors,
+            'latency': summarize(self.latency) if self.latency else {},
+        }
+
+    def close(self):
+        if self._mixer:
+            self._mixer.close()
+            self._mixer = None
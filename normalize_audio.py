@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音声アセットの形式統一ツール
+
+audio/、mukashimukashi/titles/、cache/ 以下の WAV をミキサーと同じ形式
+（44100Hz / 16bit / ステレオ）に変換し、各ファイルの形式を manifest に記録する。
+再生のたびに SDL や dmix がリサンプルしないようにするため。
+
+本体は起動時に manifest を確認し、形式の違うファイルがあれば警告を出す。
+
+使い方:
+  python3 normalize_audio.py          # 変換して manifest を更新
+  python3 normalize_audio.py --check  # 変換せずに形式の違うファイルを一覧
+"""
+
+import os
+import sys
+import json
+import wave
+import argparse
+
+from audio_decoder import open_source, decoder_available
+from audio_output import MIXER_FREQUENCY, MIXER_CHANNELS, MIXER_SIZE
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 対象ディレクトリ（PROJECT_DIR からの相対パス）
+ASSET_DIRS = ['audio', os.path.join('mukashimukashi', 'titles'), 'cache']
+
+MANIFEST_PATH = os.path.join(PROJECT_DIR, 'audio_manifest.json')
+
+# 標準形式（サンプルレート, チャンネル数, サンプル幅バイト）
+TARGET_FORMAT = (MIXER_FREQUENCY, MIXER_CHANNELS, abs(MIXER_SIZE) // 8)
+
+
+def wav_format(path):
+    """WAV の (サンプルレート, チャンネル数, サンプル幅) を返す。読めなければ None"""
+    try:
+        with wave.open(path, 'rb') as w:
+            return (w.getframerate(), w.getnchannels(), w.getsampwidth())
+    except (wave.Error, EOFError, OSError):
+        return None
+
+
+def format_label(fmt):
+    if fmt is None:
+        return "不明"
+    rate, channels, width = fmt
+    return f"{rate}Hz/{width * 8}bit/{'ステレオ' if channels == 2 else f'{channels}ch'}"
+
+
+def normalize_file(path):
+    """WAV を標準形式に変換して置き換える。変換した場合は True（標準形式なら何もしない）"""
+    if wav_format(path) == TARGET_FORMAT:
+        return False
+    if not decoder_available():
+        print(f"⚠️ PyAV / ffmpeg がないため変換できません: {path}")
+        return False
+
+    source = open_source(path, MIXER_FREQUENCY, MIXER_CHANNELS)
+    try:
+        chunks = []
+        while True:
+            data = source.read(65536)
+            if not data:
+                break
+            chunks.append(data)
+    finally:
+        source.close()
+    if not chunks:
+        print(f"⚠️ デコードできません: {path}")
+        return False
+
+    # 書き込み途中のファイルを再生しないよう、一時ファイルに書いてから置き換える
+    tmp_path = path + '.tmp'
+    with wave.open(tmp_path, 'wb') as w:
+        w.setnchannels(MIXER_CHANNELS)
+        w.setsampwidth(TARGET_FORMAT[2])
+        w.setframerate(MIXER_FREQUENCY)
+        w.writeframes(b''.join(chunks))
+    os.replace(tmp_path, path)
+    return True
+
+
+def iter_assets(project_dir=PROJECT_DIR):
+    """対象ディレクトリ以下の WAV の相対パス"""
+    for asset_dir in ASSET_DIRS:
+        for root, _, files in os.walk(os.path.join(project_dir, asset_dir)):
+            for name in sorted(files):
+                if name.lower().endswith('.wav'):
+                    yield os.path.relpath(os.path.join(root, name), project_dir)
+
+
+def load_manifest(path=MANIFEST_PATH):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def normalize_all(project_dir=PROJECT_DIR, manifest_path=MANIFEST_PATH):
+    """すべてのアセットを標準形式に変換し、manifest を書き出す"""
+    rate, channels, width = TARGET_FORMAT
+    manifest = {'format': {'rate': rate, 'channels': channels, 'sampwidth': width}, 'files': {}}
+    converted = failed = 0
+
+    for rel in iter_assets(project_dir):
+        path = os.path.join(project_dir, rel)
+        before = wav_format(path)
+        try:
+            if normalize_file(path):
+                converted += 1
+                print(f"  ✓ {rel}: {format_label(before)} → {format_label(TARGET_FORMAT)}")
+        except Exception as e:
+            failed += 1
+            print(f"  ⚠️ {rel}: {e}")
+        fmt = wav_format(path)
+        manifest['files'][rel] = {
+            'rate': fmt[0] if fmt else None,
+            'channels': fmt[1] if fmt else None,
+            'sampwidth': fmt[2] if fmt else None,
+            'mtime': os.path.getmtime(path),
+        }
+
+    with open(manifest_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    print(f"変換 {converted}件 / 失敗 {failed}件 / 登録 {len(manifest['files'])}件 → {manifest_path}")
+    return manifest
+
+
+def check_assets(project_dir=PROJECT_DIR, manifest_path=MANIFEST_PATH):
+    """
+    形式の違うアセットの相対パスを返す。
+    manifest に記録された時点から変わっていないファイルは記録を使い、それ以外はヘッダーだけ読む。
+    """
+    manifest = load_manifest(manifest_path) or {'files': {}}
+    known = manifest.get('files', {})
+    off_format = []
+    for rel in iter_assets(project_dir):
+        path = os.path.join(project_dir, rel)
+        entry = known.get(rel)
+        if entry and entry.get('mtime') == os.path.getmtime(path):
+            fmt = (entry['rate'], entry['channels'], entry['sampwidth'])
+        else:
+            fmt = wav_format(path)
+        if fmt != TARGET_FORMAT:
+            off_format.append((rel, fmt))
+    return off_format
+
+
+def warn_off_format(project_dir=PROJECT_DIR, manifest_path=MANIFEST_PATH, limit=5):
+    """起動時の確認：形式の違うアセットを警告（再生のたびにリサンプルが発生するため）"""
+    if load_manifest(manifest_path) is None:
+        print("⚠️ 音声アセットの manifest がありません（python3 normalize_audio.py で作成）")
+    off_format = check_assets(project_dir, manifest_path)
+    if not off_format:
+        return off_format
+    print(f"⚠️ [性能] 標準形式（{format_label(TARGET_FORMAT)}）でない音声が {len(off_format)}件あります。"
+          f"再生のたびにリサンプルされます（python3 normalize_audio.py で変換）")
+    for rel, fmt in off_format[:limit]:
+        print(f"    {rel}: {format_label(fmt)}")
+    if len(off_format) > limit:
+        print(f"    ほか {len(off_format) - limit}件")
+    return off_format
+
+
+def main():
+    parser = argparse.ArgumentParser(description="音声アセットをミキサーの形式に統一")
+    parser.add_argument('--check', action='store_true', help="変換せずに形式の違うファイルを一覧")
+    args = parser.parse_args()
+
+    if args.check:
+        off_format = check_assets()
+        for rel, fmt in off_format:
+            print(f"  {rel}: {format_label(fmt)}")
+        print(f"形式違い: {len(off_format)}件")
+        sys.exit(1 if off_format else 0)
+
+    normalize_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -27,6 +27,7 @@ def pcm_to_wav(pcm_data, wav_path):
         'ffmpeg', '-y',
         '-f', 's16le', '-ar', '16000', '-ac', '1',
         '-i', 'pipe:0',
+        '-ar', '44100', '-ac', '2',  # ミキサーと同じ形式
         wav_path
     ]
     try:
@@ -61,7 +62,8 @@ def process_song(url, filename_wav):
         
         # Convert with volume boost (10dB)
         print(f"Converting to WAV (with +10dB boost): {filename_wav}")
-        cmd = ['ffmpeg', '-y', '-i', os.path.normpath(mp3_path), '-af', 'volume=10dB', os.path.normpath(wav_path)]
+        cmd = ['ffmpeg', '-y', '-i', os.path.normpath(mp3_path), '-af', 'volume=10dB',
+               '-ar', '44100', '-ac', '2', os.path.normpath(wav_path)]
         res = subprocess.run(cmd, capture_output=True)
         if res.returncode != 0:
             print(f"FFmpeg error for {filename_wav}: {res.stderr.decode()}")
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+メニュー読み上げ音声の先読みモジュール
+
+つまみで項目に止まるたびに、前後の項目（±1, ±2）の読み上げ音声を
+バックグラウンドでデコードして SoundCache に載せておく。
+ファイルがない場合は生成関数（Polly 等）を先に実行する。
+"""
+
+import os
+import threading
+
+
+def neighbor_indices(index, count, reach=2):
+    """index の前後 reach 件（循環）を近い順に返す"""
+    result = []
+    for distance in range(1, reach + 1):
+        for offset in (distance, -distance):
+            i = (index + offset) % count
+            if i != index and i not in result:
+                result.append(i)
+    return result
+
+
+class PromptPrefetcher:
+    """前後の読み上げ音声を1本のスレッドで先読みする"""
+    def __init__(self, sound_cache):
+        self.sound_cache = sound_cache
+        self.prefetched = 0
+        self.generated = 0
+        self._jobs = []         # (path, generate, on_ready) のリスト
+        self._menu = None
+        self._generation = 0    # 要求ごとに進め、古い要求の残りを捨てる
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def request(self, menu, jobs):
+        """先読み要求を出す（前の要求の残りは破棄）
+
+        jobs は (path, generate, on_ready) のリスト。
+        generate はファイルがない場合に呼ぶ生成関数、on_ready は準備完了時に呼ぶ関数（どちらも None 可）。
+        """
+        with self._cond:
+            self._generation += 1
+            self._menu = menu
+            self._jobs = list(jobs)
+            self._cond.notify()
+
+    def cancel(self, menu=None):
+        """先読みを中止（menu 指定時はそのメニューの要求のみ）"""
+        with self._cond:
+            if menu is not None and menu != self._menu:
+                return
+            self._generation += 1
+            self._menu = None
+            self._jobs = []
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._jobs:
+                    self._cond.wait()
+                job = self._jobs.pop(0)
+                generation = self._generation
+            self._run(job, generation)
+
+    def _run(self, job, generation):
+        path, generate, on_ready = job
+        if generation != self._generation:
+            # 取り出した後に別の項目に移った（古い要求の生成は始めない）
+            return
+        if not os.path.exists(path) and generate:
+            try:
+                generate()
+                self.generated += 1
+            except Exception as e:
+                print(f"⚠️ 先読み用の音声生成に失敗しました: {e}")
+
+        if generation != self._generation:
+            # 生成中にメニューを離れた・別の項目に移った
+            return
+
+        if os.path.exists(path):
+            try:
+                self.sound_cache.preload(path)
+                self.prefetched += 1
+            except Exception as e:
+                print(f"⚠️ 先読みエラー: {path}: {e}")
+
+        if on_ready and generation == self._generation:
+            try:
+                on_ready()
+            except Exception as e:
+                print(f"❌ 先読み完了コールバックエラー: {e}")
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+操作状態の保存と復元（再起動後にすぐ続きから使えるように）
+
+keyboard_test_v2.py はメニューの位置・モード・各一覧の位置と、
+ネットワークから取得した一覧（物語のファイルリスト・ファンメッセージ）、物語の再生位置を
+状態が変わるたびに save() する。書き込みは専用スレッドで行い、
+書き込み前に届いた新しい状態はまとめて最後の1回だけ書く（入力処理を待たせない）。
+
+サービスの再起動・長押しでの再起動の後は、ネットワークに触る前に load() で復元する。
+書き込みは一時ファイルに書いて fsync してから置き換えるため、途中で電源が切れても壊れない。
+"""
+
+import os
+import json
+import time
+import threading
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(PROJECT_DIR, 'cache', 'session_state.json')
+
+# 形式を変えたら上げる（違う版のファイルは読まない）
+STATE_VERSION = 1
+
+# 書き込みの最小間隔（秒）。SD カードへの書き込み回数を抑える
+SAVE_INTERVAL = 0.5
+
+
+class SessionState:
+    """状態の JSON ファイルへの非同期保存と読み込み"""
+    def __init__(self, path=STATE_PATH, interval=SAVE_INTERVAL):
+        self.path = path
+        self.interval = interval
+        self.writes = 0      # 書き込んだ回数
+        self.coalesced = 0   # 書き込み前に新しい状態で置き換えた回数
+        self.errors = 0
+        self._saved = None   # 最後に保存を要求した状態（同じ状態は書かない）
+        self._pending = None
+        self._writing = False
+        self._cond = threading.Condition()
+        self._thread = threading.Thread(target=self._worker, daemon=True)
+        self._thread.start()
+
+    def load(self):
+        """保存した状態を返す（ない・壊れている・版が違う場合は空の dict）"""
+        try:
+            with open(self.path, encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"⚠️ 操作状態を読み込めません: {e}")
+            return {}
+        if not isinstance(state, dict) or state.get('version') != STATE_VERSION:
+            return {}
+        self._saved = state.get('state')
+        return dict(state.get('state') or {})
+
+    def save(self, state):
+        """状態の保存を要求する（前回と同じなら何もしない。書き込みは専用スレッド）"""
+        with self._cond:
+            if state == self._saved:
+                return
+            self._saved = state
+            if self._pending is not None:
+                self.coalesced += 1
+            self._pending = state
+            self._cond.notify()
+
+    def flush(self, timeout=None):
+        """要求した状態がすべて書き込まれるまで待つ（再起動の前に呼ぶ）。書き込み済みなら True"""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._pending is None and not self._writing, timeout)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while self._pending is None:
+                    self._cond.wait()
+                state, self._pending = self._pending, None
+                self._writing = True
+            try:
+                self._write(state)
+                self.writes += 1
+            except (OSError, TypeError, ValueError) as e:
+                self.errors += 1
+                print(f"⚠️ 操作状態の保存に失敗しました: {e}")
+            with self._cond:
+                self._writing = False
+                self._cond.notify_all()
+            # 連続した変化（つまみを回し続けている間など）はまとめて書く
+            time.sleep(self.interval)
+
+    def _write(self, state):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_VERSION, 'saved_at': time.time(), 'state': state}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def stats(self):
+        return {'path': self.path, 'writes': self.writes, 'coalesced': self.coalesced, 'errors': self.errors}
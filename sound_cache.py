@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+デコード済み pygame.mixer.Sound の LRU キャッシュ
+
+ファイルパスと更新時刻（mtime）をキーにし、ミキサーのフォーマットへ展開後の
+バイト数で予算を管理する。予算を超えたら最後に使われてから最も古いものを捨てる。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+
+import pygame
+
+# キャッシュ予算のデフォルト（MB）
+DEFAULT_BUDGET_MB = 64
+
+
+def expanded_size(sound):
+    """ミキサー内部で保持される（展開後の）バイト数"""
+    rate, size, channels = pygame.mixer.get_init()
+    return int(sound.get_length() * rate) * channels * (abs(size) // 8)
+
+
+class SoundCache:
+    """パスと mtime をキーにしたデコード済み Sound の LRU キャッシュ"""
+    def __init__(self, budget_bytes=DEFAULT_BUDGET_MB * 1024 * 1024):
+        self.budget = budget_bytes
+        self.used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # path -> (mtime, Sound, size)
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """Sound を返す（キャッシュになければ読み込んで登録）"""
+        mtime = os.path.getmtime(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == mtime:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # デコードはロックの外で行う（先読みスレッドと並行して読めるように）
+        sound = pygame.mixer.Sound(path)
+        self._store(path, mtime, sound)
+        return sound
+
+    def preload(self, path):
+        """キャッシュに載せるだけ（ヒット・ミスの集計には含めない）"""
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return False
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry and entry[0] == mtime:
+                return True
+        self._store(path, mtime, pygame.mixer.Sound(path))
+        return True
+
+    def contains(self, path):
+        with self._lock:
+            return path in self._entries
+
+    def _store(self, path, mtime, sound):
+        size = expanded_size(sound)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(path, None)
+            if old:
+                self.used -= old[2]
+            self._entries[path] = (mtime, sound, size)
+            self.used += size
+            while self.used > self.budget and self._entries:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self.used -= evicted
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.used = 0
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'used_bytes': self.used,
+                'budget_bytes': self.budget,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
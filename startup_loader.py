@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+起動時の音声準備
+
+音声パック（asset_pack.py）から全音声を1回だけ読み込み、足りない音声（Polly で作る
+通知・方角音声）はメニュー操作を受け付け始めた後にバックグラウンドで生成する。
+生成が終わるまではその音声の代わりにビープ音を sounds に入れておき、
+できたものから本物の Sound に差し替える。
+
+生成の状況は report() で確認できる（GET /stats の startup の voices）。
+起動の各段階の時間は startup_profiler.py で計測する。
+"""
+
+import os
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pygame
+
+from asset_pack import load_pack
+from normalize_audio import normalize_file
+
+# 音声生成（ネットワーク待ちが主）を並列に行うスレッド数
+GENERATE_WORKERS = 2
+
+
+class StartupLoader:
+    """音声の読み込みと、足りない音声のバックグラウンド生成"""
+    def __init__(self, sounds, workers=GENERATE_WORKERS):
+        self.sounds = sounds  # 差し込み先（keyboard_test_v2.py の sounds）
+        self.generated = {}   # キー → 要求から差し込みまでの時間（秒）
+        self.failed = {}      # キー → エラー内容
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._done = threading.Condition(self._lock)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='voice')
+
+    def load(self, sound_files):
+        """音声パックから読み込んで sounds に入れる（見つからないファイルは除外）"""
+        self.sounds.update(load_pack(sound_files))
+        return self.sounds
+
+    def generate(self, key, path, make, placeholder=None, force=False):
+        """
+        path がなければ（force なら常に）make(書き出し先) でバックグラウンド生成し、
+        できたら path に置いて sounds[key] に差し込む。
+        生成中は placeholder（ビープ音など）を sounds[key] に入れておく。
+        生成を始めた場合は True。
+        """
+        if os.path.exists(path) and not force:
+            return False
+        with self._lock:
+            if key in self._pending:
+                return True
+            self._pending.add(key)
+            if key not in self.sounds and placeholder is not None:
+                self.sounds[key] = placeholder
+        self._pool.submit(self._run, key, path, make, time.monotonic())
+        return True
+
+    def _run(self, key, path, make, requested_at):
+        # 書き込み途中のファイルを読まれないよう、一時ファイルに作ってから置き換える
+        tmp_path = path + '.part'
+        try:
+            make(tmp_path)
+            normalize_file(tmp_path)
+            os.replace(tmp_path, path)
+            sound = pygame.mixer.Sound(path)
+        except Exception as e:
+            print(f"⚠️ 音声の生成に失敗しました（{key}）: {e}")
+            with self._done:
+                self.failed[key] = str(e)
+                self._pending.discard(key)
+                self._done.notify_all()
+            return
+        with self._done:
+            self.sounds[key] = sound
+            self.generated[key] = time.monotonic() - requested_at
+            self._pending.discard(key)
+            self._done.notify_all()
+        print(f"✓ 音声を生成しました: {key}（{self.generated[key]:.1f}秒）")
+
+    def pending(self):
+        with self._lock:
+            return sorted(self._pending)
+
+    def wait(self, timeout=None):
+        """バックグラウンド生成がすべて終わるまで待つ。終わっていれば True"""
+        with self._done:
+            return self._done.wait_for(lambda: not self._pending, timeout)
+
+    def report(self):
+        with self._lock:
+            return {
+                'generated': dict(self.generated),
+                'pending': sorted(self._pending),
+                'failed': dict(self.failed),
+            }
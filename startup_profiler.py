@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+起動の段階ごとの時間計測（起動 → 操作を受け付けるまで）
+
+keyboard_test_v2.py の先頭で StartupProfiler を作り、段階の変わり目で phase(名前) を呼ぶ。
+各段階の実時間と CPU 時間（プロセス全体 / メインスレッド）を記録し、
+ready() で表示（systemd ではジャーナルに残る）と JSON ファイルへの書き出しを行う。
+プロセスの起動からプロファイラを作るまで（Python の起動）は interpreter として記録する。
+
+  python3 keyboard_test_v2.py --profile-startup               # 起動完了まで計測して終了
+  python3 startup_profiler.py before.json after.json          # 2つの結果を比較
+
+起動の最初に読み込むため、標準ライブラリの軽いモジュールだけを使う。
+"""
+
+import os
+import sys
+import json
+import time
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_REPORT_PATH = os.path.join(PROJECT_DIR, 'cache', 'startup_profile.json')
+
+
+def process_age():
+    """プロセスが起動してからの秒数（/proc がなければ None）"""
+    try:
+        with open('/proc/self/stat') as f:
+            # 2番目の項目（コマンド名）は空白を含みうるので、閉じ括弧の後ろから数える
+            fields = f.read().rsplit(')', 1)[1].split()
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf('SC_CLK_TCK'))
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def git_commit(project_dir=PROJECT_DIR):
+    """.git から現在のコミットを読む（git は起動しない）。分からなければ None"""
+    git_dir = os.path.join(project_dir, '.git')
+    try:
+        with open(os.path.join(git_dir, 'HEAD')) as f:
+            head = f.read().strip()
+        if not head.startswith('ref: '):
+            return head[:12]
+        ref = head[5:]
+        ref_path = os.path.join(git_dir, ref)
+        if os.path.exists(ref_path):
+            with open(ref_path) as f:
+                return f.read().strip()[:12]
+        with open(os.path.join(git_dir, 'packed-refs')) as f:
+            for line in f:
+                if line.rstrip().endswith(' ' + ref):
+                    return line.split()[0][:12]
+    except OSError:
+        pass
+    return None
+
+
+class StartupProfiler:
+    """起動の各段階の実時間と CPU 時間を順に記録する"""
+    def __init__(self):
+        self.phases = []   # [{'name', 'wall', 'cpu', 'cpu_main'}]（秒）
+        self.ready_at = None
+        self._wall0 = time.monotonic()
+        self._current = None
+        self._start = None
+        age = process_age()
+        if age is not None:
+            # Python の起動から（ここまでの CPU 時間はこの段階のもの）
+            self.phases.append({'name': 'interpreter', 'wall': age,
+                                'cpu': time.process_time(), 'cpu_main': time.thread_time()})
+        self._offset = age or 0.0
+
+    def _now(self):
+        return time.monotonic(), time.process_time(), time.thread_time()
+
+    def phase(self, name):
+        """今の段階を終えて name の段階を始める"""
+        now = self._now()
+        self._close(now)
+        self._current = name
+        self._start = now
+
+    def _close(self, now):
+        if self._current is None:
+            return
+        wall, cpu, cpu_main = (b - a for a, b in zip(self._start, now))
+        self.phases.append({'name': self._current, 'wall': wall, 'cpu': cpu, 'cpu_main': cpu_main})
+        self._current = None
+
+    def ready(self):
+        """操作を受け付けられるようになった。最後の段階を閉じて起動からの時間を返す"""
+        now = self._now()
+        self._close(now)
+        if self.ready_at is None:
+            self.ready_at = self._offset + now[0] - self._wall0
+        return self.ready_at
+
+    def report(self):
+        return {
+            'commit': git_commit(),
+            'python': sys.version.split()[0],
+            'ready': self.ready_at,
+            'phases': list(self.phases),
+        }
+
+    def print_report(self):
+        for line in format_report(self.report()):
+            print(line)
+
+    def save(self, path=DEFAULT_REPORT_PATH):
+        """結果を JSON で書き出す（失敗しても起動は止めない）"""
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            tmp_path = path + '.tmp'
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(self.report(), f, ensure_ascii=False, indent=2)
+            os.replace(tmp_path, path)
+            print(f"💾 起動時間の計測結果を保存しました: {path}")
+        except OSError as e:
+            print(f"⚠️ 起動時間の計測結果を保存できません: {e}")
+
+
+def format_report(report):
+    """表示用の行（CPU はプロセス全体。バックグラウンドのスレッドの分も含む）"""
+    lines = [f"⏱️ 起動時間（コミット {report.get('commit') or '不明'}）"]
+    lines.append(f"  {'段階':<20}{'実時間':>10}{'CPU':>10}{'メインCPU':>10}")
+    for p in report['phases']:
+        lines.append(f"  {p['name']:<20}{p['wall'] * 1000:>8.0f}ms{p['cpu'] * 1000:>8.0f}ms{p['cpu_main'] * 1000:>8.0f}ms")
+    if report.get('ready') is not None:
+        lines.append(f"  起動 → 操作可能: {report['ready']:.2f}秒")
+    return lines
+
+
+def compare(before, after):
+    """2つの結果の段階ごとの実時間の差の表示用の行"""
+    names = [p['name'] for p in before['phases']]
+    names += [p['name'] for p in after['phases'] if p['name'] not in names]
+    b = {p['name']: p for p in before['phases']}
+    a = {p['name']: p for p in after['phases']}
+
+    def ms(phase):
+        return f"{phase['wall'] * 1000:.0f}ms" if phase else '-'
+
+    lines = [f"  {'段階':<20}{before.get('commit') or '変更前':>14}{after.get('commit') or '変更後':>14}{'差':>10}"]
+    for name in names:
+        diff = f"{(a[name]['wall'] - b[name]['wall']) * 1000:+.0f}ms" if name in a and name in b else ''
+        lines.append(f"  {name:<20}{ms(b.get(name)):>14}{ms(a.get(name)):>14}{diff:>10}")
+    if before.get('ready') is not None and after.get('ready') is not None:
+        lines.append(f"  起動 → 操作可能: {before['ready']:.2f}秒 → {after['ready']:.2f}秒")
+    return lines
+
+
+def main():
+    import argparse
+    parser = argparse.ArgumentParser(description="起動時間の計測結果（keyboard_test_v2.py --profile-startup）を表示・比較")
+    parser.add_argument('reports', nargs='*', default=[DEFAULT_REPORT_PATH], help="結果の JSON（2つ指定すると比較）")
+    args = parser.parse_args()
+
+    loaded = []
+    for path in args.reports[:2]:
+        with open(path, encoding='utf-8') as f:
+            loaded.append(json.load(f))
+    lines = compare(*loaded) if len(loaded) == 2 else format_report(loaded[0])
+    for line in lines:
+        print(line)
+
+
+if __name__ == '__main__':
+    main()